@@ -0,0 +1,174 @@
+"""
+Registro de Aplicações
+Índices (dicts) montados a partir da configuração de rotas (config/proxy/routes.json),
+para que as buscas por chave, url_proxy e Referer sejam O(1). A configuração é relida
+quando o arquivo muda e o snapshot é trocado por inteiro, sem reiniciar os workers.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from types import MappingProxyType
+from urllib.parse import unquote
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Arquivo com rotas, verificação de certificado, aplicações (Dashboards) e ícones
+PROXY_ROUTES_FILE = os.getenv('PROXY_ROUTES_FILE', os.path.join(BASE_DIR, 'config', 'proxy', 'routes.json'))
+# Intervalo mínimo entre verificações do arquivo (segundos)
+RELOAD_INTERVAL = 2.0
+
+PROXY_PREFIX = '/proxy/'
+
+# Primeiro segmento após /proxy/ no Referer (ex.: https://host/proxy/<app_key>/pagina)
+_REFERER_APP_KEY = re.compile(r'/proxy/([^/?#]+)')
+
+
+def normalize_app_key(value):
+    """'/proxy/app/', 'proxy/app' ou 'app' -> 'app'"""
+    key = (value or '').strip()
+    if key.startswith(PROXY_PREFIX):
+        key = key[len(PROXY_PREFIX):]
+    elif key.startswith('proxy/'):
+        key = key[len('proxy/'):]
+    return key.strip('/')
+
+
+class AppRegistry:
+    """Índices imutáveis das aplicações do portal (um snapshot por versão da configuração)"""
+
+    def __init__(self, aplicacoes, proxy_routes, icon_map=None, verify=None, version=''):
+        self.version = version
+        self.aplicacoes = tuple(MappingProxyType(dict(app)) for app in aplicacoes)
+        by_key = {}
+        by_url_proxy = {}
+        for app in self.aplicacoes:
+            url_proxy = app.get('url_proxy')
+            if not url_proxy:
+                continue
+            by_url_proxy.setdefault(url_proxy, app)
+            by_key.setdefault(normalize_app_key(url_proxy), app)
+        self.by_key = MappingProxyType(by_key)
+        self.by_url_proxy = MappingProxyType(by_url_proxy)
+        self.routes = MappingProxyType(dict(proxy_routes))
+        self.icons = MappingProxyType(dict(icon_map or {}))
+        self.verify = MappingProxyType(dict(verify or {}))
+        # Chaves das aplicações da lista principal (aplicacoes)
+        self.dashboard_keys = frozenset(by_key)
+
+    def get(self, app_key):
+        """Aplicação da lista principal pela chave normalizada (ou None)"""
+        return self.by_key.get(normalize_app_key(app_key))
+
+    def target_url(self, app_key):
+        """URL do upstream da rota de proxy (ou None se a chave não existe)"""
+        return self.routes.get(app_key)
+
+    def verify_for(self, app_key):
+        """Verificar certificado do upstream (False = aceitar self-signed)"""
+        return self.verify.get(app_key, True)
+
+    def icon_for(self, *keys):
+        """Primeiro ícone mapeado entre as chaves informadas (normalizadas, minúsculas)"""
+        for key in keys:
+            icon = self.icons.get(normalize_app_key(key).lower())
+            if icon:
+                return icon
+        return None
+
+    def app_key_from_referer(self, referer):
+        """Extrai a chave da rota de proxy do Referer (None se não for uma rota conhecida)"""
+        match = _REFERER_APP_KEY.search(referer or '')
+        if not match:
+            return None
+        app_key = match.group(1)
+        if app_key in self.routes:
+            return app_key
+        # Chaves com espaços/acentos chegam codificadas no Referer
+        app_key = unquote(app_key)
+        return app_key if app_key in self.routes else None
+
+
+def load_registry(path=PROXY_ROUTES_FILE):
+    """Lê e valida o arquivo de rotas; retorna um AppRegistry (ValueError/OSError se inválido)"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    data = json.loads(raw.decode('utf-8'))
+    if not isinstance(data, dict):
+        raise ValueError("a configuração deve ser um objeto JSON")
+    routes = data.get('routes')
+    if not isinstance(routes, dict) or not all(isinstance(k, str) and isinstance(v, str) for k, v in routes.items()):
+        raise ValueError("'routes' deve mapear app_key -> URL")
+    aplicacoes = data.get('aplicacoes', [])
+    if not isinstance(aplicacoes, list) or not all(isinstance(a, dict) and a.get('nome') and a.get('url') for a in aplicacoes):
+        raise ValueError("'aplicacoes' deve ser uma lista de objetos com 'nome' e 'url'")
+    verify = data.get('verify', {})
+    icons = data.get('icons', {})
+    if not isinstance(verify, dict) or not isinstance(icons, dict):
+        raise ValueError("'verify' e 'icons' devem ser objetos")
+    return AppRegistry(aplicacoes, routes, icons, verify, version=hashlib.sha256(raw).hexdigest()[:12])
+
+
+class ProxyRouteConfig:
+    """
+    Configuração de rotas com recarga a quente. Cada requisição pega o snapshot atual
+    uma vez (current()) e o usa até o fim; a troca é só a atribuição de uma referência,
+    então requisições e streams em andamento continuam com a versão com que começaram.
+    """
+
+    def __init__(self, path=PROXY_ROUTES_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._file_stamp = self._stat()
+        # Sem configuração válida o portal não sobe (erro de implantação)
+        self._registry = load_registry(path)
+        self._next_check = 0.0
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def on_change(self, callback):
+        """Registra callback(antigo, novo) chamado após cada troca de snapshot"""
+        self._listeners.append(callback)
+
+    def _reload_if_changed(self):
+        """Relê o arquivo se ele mudou (no máximo a cada RELOAD_INTERVAL)"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + RELOAD_INTERVAL
+        stamp = self._stat()
+        if stamp is None or stamp == self._file_stamp:
+            return
+        with self._lock:
+            if stamp == self._file_stamp:
+                return
+            self._file_stamp = stamp
+            try:
+                registry = load_registry(self.path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Configuração de rotas inválida em {self.path}, mantendo versão {self._registry.version}: {e}")
+                return
+            if registry.version == self._registry.version:
+                return
+            old, self._registry = self._registry, registry
+        logger.info(f"Configuração de rotas recarregada: versão {old.version} -> {registry.version} ({len(registry.routes)} rotas)")
+        for callback in self._listeners:
+            try:
+                callback(old, registry)
+            except Exception as e:
+                logger.warning(f"Erro ao aplicar nova configuração de rotas: {e}")
+
+    def current(self):
+        """Snapshot atual (AppRegistry); verifica o arquivo no máximo a cada RELOAD_INTERVAL"""
+        self._reload_if_changed()
+        return self._registry
@@ -3,22 +3,79 @@ Sistema de Autenticação Avançado com Supabase
 """
 from flask import session, redirect, url_for, flash
 from functools import wraps
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
+from postgrest.exceptions import APIError
 import bcrypt
+import httpx
+import hashlib
+import hmac
 import os
+import secrets
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from password_pool import password_pool, PasswordPoolSaturatedError
+from cache import TTLCache, RevalidatingCache, InvalidationLog
+from catalog import CatalogStore
+from app_registry import normalize_app_key
+from supabase_transport import create_supabase_http_client
+from monitoring import record_authz_stale, record_authz_revalidation_failure
 
 load_dotenv()
 
+# Custo do bcrypt para novos hashes; hashes com outro custo são refeitos no próximo login
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+# Intervalo mínimo (segundos) entre gravações de last_login do mesmo usuário
+LAST_LOGIN_UPDATE_INTERVAL = int(os.getenv('LAST_LOGIN_UPDATE_INTERVAL', '900'))
+# Validade (segundos) de uma verificação de senha bem-sucedida em cache (0 desativa).
+# Só para as contas de quiosque/TV listadas em VERIFY_CACHE_USERS (usernames separados
+# por vírgula), que relogam o tempo todo; as demais sempre passam pelo bcrypt.
+VERIFY_CACHE_TTL = int(os.getenv('VERIFY_CACHE_TTL', '600'))
+VERIFY_CACHE_USERS = frozenset(
+    u.strip().lower() for u in os.getenv('VERIFY_CACHE_USERS', '').split(',') if u.strip()
+)
+VERIFY_CACHE_MAX_ENTRIES = 1000
+LAST_LOGIN_MAX_ENTRIES = 10000
+# Validade (segundos) do cache negativo de usernames inexistentes (0 desativa).
+# Varreduras e erros de digitação deixam de gerar consultas ao Supabase.
+NEGATIVE_CACHE_TTL = int(os.getenv('NEGATIVE_CACHE_TTL', '60'))
+# Sem a coluna username_lower (migração pendente): intervalo (segundos) até testá-la de novo
+USERNAME_LOWER_RECHECK_INTERVAL = 300
+# Arquivo de invalidações compartilhado entre workers do gunicorn (ver cache.InvalidationLog)
+AUTH_INVALIDATION_FILE = os.getenv(
+    'AUTH_INVALIDATION_FILE', os.path.join(tempfile.gettempdir(), 'maestro-auth-invalidations')
+)
+# Permissões por usuário: validade (segundos) antes de reler do banco (0 relê sempre) e
+# carência em que a última versão boa ainda vale se o Supabase estiver fora do ar
+AUTHZ_CACHE_TTL = int(os.getenv('AUTHZ_CACHE_TTL', '30'))
+AUTHZ_STALE_GRACE = int(os.getenv('AUTHZ_STALE_GRACE', '900'))
+# Intervalo máximo (segundos) entre tentativas de revalidação durante a indisponibilidade
+AUTHZ_RETRY_MAX = int(os.getenv('AUTHZ_RETRY_MAX', '60'))
+
 
 class ServiceUnavailableError(Exception):
     """Erro quando o Supabase/PostgREST está temporariamente indisponível (ex.: 503, PGRST002)."""
     pass
 
 
+def is_unavailable_error(e: Exception) -> bool:
+    """Supabase/PostgREST fora do ar (503, PGRST002, cache de schema, falha de conexão/timeout)"""
+    if isinstance(e, (ServiceUnavailableError, httpx.TransportError)):
+        return True
+    error_msg = str(e)
+    return '503' in error_msg or 'PGRST002' in error_msg or 'schema cache' in error_msg.lower()
+
+
 class AuthManager:
     """Gerenciador de autenticação com Supabase"""
     
+    # Colunas lidas no login (somente o necessário para autenticar e criar a sessão)
+    AUTH_COLUMNS = 'id, username, password_hash, active'
+    # Colunas da listagem de usuários do admin (com join do grupo)
+    USER_LIST_COLUMNS = 'id, username, email, active, created_at, last_login, group_id, maestro_user_groups(id, name, description)'
+    
     def __init__(self):
         # Obtém variáveis de ambiente e remove caracteres de controle (como \r do Windows)
         supabase_url = os.getenv('SUPABASE_URL', '').strip().replace('\r', '').replace('\n', '')
@@ -29,21 +86,210 @@ class AuthManager:
         
         self.supabase_url = supabase_url
         self.supabase_key = supabase_key
-        self.supabase: Client = create_client(self.supabase_url, self.supabase_key)
+        # Cliente Supabase criado no primeiro uso em cada processo (nunca antes do fork
+        # do gunicorn): cada worker tem seus próprios pools httpx, sem sockets herdados
+        self._supabase = None
+        self._supabase_pid = None
+        self._client_lock = threading.Lock()
+        
+        # Cache de verificações: HMAC(chave do processo, usuário + hash + senha)
+        # (só guarda digests; muda o hash no banco, muda a chave e o cache deixa de valer)
+        self._verify_cache = TTLCache(VERIFY_CACHE_TTL, max_entries=VERIFY_CACHE_MAX_ENTRIES)
+        self._verify_cache_key = secrets.token_bytes(32)
+        # Usuários com last_login gravado há menos de LAST_LOGIN_UPDATE_INTERVAL
+        self._last_login_written = TTLCache(LAST_LOGIN_UPDATE_INTERVAL, max_entries=LAST_LOGIN_MAX_ENTRIES)
+        self._rehash_pending = set()
+        # Cache negativo: usernames sem cadastro (usuário criado em qualquer worker sai de todos)
+        self._unknown_usernames = TTLCache(NEGATIVE_CACHE_TTL, max_entries=10000)
+        self._invalidations = InvalidationLog(AUTH_INVALIDATION_FILE)
+        self._invalidations.on('username', self._forget_unknown_username)
+        self._invalidations.on('authz', self._forget_authorization)
+        # Coluna username_lower (sql/supabase_users_username_lower.sql): sem a migração, usa o caminho
+        # antigo até este instante (monotonic) e então testa a coluna de novo
+        self._username_lower_retry_at = 0.0
+        self._state_lock = threading.Lock()
+        self._background = None
+        self._background_pid = None
+        # Catálogos (aplicações, dashboards, grupos) em memória
+        self.catalog = CatalogStore(self._load_catalog)
+        # Dados de autorização por usuário (stale-while-revalidate): vencidos, continuam valendo por até
+        # AUTHZ_STALE_GRACE enquanto são relidos em segundo plano (Supabase fora do ar ou lento não trava o pedido)
+        self._authz_cache = RevalidatingCache(
+            self._load_authorization, AUTHZ_CACHE_TTL, AUTHZ_STALE_GRACE,
+            is_transient=is_unavailable_error,
+            retry_max=AUTHZ_RETRY_MAX,
+            on_stale=lambda user_id, age: record_authz_stale(age),
+            on_refresh_failure=lambda user_id: record_authz_revalidation_failure(),
+            name='authz',
+        )
+    
+    def _forget_unknown_username(self, username_key):
+        """Callback de invalidação: username passou a existir (None = esquecer todos)"""
+        if username_key is None:
+            self._unknown_usernames.clear()
+        else:
+            self._unknown_usernames.delete(username_key)
+    
+    def _forget_authorization(self, user_id):
+        """Callback de invalidação: permissões do usuário alteradas (None = esquecer todas)"""
+        if user_id is None:
+            self._authz_cache.clear()
+        else:
+            self._authz_cache.delete(int(user_id))
+    
+    @property
+    def supabase(self) -> Client:
+        """Cliente Supabase do processo atual (criado no primeiro uso; recriado após fork)"""
+        pid = os.getpid()
+        if self._supabase_pid != pid:
+            with self._client_lock:
+                if self._supabase_pid != pid:
+                    # Cliente httpx próprio do worker: pool, HTTP/2, timeouts e métricas por consulta
+                    self._supabase = create_client(
+                        self.supabase_url, self.supabase_key,
+                        options=ClientOptions(httpx_client=create_supabase_http_client())
+                    )
+                    self._supabase_pid = pid
+        return self._supabase
+
+    @supabase.setter
+    def supabase(self, client: Client):
+        with self._client_lock:
+            self._supabase = client
+            self._supabase_pid = os.getpid()
     
     def hash_password(self, password: str) -> str:
-        """Gera hash bcrypt da senha"""
-        salt = bcrypt.gensalt(rounds=12)
-        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
+        """Gera hash bcrypt da senha (no pool dedicado; ver password_pool.py)"""
+        salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+        hashed = password_pool.run(bcrypt.hashpw, password.encode('utf-8'), salt)
         return hashed.decode('utf-8')
     
     def verify_password(self, password: str, hashed: str) -> bool:
-        """Verifica se a senha corresponde ao hash"""
+        """Verifica se a senha corresponde ao hash (no pool dedicado; ver password_pool.py)"""
         try:
-            return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+            return password_pool.run(bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+        except PasswordPoolSaturatedError:
+            raise
         except Exception:
             return False
     
+    @staticmethod
+    def _hash_rounds(hashed: str):
+        """Custo de um hash bcrypt ($2b$12$...) ou None se o formato for desconhecido"""
+        parts = (hashed or '').split('$')
+        if len(parts) >= 4 and parts[2].isdigit():
+            return int(parts[2])
+        return None
+    
+    def _verify_password_cached(self, user: dict, password: str) -> bool:
+        """verify_password com cache (TTL) das verificações bem-sucedidas das contas em VERIFY_CACHE_USERS"""
+        hashed = user['password_hash']
+        if VERIFY_CACHE_TTL <= 0 or (user.get('username') or '').lower() not in VERIFY_CACHE_USERS:
+            return self.verify_password(password, hashed)
+        digest = hmac.new(
+            self._verify_cache_key,
+            f"{user['id']}\0{hashed}\0".encode('utf-8') + password.encode('utf-8'),
+            hashlib.sha256
+        ).digest()
+        if digest in self._verify_cache:
+            return True
+        if not self.verify_password(password, hashed):
+            return False
+        self._verify_cache.set(digest)
+        return True
+    
+    def _run_in_background(self, fn, *args):
+        """Executa fn fora da requisição (uma thread; recriada após fork)"""
+        pid = os.getpid()
+        with self._state_lock:
+            if self._background is None or self._background_pid != pid:
+                self._background = ThreadPoolExecutor(max_workers=1, thread_name_prefix='auth-bg')
+                self._background_pid = pid
+            executor = self._background
+        executor.submit(fn, *args)
+    
+    def _schedule_login_updates(self, user: dict, password: str):
+        """
+        Agenda, em segundo plano, as gravações pós-login: last_login (no máximo uma vez
+        por LAST_LOGIN_UPDATE_INTERVAL por usuário) e rehash quando o custo difere de BCRYPT_ROUNDS
+        """
+        user_id = user['id']
+        old_hash = user.get('password_hash') or ''
+        needs_rehash = self._hash_rounds(old_hash) not in (None, BCRYPT_ROUNDS)
+        with self._state_lock:
+            write_last_login = user_id not in self._last_login_written
+            if write_last_login:
+                self._last_login_written.set(user_id)
+            if needs_rehash:
+                # Um rehash por usuário por vez (logins seguidos leem o hash antigo até gravar)
+                if user_id in self._rehash_pending:
+                    needs_rehash = False
+                else:
+                    self._rehash_pending.add(user_id)
+        if write_last_login or needs_rehash:
+            self._run_in_background(
+                self._write_login_updates, user_id, password if needs_rehash else None, old_hash, write_last_login
+            )
+    
+    def _write_login_updates(self, user_id, password, old_hash, write_last_login):
+        import logging
+        from datetime import datetime
+        try:
+            updates = {}
+            if write_last_login:
+                updates['last_login'] = datetime.utcnow().isoformat()
+            query_filter = None
+            if password is not None:
+                try:
+                    updates['password_hash'] = self.hash_password(password)
+                    # Só troca se o hash não mudou nesse meio tempo (ex.: senha redefinida)
+                    query_filter = old_hash
+                except PasswordPoolSaturatedError:
+                    logging.info(f"Rehash de senha do usuário {user_id} adiado (pool de bcrypt cheio)")
+            if not updates:
+                return
+            query = self.supabase.table('maestro_users').update(updates).eq('id', user_id)
+            if query_filter:
+                query = query.eq('password_hash', query_filter)
+            query.execute()
+            if 'password_hash' in updates:
+                logging.info(f"Hash de senha do usuário {user_id} atualizado para custo {BCRYPT_ROUNDS}")
+        except Exception as e:
+            # Não falha o login se não conseguir atualizar
+            logging.warning(f"Erro ao gravar dados pós-login do usuário {user_id}: {str(e)}")
+        finally:
+            if password is not None:
+                with self._state_lock:
+                    self._rehash_pending.discard(user_id)
+    
+    def _find_user_for_auth(self, username: str):
+        """
+        Busca o usuário do login com uma única consulta por igualdade em username_lower
+        (coluna gerada lower(username) com índice único). Sem a migração, usa o caminho antigo.
+        """
+        username_lower = username.lower().strip()
+        if time.monotonic() >= self._username_lower_retry_at:
+            try:
+                return self.supabase.table('maestro_users').select(self.AUTH_COLUMNS).eq(
+                    'username_lower', username_lower
+                ).limit(1).execute()
+            except APIError as e:
+                # 42703 / PGRST204: coluna inexistente (migração não aplicada); demais erros sobem
+                if e.code not in ('42703', 'PGRST204'):
+                    raise
+                import logging
+                logging.warning(
+                    "Coluna maestro_users.username_lower não encontrada; aplique "
+                    f"sql/supabase_users_username_lower.sql (usando busca ilike por {USERNAME_LOWER_RECHECK_INTERVAL}s)"
+                )
+                self._username_lower_retry_at = time.monotonic() + USERNAME_LOWER_RECHECK_INTERVAL
+        
+        result = self.supabase.table('maestro_users').select(self.AUTH_COLUMNS).ilike('username', username_lower).execute()
+        if not result.data:
+            # Tenta busca exata também
+            result = self.supabase.table('maestro_users').select(self.AUTH_COLUMNS).eq('username', username.strip()).execute()
+        return result
+    
     def create_user(self, username: str, password: str, email: str = None) -> dict:
         """Cria um novo usuário no banco de dados"""
         try:
@@ -65,6 +311,7 @@ class AuthManager:
             result = self.supabase.table('maestro_users').insert(user_data).execute()
             
             if result.data:
+                self._invalidations.publish('username', username.lower().strip())
                 return {
                     'success': True,
                     'message': 'Usuário criado com sucesso',
@@ -79,17 +326,17 @@ class AuthManager:
     def authenticate(self, username: str, password: str) -> dict:
         """Autentica usuário e retorna dados do usuário"""
         try:
-            # Normaliza username (case-insensitive)
-            username_lower = username.lower().strip()
+            # Username sabidamente inexistente (cache negativo): sem consulta ao banco
+            username_key = username.lower().strip()
+            self._invalidations.poll()
+            if username_key in self._unknown_usernames:
+                return {'success': False, 'message': 'Usuário ou senha inválidos'}
             
-            # Busca usuário no banco (case-insensitive)
-            result = self.supabase.table('maestro_users').select('*').ilike('username', username_lower).execute()
-            
-            if not result.data:
-                # Tenta busca exata também
-                result = self.supabase.table('maestro_users').select('*').eq('username', username.strip()).execute()
+            # Busca usuário no banco (case-insensitive, uma consulta)
+            result = self._find_user_for_auth(username)
             
             if not result.data:
+                self._unknown_usernames.set(username_key)
                 return {'success': False, 'message': 'Usuário ou senha inválidos'}
             
             user = result.data[0]
@@ -99,17 +346,11 @@ class AuthManager:
                 return {'success': False, 'message': 'Usuário inativo. Entre em contato com o administrador.'}
             
             # Verifica senha
-            if not self.verify_password(password, user['password_hash']):
+            if not self._verify_password_cached(user, password):
                 return {'success': False, 'message': 'Usuário ou senha inválidos'}
             
-            # Atualiza último login
-            try:
-                from datetime import datetime
-                self.supabase.table('maestro_users').update({
-                    'last_login': datetime.utcnow().isoformat()
-                }).eq('id', user['id']).execute()
-            except Exception:
-                pass  # Não falha se não conseguir atualizar
+            # Atualiza último login (agrupado por usuário) e rehash de custo, fora da requisição
+            self._schedule_login_updates(user, password)
             
             # Remove senha do retorno
             user.pop('password_hash', None)
@@ -119,6 +360,9 @@ class AuthManager:
                 'user': user
             }
             
+        except PasswordPoolSaturatedError:
+            # Pool de bcrypt cheio: o chamador responde 503 com Retry-After
+            raise
         except Exception as e:
             # Log do erro com mais detalhes para debug
             import logging
@@ -131,7 +375,7 @@ class AuthManager:
                 return {'success': False, 'message': 'Erro de configuração. Entre em contato com o administrador.'}
             
             # Supabase temporariamente indisponível (503 / PGRST002)
-            if '503' in error_msg or 'PGRST002' in error_msg or 'schema cache' in error_msg.lower():
+            if is_unavailable_error(e):
                 return {'success': False, 'message': 'Serviço temporariamente indisponível. Tente novamente em alguns instantes.'}
             
             return {'success': False, 'message': 'Erro ao processar autenticação. Tente novamente.'}
@@ -167,32 +411,137 @@ class AuthManager:
             logging.error(f"Erro ao buscar grupo do usuário: {str(e)}")
             return None
     
+    def _load_authorization(self, user_id: int) -> dict:
+        """
+        Lê do banco tudo o que decide o acesso do usuário: usuário com grupo (uma consulta),
+        aplicações concedidas e, fora de Administrador/Maestro Full, as da aba Aplicações.
+        Propaga erros (usado pelo _authz_cache); None se o usuário não existe.
+        """
+        result = self.supabase.table('maestro_users').select(
+            '*, maestro_user_groups(id, name, description)'
+        ).eq('id', user_id).execute()
+        if not result.data:
+            return None
+        user = dict(result.data[0])
+        user.pop('password_hash', None)
+        group = user.pop('maestro_user_groups', None)
+        if isinstance(group, list):
+            group = group[0] if group else None
+        if not isinstance(group, dict) or not group:
+            group = None
+        group_name = group.get('name') if group else None
+        is_admin = group_name == 'administrador'
+        is_maestro_full = group_name == 'maestro_full'
+        
+        applications = []
+        application_ids = set()
+        portal_apps = []
+        portal_app_ids = set()
+        if not is_admin and not is_maestro_full:
+            # Para grupo Operação, buscar aplicações permitidas
+            access = self.supabase.table('maestro_user_application_access').select(
+                'application_id, maestro_applications(id, name, url_proxy, display_name, icon, color)'
+            ).eq('user_id', user_id).execute()
+            for item in access.data or []:
+                application_ids.add(item.get('application_id'))
+                app = item.get('maestro_applications')
+                if isinstance(app, list) and len(app) > 0:
+                    app = app[0]
+                if app:
+                    applications.append({
+                        'id': app.get('id'),
+                        'url_proxy': app.get('url_proxy'),
+                        'name': app.get('name'),
+                        'display_name': app.get('display_name'),
+                        'icon': app.get('icon'),
+                        'color': app.get('color')
+                    })
+            for portal_app_id, app in self._fetch_user_portal_access(user_id):
+                portal_app_ids.add(portal_app_id)
+                if app is not None:
+                    portal_apps.append(app)
+        
+        return {
+            'user': user,
+            'group': group,
+            'group_name': group_name,
+            'is_admin': is_admin,
+            'is_maestro_full': is_maestro_full,
+            'applications': applications,
+            'application_ids': frozenset(application_ids),
+            'portal_apps': portal_apps,
+            'portal_app_ids': frozenset(portal_app_ids),
+        }
+    
+    def _cached_authorization(self, user_id: int):
+        """Dados de autorização do cache, após aplicar as invalidações dos outros workers"""
+        self._invalidations.poll()
+        return self._authz_cache.get(user_id)
+    
+    def _authorization(self, user_id: int):
+        """Dados de autorização do usuário, ou None se não existe/indisponível (erro logado)"""
+        try:
+            return self._cached_authorization(user_id)
+        except Exception as e:
+            import logging
+            logging.error(f"Erro ao buscar permissões do usuário {user_id}: {str(e)}")
+            return None
+    
+    def invalidate_authorization(self, user_id: int):
+        """Descarta as permissões em cache do usuário em todos os workers (após alterações do admin)"""
+        self._invalidations.publish('authz', user_id)
+    
     def is_admin(self, user_id: int) -> bool:
         """Verifica se usuário é administrador"""
-        group = self.get_user_group(user_id)
-        return group and group.get('name') == 'administrador'
+        authz = self._authorization(user_id)
+        return bool(authz and authz['is_admin'])
     
     def is_maestro_full(self, user_id: int) -> bool:
         """Verifica se usuário tem acesso completo (Maestro Full)"""
-        group = self.get_user_group(user_id)
-        return group and group.get('name') == 'maestro_full'
+        authz = self._authorization(user_id)
+        return bool(authz and authz['is_maestro_full'])
     
     def has_portal_tab_access(self, user_id: int) -> bool:
         """Verifica se usuário pode acessar a nova aba 'Aplicações' do portal"""
+        authz = self._authorization(user_id)
+        if not authz:
+            return False
         # Apenas Administrador tem acesso automático; Maestro Full usa o flag no usuário
-        if self.is_admin(user_id):
-            return True
-        user = self.get_user_by_id(user_id)
-        return bool(user and user.get('portal_tab_access'))
+        return authz['is_admin'] or bool(authz['user'].get('portal_tab_access'))
+
+    def _load_catalog(self) -> dict:
+        """Lê os catálogos completos do banco (usado pelo CatalogStore)"""
+        portal_apps = self.supabase.table('maestro_portal_applications').select('*').order('name').execute().data or []
+        applications = self.supabase.table('maestro_applications').select('*').order('display_name').execute().data or []
+        groups = self.supabase.table('maestro_user_groups').select('*').order('name').execute().data or []
+        # Índices das aplicações ativas por chave de proxy (has_application_access)
+        applications_by_key = {}
+        for row in applications:
+            if row.get('active') and row.get('url_proxy'):
+                applications_by_key.setdefault(row['url_proxy'], row)
+        portal_apps_by_key = {}
+        for row in portal_apps:
+            if row.get('active') and row.get('key'):
+                portal_apps_by_key.setdefault(row['key'], row)
+        return {
+            'portal_apps': portal_apps,
+            'applications': applications,
+            'groups': groups,
+            'applications_by_key': applications_by_key,
+            'portal_apps_by_key': portal_apps_by_key,
+        }
+
+    def reload_catalog(self) -> dict:
+        """Força a recarga do catálogo (neste e nos demais workers) e retorna o status"""
+        changed = self.catalog.request_reload()
+        return {**self.catalog.status(), 'changed': changed}
 
     def get_portal_apps(self, active_only: bool = True) -> list:
         """Retorna as aplicações cadastradas na aba Aplicações (maestro_portal_applications)."""
         try:
-            query = self.supabase.table('maestro_portal_applications').select('*')
-            if active_only:
-                query = query.eq('active', True)
-            result = query.order('name').execute()
-            return result.data or []
+            rows = self.catalog.get('portal_apps')
+            # Cópias: quem chama pode alterar os dicts sem afetar o snapshot
+            return [dict(r) for r in rows if r.get('active') or not active_only]
         except Exception as e:
             import logging
             logging.error(f"Erro ao buscar portal apps: {str(e)}")
@@ -201,11 +550,10 @@ class AuthManager:
     def get_portal_dashboards(self, active_only: bool = True) -> list:
         """Retorna os dashboards da aba Dashboards (maestro_applications com section='portal_dashboard')."""
         try:
-            query = self.supabase.table('maestro_applications').select('id, name, url_proxy, display_name, icon, color, active').eq('section', 'portal_dashboard')
-            if active_only:
-                query = query.eq('active', True)
-            result = query.order('display_name').execute()
-            rows = result.data or []
+            rows = [
+                r for r in self.catalog.get('applications')
+                if r.get('section') == 'portal_dashboard' and (r.get('active') or not active_only)
+            ]
             # Formato compatível com o que a tela espera: key, name, url, description
             return [
                 {
@@ -223,20 +571,23 @@ class AuthManager:
             logging.error(f"Erro ao buscar portal dashboards: {str(e)}")
             return []
 
+    def _fetch_user_portal_access(self, user_id: int) -> list:
+        """Concessões da aba Aplicações do usuário: [(portal_app_id, aplicação ou None)] (propaga erros)"""
+        result = self.supabase.table('maestro_user_portal_app_access').select(
+            'portal_app_id, maestro_portal_applications(id, key, name, description, active)'
+        ).eq('user_id', user_id).execute()
+        access = []
+        for item in result.data or []:
+            app = item.get('maestro_portal_applications')
+            if isinstance(app, list) and app:
+                app = app[0]
+            access.append((item.get('portal_app_id'), app if isinstance(app, dict) else None))
+        return access
+
     def get_user_portal_apps(self, user_id: int) -> list:
         """Retorna as aplicações da nova aba permitidas para o usuário"""
         try:
-            result = self.supabase.table('maestro_user_portal_app_access').select(
-                'portal_app_id, maestro_portal_applications(id, key, name, description, active)'
-            ).eq('user_id', user_id).execute()
-            apps = []
-            for item in result.data or []:
-                app = item.get('maestro_portal_applications')
-                if isinstance(app, list) and app:
-                    app = app[0]
-                if isinstance(app, dict):
-                    apps.append(app)
-            return apps
+            return [app for _, app in self._fetch_user_portal_access(user_id) if app is not None]
         except Exception as e:
             import logging
             logging.error(f"Erro ao buscar portal apps do usuário: {str(e)}")
@@ -244,22 +595,10 @@ class AuthManager:
 
     def set_user_portal_apps(self, user_id: int, portal_app_ids: list, granted_by: int = None) -> bool:
         """Define (substitui) as aplicações da nova aba permitidas para o usuário"""
-        try:
-            # Limpa permissões existentes
-            self.supabase.table('maestro_user_portal_app_access').delete().eq('user_id', user_id).execute()
-            # Insere novas permissões
-            if portal_app_ids:
-                rows = [{
-                    'user_id': user_id,
-                    'portal_app_id': app_id,
-                    'granted_by': granted_by
-                } for app_id in portal_app_ids]
-                self.supabase.table('maestro_user_portal_app_access').insert(rows).execute()
-            return True
-        except Exception as e:
-            import logging
-            logging.error(f"Erro ao definir portal apps do usuário: {str(e)}")
-            return False
+        result = self._sync_access(
+            'maestro_user_portal_app_access', 'portal_app_id', user_id, portal_app_ids, granted_by
+        )
+        return result['success']
 
     def update_portal_tab_access(self, user_id: int, enabled: bool) -> bool:
         """Atualiza flag de acesso à aba de Aplicações"""
@@ -270,44 +609,39 @@ class AuthManager:
             import logging
             logging.error(f"Erro ao atualizar portal_tab_access: {str(e)}")
             return False
+        finally:
+            self.invalidate_authorization(user_id)
 
     def has_application_access(self, user_id: int, url_proxy: str) -> bool:
         """Verifica se usuário tem acesso a uma aplicação específica"""
         try:
+            # Permissões do usuário em cache; com o Supabase fora do ar, a última versão boa
+            authz = self._cached_authorization(user_id)
+            if not authz:
+                return False
+            
             # Administrador e Maestro Full têm acesso a tudo
-            if self.is_admin(user_id) or self.is_maestro_full(user_id):
+            if authz['is_admin'] or authz['is_maestro_full']:
                 return True
             
             # Para grupo Operação, verificar permissões específicas
             # Extrair o nome da aplicação do url_proxy
             # url_proxy pode vir como '/proxy/painel-monitoracao' ou 'painel-monitoracao'
-            app_key = url_proxy
-            if app_key.startswith('/proxy/'):
-                app_key = app_key.replace('/proxy/', '')
-            elif app_key.startswith('proxy/'):
-                app_key = app_key.replace('proxy/', '')
-            
-            # 1) Tentar em maestro_applications (principais e portal_dashboard)
-            app_result = self.supabase.table('maestro_applications').select('id, section').eq('url_proxy', app_key).eq('active', True).execute()
-            if app_result.data:
-                row = app_result.data[0]
+            app_key = normalize_app_key(url_proxy)
+            
+            portal_enabled = bool(authz['user'].get('portal_tab_access'))
+            
+            # 1) Tentar em maestro_applications (principais e portal_dashboard), pelo catálogo em memória
+            row = self.catalog.get('applications_by_key').get(app_key)
+            if row:
                 if row.get('section') == 'portal_dashboard':
-                    user = self.get_user_by_id(user_id)
-                    return bool(user and user.get('portal_tab_access'))
-                app_id = row['id']
-                access_result = self.supabase.table('maestro_user_application_access').select('id').eq('user_id', user_id).eq('application_id', app_id).execute()
-                return len(access_result.data) > 0
+                    return portal_enabled
+                return row['id'] in authz['application_ids']
 
             # 2) Tentar nas aplicações da aba Aplicações (portal)
-            portal_app = self.supabase.table('maestro_portal_applications').select('id').eq('key', app_key).eq('active', True).execute()
-            if portal_app.data:
-                portal_app_id = portal_app.data[0]['id']
-                user = self.get_user_by_id(user_id)
-                portal_enabled = bool(user and user.get('portal_tab_access'))
-                if not portal_enabled:
-                    return False
-                access_result = self.supabase.table('maestro_user_portal_app_access').select('id').eq('user_id', user_id).eq('portal_app_id', portal_app_id).execute()
-                return len(access_result.data) > 0
+            portal_app = self.catalog.get('portal_apps_by_key').get(app_key)
+            if portal_app:
+                return portal_enabled and portal_app['id'] in authz['portal_app_ids']
 
             import logging
             logging.warning(f"Aplicação não encontrada para app_key/url_proxy: {app_key}")
@@ -316,8 +650,8 @@ class AuthManager:
             import logging
             error_msg = str(e)
             logging.error(f"Erro ao verificar acesso à aplicação: {error_msg}")
-            # Supabase/PostgREST indisponível: permitir que o chamador exiba mensagem amigável
-            if '503' in error_msg or 'PGRST002' in error_msg or 'schema cache' in error_msg.lower():
+            # Supabase/PostgREST indisponível (sem dados válidos em cache): permitir que o chamador exiba mensagem amigável
+            if is_unavailable_error(e):
                 raise ServiceUnavailableError("Supabase temporariamente indisponível") from e
             import traceback
             logging.error(traceback.format_exc())
@@ -326,45 +660,23 @@ class AuthManager:
     def get_user_permissions(self, user_id: int) -> dict:
         """Retorna todas as permissões do usuário"""
         try:
-            user = self.get_user_by_id(user_id)
-            if not user:
+            authz = self._cached_authorization(user_id)
+            if not authz:
                 return {'is_admin': False, 'is_maestro_full': False, 'applications': []}
             
-            group = self.get_user_group(user_id)
-            group_name = group.get('name') if group else None
-            
-            is_admin = group_name == 'administrador'
-            is_maestro_full = group_name == 'maestro_full'
-            
-            applications = []
-            if not is_admin and not is_maestro_full:
-                # Para grupo Operação, buscar aplicações permitidas
-                result = self.supabase.table('maestro_user_application_access').select(
-                    'application_id, maestro_applications(id, name, url_proxy, display_name, icon, color)'
-                ).eq('user_id', user_id).execute()
-                
-                for item in result.data:
-                    if item.get('maestro_applications'):
-                        app = item['maestro_applications']
-                        if isinstance(app, list) and len(app) > 0:
-                            app = app[0]
-                        applications.append({
-                            'id': app.get('id'),
-                            'url_proxy': app.get('url_proxy'),
-                            'name': app.get('name'),
-                            'display_name': app.get('display_name'),
-                            'icon': app.get('icon'),
-                            'color': app.get('color')
-                        })
+            is_admin = authz['is_admin']
+            is_maestro_full = authz['is_maestro_full']
+            group = authz['group']
             
             return {
                 'is_admin': is_admin,
                 'is_maestro_full': is_maestro_full,
-                'group_name': group_name,
+                'group_name': authz['group_name'],
                 'group_id': group.get('id') if group else None,
-                'applications': applications,
-                'portal_tab_access': True if is_admin else bool(user.get('portal_tab_access', False)),
-                'portal_apps': self.get_user_portal_apps(user_id) if not (is_admin or is_maestro_full) else self.get_portal_apps(active_only=True)
+                # Cópias: o snapshot em cache é compartilhado entre requisições
+                'applications': [dict(app) for app in authz['applications']],
+                'portal_tab_access': True if is_admin else bool(authz['user'].get('portal_tab_access', False)),
+                'portal_apps': [dict(app) for app in authz['portal_apps']] if not (is_admin or is_maestro_full) else self.get_portal_apps(active_only=True)
             }
         except Exception as e:
             import logging
@@ -375,36 +687,10 @@ class AuthManager:
         """Busca todos os usuários com informações de grupo"""
         try:
             result = self.supabase.table('maestro_users').select(
-                'id, username, email, active, created_at, last_login, group_id, maestro_user_groups(id, name, description)'
+                self.USER_LIST_COLUMNS
             ).order('username', desc=False).execute()
             
-            users = []
-            for user in result.data:
-                # Garantir que campos básicos existam
-                if not isinstance(user, dict):
-                    continue
-                
-                # Remover password_hash se existir
-                user.pop('password_hash', None)
-                
-                # Processar grupo
-                group_data = user.get('maestro_user_groups')
-                if group_data:
-                    if isinstance(group_data, list) and len(group_data) > 0:
-                        user['group'] = group_data[0]
-                    elif isinstance(group_data, dict):
-                        user['group'] = group_data
-                else:
-                    user['group'] = None
-                
-                # Garantir que campos essenciais existam
-                user.setdefault('id', None)
-                user.setdefault('username', '')
-                user.setdefault('email', None)
-                user.setdefault('active', True)
-                user.setdefault('last_login', None)
-                
-                users.append(user)
+            users = [self._normalize_user_row(user) for user in result.data if isinstance(user, dict)]
             
             # Ordenação adicional case-insensitive no Python para garantir
             users.sort(key=lambda x: (x.get('username') or '').lower())
@@ -417,38 +703,133 @@ class AuthManager:
             logging.error(traceback.format_exc())
             return []
 
+    @staticmethod
+    def _normalize_user_row(user: dict) -> dict:
+        """Normaliza linha de maestro_users para a listagem (grupo em 'group', campos padrão)"""
+        user.pop('password_hash', None)
+        group_data = user.get('maestro_user_groups')
+        if isinstance(group_data, list) and len(group_data) > 0:
+            user['group'] = group_data[0]
+        elif isinstance(group_data, dict):
+            user['group'] = group_data
+        else:
+            user['group'] = None
+        user.setdefault('id', None)
+        user.setdefault('username', '')
+        user.setdefault('email', None)
+        user.setdefault('active', True)
+        user.setdefault('last_login', None)
+        return user
+
+    @staticmethod
+    def _sanitize_search_term(search_term: str) -> str:
+        """
+        Remove da busca caracteres com significado na sintaxe de filtros do PostgREST
+        e escapa o curinga '_' do LIKE (buscar 'a_b' não deve casar com 'axb')
+        """
+        term = (search_term or '').strip()
+        for char in ',()*%"\\:':
+            term = term.replace(char, ' ')
+        return ' '.join(term.split())[:100].replace('_', '\\_')
+
+    def _users_page_query(self, term: str, start: int, end: int):
+        query = self.supabase.table('maestro_users').select(self.USER_LIST_COLUMNS, count='exact')
+        if term:
+            # ilike com curingas: atendido pelo índice trigram (sql/supabase_users_search_trgm.sql)
+            query = query.or_(f'username.ilike.*{term}*,email.ilike.*{term}*')
+        return query.order('username', desc=False).range(start, end).execute()
+
     def get_users_paginated(self, search_term: str = None, page: int = 1, per_page: int = 20) -> tuple:
-        """Retorna (lista de usuários da página, total de usuários) com busca opcional e paginação."""
-        users = self.get_all_users()
-        if search_term:
-            term = (search_term or '').strip().lower()
-            if term:
-                users = [
-                    u for u in users
-                    if term in (u.get('username') or '').lower() or term in (u.get('email') or '').lower()
-                ]
-        total = len(users)
-        start = (page - 1) * per_page
-        end = start + per_page
-        page_users = users[start:end]
-        return (page_users, total)
+        """
+        Retorna (lista de usuários da página, total de usuários) com busca opcional e paginação.
+        Busca, ordenação e paginação são feitas no banco (range + count exato).
+        Se a página passar do fim, retorna a última página.
+        """
+        term = self._sanitize_search_term(search_term)
+        page = max(1, page)
+        try:
+            start = (page - 1) * per_page
+            try:
+                result = self._users_page_query(term, start, start + per_page - 1)
+                total = result.count or 0
+                rows = result.data or []
+            except APIError as e:
+                # PGRST103: offset além do total (página inexistente, HTTP 416)
+                if e.code != 'PGRST103':
+                    raise
+                total, rows = None, []
+            if not rows and page > 1:
+                if total is None:
+                    count_query = self.supabase.table('maestro_users').select('id', count='exact', head=True)
+                    if term:
+                        count_query = count_query.or_(f'username.ilike.*{term}*,email.ilike.*{term}*')
+                    total = count_query.execute().count or 0
+                if total:
+                    last_start = ((total - 1) // per_page) * per_page
+                    result = self._users_page_query(term, last_start, last_start + per_page - 1)
+                    total = result.count or total
+                    rows = result.data or []
+            users = [self._normalize_user_row(u) for u in rows if isinstance(u, dict)]
+            return (users, total or 0)
+        except Exception as e:
+            import logging
+            logging.error(f"Erro ao buscar usuários paginados: {str(e)}")
+            return ([], 0)
+    
+    def get_users_applications(self, user_ids: list) -> dict:
+        """Busca em lote as aplicações permitidas de vários usuários ({user_id: [aplicações]})"""
+        applications = {user_id: [] for user_id in user_ids}
+        if not user_ids:
+            return applications
+        try:
+            # Uma única consulta com filtro in.(...) no lugar de uma por usuário
+            result = self.supabase.table('maestro_user_application_access').select(
+                'user_id, application_id, maestro_applications(id, name, url_proxy, display_name, icon, color)'
+            ).in_('user_id', list(user_ids)).execute()
+            
+            for item in result.data or []:
+                app = item.get('maestro_applications')
+                if isinstance(app, list) and len(app) > 0:
+                    app = app[0]
+                if isinstance(app, dict):
+                    applications.setdefault(item.get('user_id'), []).append(app)
+            return applications
+        except Exception as e:
+            import logging
+            logging.error(f"Erro ao buscar aplicações dos usuários em lote: {str(e)}")
+            return applications
+
+    def get_users_listing(self, search_term: str = None, page: int = 1, per_page: int = 20) -> tuple:
+        """
+        Listagem do admin: (usuários da página com grupo e 'applications', total).
+        Usa uma consulta para usuários/grupos e outra para as permissões da página.
+        """
+        users, total = self.get_users_paginated(search_term=search_term, page=page, per_page=per_page)
+        # Apenas o grupo Operação tem permissões por aplicação (demais acessam tudo)
+        operacao_ids = [
+            u['id'] for u in users
+            if u.get('id') is not None and (u.get('group') or {}).get('name') == 'operacao'
+        ]
+        applications = self.get_users_applications(operacao_ids)
+        for user in users:
+            user['applications'] = applications.get(user.get('id'), [])
+        return (users, total)
     
     def get_all_groups(self) -> list:
         """Busca todos os grupos"""
         try:
-            result = self.supabase.table('maestro_user_groups').select('*').order('name').execute()
-            return result.data
+            return [dict(g) for g in self.catalog.get('groups')]
         except Exception:
             return []
     
     def get_all_applications(self) -> list:
         """Busca todas as aplicações principais (exclui section='portal_dashboard', usadas na aba Dashboards)."""
         try:
-            query = self.supabase.table('maestro_applications').select('*').eq('active', True)
             # Apenas 'main' ou sem section (null); não listar portal_dashboard na tela de conceder acesso
-            query = query.or_('section.is.null,section.eq.main')
-            result = query.order('display_name').execute()
-            return result.data or []
+            return [
+                dict(r) for r in self.catalog.get('applications')
+                if r.get('active') and r.get('section') in (None, 'main')
+            ]
         except Exception:
             return []
     
@@ -461,6 +842,8 @@ class AuthManager:
             return {'success': False, 'message': 'Erro ao atualizar grupo'}
         except Exception as e:
             return {'success': False, 'message': f'Erro: {str(e)}'}
+        finally:
+            self.invalidate_authorization(user_id)
     
     def grant_application_access(self, user_id: int, application_id: int, granted_by: int = None) -> dict:
         """Concede acesso a uma aplicação para um usuário"""
@@ -481,6 +864,8 @@ class AuthManager:
             if 'duplicate' in error_msg.lower() or 'unique' in error_msg.lower():
                 return {'success': False, 'message': 'Usuário já possui acesso a esta aplicação'}
             return {'success': False, 'message': f'Erro: {str(e)}'}
+        finally:
+            self.invalidate_authorization(user_id)
     
     def revoke_application_access(self, user_id: int, application_id: int) -> dict:
         """Revoga acesso a uma aplicação de um usuário"""
@@ -489,6 +874,51 @@ class AuthManager:
             return {'success': True, 'message': 'Acesso revogado com sucesso'}
         except Exception as e:
             return {'success': False, 'message': f'Erro: {str(e)}'}
+        finally:
+            self.invalidate_authorization(user_id)
+    
+    def _sync_access(self, table: str, column: str, user_id: int, ids, granted_by: int = None) -> dict:
+        """
+        Aplica apenas a diferença entre as permissões atuais e as desejadas:
+        uma leitura, um upsert em lote (concede) e um delete com in.(...) (revoga).
+        Concede antes de revogar, para o usuário nunca ficar sem acesso no meio da troca.
+        """
+        import logging
+        try:
+            desired = {int(i) for i in ids or []}
+            current_result = self.supabase.table(table).select(column).eq('user_id', user_id).execute()
+            current = {row[column] for row in current_result.data or [] if row.get(column) is not None}
+            to_add = sorted(desired - current)
+            to_remove = sorted(current - desired)
+            
+            if to_add:
+                rows = []
+                for item_id in to_add:
+                    row = {'user_id': user_id, column: item_id}
+                    if granted_by:
+                        row['granted_by'] = granted_by
+                    rows.append(row)
+                # ignore_duplicates: concessão concorrente já gravada não gera erro
+                self.supabase.table(table).upsert(
+                    rows, on_conflict=f'user_id,{column}', ignore_duplicates=True
+                ).execute()
+            
+            if to_remove:
+                self.supabase.table(table).delete().eq('user_id', user_id).in_(column, to_remove).execute()
+            
+            logging.info(f"Permissões de {table} do usuário {user_id}: +{to_add} -{to_remove}")
+            return {'success': True, 'added': to_add, 'removed': to_remove}
+        except Exception as e:
+            logging.error(f"Erro ao sincronizar {table} do usuário {user_id}: {str(e)}")
+            return {'success': False, 'added': [], 'removed': [], 'message': f'Erro: {str(e)}'}
+        finally:
+            self.invalidate_authorization(user_id)
+    
+    def sync_user_applications(self, user_id: int, application_ids, granted_by: int = None) -> dict:
+        """Define as aplicações (grupo Operação) do usuário com concessão/revogação em lote"""
+        return self._sync_access(
+            'maestro_user_application_access', 'application_id', user_id, application_ids, granted_by
+        )
     
     def get_user_applications(self, user_id: int) -> list:
         """Busca aplicações permitidas para um usuário"""
@@ -0,0 +1,432 @@
+"""
+Teste de carga local do portal
+Sobe apps upstream de mentira (uma por rota do routes.json), um stub PostgREST com as
+tabelas maestro_* e o portal no gunicorn (gunicorn.conf.py); então roda jornadas de
+usuários (login -> início -> abrir dashboard com seus assets -> polling da API) e
+reporta vazão, percentis de latência, chamadas ao Supabase por requisição e memória
+por worker.
+
+Uso:
+    python bench/load_test.py --users 20 --duration 30 --workers 2 --json bench/results/run.json
+"""
+import argparse
+import json
+import os
+import random
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from stub_postgrest import BENCH_PASSWORD, PostgrestStub, build_seed  # noqa: E402
+from stub_upstream import UpstreamApp  # noqa: E402
+
+# Host das apps de mentira: 127.0.0.1/localhost são bloqueados por validate_proxy_url
+UPSTREAM_HOST = '127.0.0.2'
+# Chave de serviço de mentira (formato JWT, aceito pelo cliente supabase)
+FAKE_SERVICE_KEY = 'eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.YmVuY2g'
+# Rotas com hosts fixos no código (não passam só pela rota configurada): fora das jornadas
+JOURNEY_EXCLUDED_KEYS = ('apontamento-forno',)
+# Apps servidas num subcaminho que o proxy acrescenta (ver proxy_app)
+UPSTREAM_MOUNTS = {'buffer-forno': '/buffer'}
+ASSET_EXTENSIONS = ('.css', '.js', '.mjs', '.png', '.jpg', '.svg', '.ico', '.woff', '.woff2', '.webp')
+_ASSET_URL = re.compile(r'''(?:src|href)\s*=\s*["']?(/proxy/[^"'\s>#?]+)|url\(\s*["']?(/proxy/[^"')\s]+)''', re.IGNORECASE)
+_CSRF = re.compile(r'name="csrf_token"\s+value="([^"]+)"')
+
+
+def percentile(values, pct):
+    """Percentil por posição (nearest-rank) de uma lista ordenada"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(pct / 100.0 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def summarize(samples):
+    """Resumo de latências (segundos -> ms)"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {'count': 0}
+    return {
+        'count': len(ordered),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 2),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 2),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 2),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 2),
+        'max_ms': round(ordered[-1] * 1000, 2),
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def rss_mb(pid):
+    """RSS do processo (MB) via /proc"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def child_pids(pid):
+    """Processos filhos diretos (workers do gunicorn)"""
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+class Environment:
+    """Upstreams, stub PostgREST e gunicorn do cenário"""
+
+    def __init__(self, args):
+        self.args = args
+        self.tmpdir = tempfile.mkdtemp(prefix='maestro-bench-')
+        self.upstreams = {}
+        self.stub = None
+        self.allowed = {}
+        self.process = None
+        self.port = args.port or free_port()
+        self.base_url = f'http://127.0.0.1:{self.port}'
+        self.log_path = os.path.join(self.tmpdir, 'gunicorn.log')
+
+    def _write_routes(self):
+        with open(os.path.join(REPO_DIR, 'config', 'proxy', 'routes.json'), encoding='utf-8') as f:
+            config = json.load(f)
+        routes = {}
+        for key, target in config['routes'].items():
+            upstream = UpstreamApp(key, host=UPSTREAM_HOST, profile=self.args.page_profile,
+                                   base_path=UPSTREAM_MOUNTS.get(key, urlsplit(target).path)).start()
+            self.upstreams[key] = upstream
+            routes[key] = upstream.base_url + urlsplit(target).path
+        config['routes'] = routes
+        config['verify'] = {}
+        path = os.path.join(self.tmpdir, 'routes.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(config, f, ensure_ascii=False, indent=2)
+        return path, list(config['routes'])
+
+    def start(self):
+        routes_file, route_keys = self._write_routes()
+        tables, self.allowed = build_seed(route_keys, users=self.args.seed_users, bcrypt_rounds=self.args.bcrypt_rounds)
+        self.stub = PostgrestStub(tables, latency=self.args.db_latency_ms / 1000.0).start()
+        env = dict(os.environ)
+        env.update({
+            'SUPABASE_URL': self.stub.url,
+            'SUPABASE_SERVICE_ROLE_KEY': FAKE_SERVICE_KEY,
+            'SECRET_KEY': 'bench-' + os.urandom(16).hex(),
+            'SESSION_COOKIE_SECURE': 'False',
+            'PROXY_ROUTES_FILE': routes_file,
+            'ALLOWED_PROXY_HOSTS': UPSTREAM_HOST,
+            'BCRYPT_ROUNDS': str(self.args.bcrypt_rounds),
+            'CATALOG_RELOAD_FILE': os.path.join(self.tmpdir, 'catalog-reload'),
+            'GUNICORN_BIND': f'127.0.0.1:{self.port}',
+            'GUNICORN_WORKERS': str(self.args.workers),
+            'GUNICORN_THREADS': str(self.args.threads),
+        })
+        env.pop('SUPABASE_KEY', None)
+        log = open(self.log_path, 'wb')
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'],
+            cwd=REPO_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'gunicorn encerrou na subida (log: {self.log_path})')
+            try:
+                if requests.get(self.base_url + '/login', timeout=2).status_code == 200:
+                    return self
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f'portal não respondeu em 60s (log: {self.log_path})')
+
+    def memory(self):
+        if self.process is None:
+            return {}
+        workers = [rss_mb(pid) for pid in child_pids(self.process.pid)]
+        workers = [w for w in workers if w is not None]
+        return {
+            'master_mb': rss_mb(self.process.pid),
+            'workers_mb': workers,
+            'worker_max_mb': max(workers) if workers else None,
+            'worker_avg_mb': round(sum(workers) / len(workers), 1) if workers else None,
+        }
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.send_signal(signal.SIGTERM)
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        for upstream in self.upstreams.values():
+            upstream.stop()
+        if self.stub is not None:
+            self.stub.stop()
+
+
+class VirtualUser:
+    """Um operador: sessão própria (cookies, keep-alive) e IP próprio (X-Real-IP)"""
+
+    def __init__(self, env, username, index, args, rng):
+        self.env = env
+        self.username = username
+        self.args = args
+        self.rng = rng
+        self.apps = [k for k in env.allowed[username] if k not in JOURNEY_EXCLUDED_KEYS and k in env.upstreams]
+        self.http = requests.Session()
+        self.http.headers['X-Real-IP'] = f'10.99.{index // 250}.{index % 250 + 1}'
+        self.cached_assets = set()
+        self.samples = {}
+        self.errors = {}
+        self.requests = 0
+        self.logins = 0
+
+    def _timed(self, step, method, path, expected=200, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.http.request(method, self.env.base_url + path, allow_redirects=False, timeout=60, **kwargs)
+            body = response.content
+        except requests.RequestException as e:
+            self.errors[f'{step}:{type(e).__name__}'] = self.errors.get(f'{step}:{type(e).__name__}', 0) + 1
+            return None, b''
+        self.samples.setdefault(step, []).append(time.perf_counter() - started)
+        self.requests += 1
+        if response.status_code != expected:
+            key = f'{step}:{response.status_code}'
+            self.errors[key] = self.errors.get(key, 0) + 1
+        return response, body
+
+    def login(self):
+        self.http.cookies.clear()
+        self.cached_assets.clear()
+        response, body = self._timed('login_page', 'GET', '/login')
+        match = _CSRF.search(body.decode('utf-8', 'ignore')) if response is not None else None
+        data = {'username': self.username, 'password': BENCH_PASSWORD, 'csrf_token': match.group(1) if match else ''}
+        self._timed('login', 'POST', '/login', expected=302, data=data)
+        self.logins += 1
+
+    def open_dashboard(self, app_key):
+        response, body = self._timed('dashboard', 'GET', f'/proxy/{app_key}/')
+        if response is None or response.status_code != 200:
+            return
+        html = body.decode('utf-8', 'ignore')
+        assets = set()
+        for match in _ASSET_URL.finditer(html):
+            url = match.group(1) or match.group(2)
+            if url.lower().endswith(ASSET_EXTENSIONS):
+                assets.add(url)
+        for url in sorted(assets):
+            # Navegador com cache: cada asset é baixado uma vez por sessão
+            if url in self.cached_assets:
+                continue
+            self.cached_assets.add(url)
+            self._timed('asset', 'GET', url)
+
+    def journey(self):
+        if self.logins == 0 or (self.rng.random() < self.args.relogin_rate and self.logins < 25):
+            self.login()
+        self._timed('index', 'GET', '/')
+        if not self.apps:
+            return
+        app_key = self.rng.choice(self.apps)
+        self.open_dashboard(app_key)
+        referer = {'Referer': f'{self.env.base_url}/proxy/{app_key}/'}
+        for _ in range(self.args.polls):
+            if self.args.think_ms:
+                time.sleep(self.args.think_ms / 1000.0)
+            self._timed('api_poll', 'GET', f'/proxy/{app_key}/api/data', headers=referer)
+        if self.rng.random() < self.args.slow_rate:
+            self._timed('api_slow', 'GET', f'/proxy/{app_key}/api/slow', headers=referer)
+        if self.rng.random() < self.args.fail_rate:
+            self._timed('api_fail', 'GET', f'/proxy/{app_key}/api/fail', expected=500, headers=referer)
+
+
+def run_load(env, args):
+    """Roda as jornadas em paralelo até o fim da duração; retorna os usuários virtuais"""
+    usernames = sorted(env.allowed)[:args.users]
+    rng = random.Random(args.seed)
+    vusers = [VirtualUser(env, name, i, args, random.Random(rng.random())) for i, name in enumerate(usernames)]
+    deadline = time.monotonic() + args.duration
+    journeys = [0]
+    lock = threading.Lock()
+
+    def loop(vu):
+        while time.monotonic() < deadline:
+            vu.journey()
+            with lock:
+                journeys[0] += 1
+
+    threads = [threading.Thread(target=loop, args=(vu,), daemon=True) for vu in vusers]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return vusers, journeys[0], time.monotonic() - started
+
+
+def probe_supabase_calls(env, args):
+    """
+    Chamadas ao Supabase por página, em sequência, com um usuário que não participou da
+    carga: login, primeiro e segundo acesso ao início, dashboard e polling da API
+    """
+    probe_user = f'bench{args.seed_users:03d}'
+    if probe_user not in env.allowed:
+        return {}
+    vu = VirtualUser(env, probe_user, args.seed_users + 1, args, random.Random(0))
+    if not vu.apps:
+        return {}
+    app_key = vu.apps[0]
+    steps = (
+        ('login', vu.login),
+        ('index_first', lambda: vu._timed('index', 'GET', '/')),
+        ('index', lambda: vu._timed('index', 'GET', '/')),
+        ('dashboard', lambda: vu._timed('dashboard', 'GET', f'/proxy/{app_key}/')),
+        ('api_poll', lambda: vu._timed('api_poll', 'GET', f'/proxy/{app_key}/api/data')),
+    )
+    result = {}
+    for name, action in steps:
+        before = env.stub.stats()['calls']
+        action()
+        # Gravações em segundo plano (last_login) também contam para o passo
+        time.sleep(0.2)
+        result[name] = env.stub.stats()['calls'] - before
+    return result
+
+
+def build_report(env, args, vusers, journeys, elapsed, db_before, db_after, memory_before):
+    samples = {}
+    errors = {}
+    total_requests = 0
+    for vu in vusers:
+        total_requests += vu.requests
+        for step, values in vu.samples.items():
+            samples.setdefault(step, []).extend(values)
+        for key, count in vu.errors.items():
+            errors[key] = errors.get(key, 0) + count
+    all_samples = [v for values in samples.values() for v in values]
+    db_calls = db_after['calls'] - db_before['calls']
+    by_table = {
+        table: count - db_before['by_table'].get(table, 0)
+        for table, count in db_after['by_table'].items()
+        if count - db_before['by_table'].get(table, 0)
+    }
+    return {
+        'scenario': {
+            'users': args.users, 'duration_s': args.duration, 'workers': args.workers, 'threads': args.threads,
+            'think_ms': args.think_ms, 'polls': args.polls, 'db_latency_ms': args.db_latency_ms,
+            'bcrypt_rounds': args.bcrypt_rounds, 'page_profile': args.page_profile or 'auto', 'seed': args.seed,
+        },
+        'elapsed_s': round(elapsed, 2),
+        'requests': total_requests,
+        'journeys': journeys,
+        'throughput_rps': round(total_requests / elapsed, 1) if elapsed else 0,
+        'journeys_per_s': round(journeys / elapsed, 2) if elapsed else 0,
+        'latency': {'all': summarize(all_samples), **{step: summarize(v) for step, v in sorted(samples.items())}},
+        'errors': errors,
+        'supabase': {
+            'calls': db_calls,
+            'calls_per_request': round(db_calls / total_requests, 3) if total_requests else 0,
+            'by_table': by_table,
+            'calls_per_page': probe_supabase_calls(env, args),
+        },
+        'memory': {'before': memory_before, 'after': env.memory()},
+    }
+
+
+def print_report(report):
+    print(f"\nDuração: {report['elapsed_s']}s  requisições: {report['requests']}  jornadas: {report['journeys']}")
+    print(f"Vazão: {report['throughput_rps']} req/s  ({report['journeys_per_s']} jornadas/s)")
+    print(f"\n{'passo':<12} {'n':>7} {'média':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'máx':>9}  (ms)")
+    for step, s in report['latency'].items():
+        if s.get('count'):
+            print(f"{step:<12} {s['count']:>7} {s['mean_ms']:>9} {s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9} {s['max_ms']:>9}")
+    sb = report['supabase']
+    print(f"\nSupabase: {sb['calls']} chamadas, {sb['calls_per_request']} por requisição")
+    print(f"  por tabela: {sb['by_table']}")
+    print(f"  por página (usuário novo, em sequência): {sb['calls_per_page']}")
+    mem = report['memory']['after']
+    print(f"\nMemória: master {mem.get('master_mb')} MB, workers {mem.get('workers_mb')} MB")
+    if report['errors']:
+        print(f"\nErros/status inesperados: {report['errors']}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Teste de carga local do portal (upstreams e Supabase de mentira)')
+    parser.add_argument('--users', type=int, default=20, help='usuários virtuais simultâneos')
+    parser.add_argument('--seed-users', type=int, default=None, help='usuários cadastrados no stub (padrão: users + 10)')
+    parser.add_argument('--duration', type=float, default=30, help='duração da carga (segundos)')
+    parser.add_argument('--workers', type=int, default=2, help='workers do gunicorn')
+    parser.add_argument('--threads', type=int, default=4, help='threads por worker')
+    parser.add_argument('--think-ms', type=int, default=100, help='pausa entre pollings da API')
+    parser.add_argument('--polls', type=int, default=5, help='pollings da API por jornada')
+    parser.add_argument('--slow-rate', type=float, default=0.05, help='fração das jornadas que chama o endpoint lento')
+    parser.add_argument('--fail-rate', type=float, default=0.05, help='fração das jornadas que chama o endpoint com erro')
+    parser.add_argument('--relogin-rate', type=float, default=0.05, help='fração das jornadas que refaz o login')
+    parser.add_argument('--db-latency-ms', type=float, default=10, help='latência simulada do Supabase por chamada')
+    parser.add_argument('--bcrypt-rounds', type=int, default=12, help='custo do bcrypt dos usuários')
+    parser.add_argument('--page-profile', choices=('small', 'medium', 'large'), default=None,
+                        help='tamanho do HTML de todas as apps (padrão: varia por app)')
+    parser.add_argument('--port', type=int, default=0, help='porta do portal (padrão: livre)')
+    parser.add_argument('--seed', type=int, default=1, help='semente das escolhas das jornadas')
+    parser.add_argument('--json', dest='json_path', help='grava o relatório em JSON neste arquivo')
+    args = parser.parse_args(argv)
+    if args.seed_users is None:
+        args.seed_users = args.users + 10
+    args.seed_users = max(args.seed_users, args.users + 1)
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    env = Environment(args)
+    try:
+        print(f"Subindo {args.workers} workers x {args.threads} threads e stubs (logs: {env.tmpdir}) ...")
+        env.start()
+        memory_before = env.memory()
+        db_before = env.stub.stats()
+        vusers, journeys, elapsed = run_load(env, args)
+        db_after = env.stub.stats()
+        report = build_report(env, args, vusers, journeys, elapsed, db_before, db_after, memory_before)
+    finally:
+        env.stop()
+    print_report(report)
+    if args.json_path:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json_path)), exist_ok=True)
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nRelatório gravado em {args.json_path}")
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,364 @@
+"""
+Gate de regressão de performance
+Roda o teste de carga (load_test.py) e o microbenchmark da reescrita (rewrite_bench.py),
+extrai as métricas dos caminhos quentes (vazão, p95 por passo, chamadas ao Supabase por
+página, RSS dos workers, ns/byte e pico de memória da reescrita) e compara com a baseline
+gravada no repositório (bench/baselines/). Sai com código 1 se alguma métrica piorar além
+da tolerância ou sumir do resultado de uma parte que rodou.
+
+Cada parte roda várias vezes (--runs) e vale a mediana de cada métrica; a baseline guarda
+também a dispersão observada entre as rodadas, e o limite efetivo nunca fica abaixo de
+NOISE_FACTOR vezes essa dispersão.
+
+Uso:
+    python bench/regression.py                         # roda e compara com bench/baselines/default.json
+    python bench/regression.py --update                # roda e grava o resultado como nova baseline
+    python bench/regression.py --only rewrite          # apenas a reescrita (não sobe o portal)
+    python bench/regression.py --only rewrite --runs 5 # mediana de 5 rodadas de cada parte
+    python bench/regression.py --load-report carga.json --rewrite-report rewrite.json   # relatórios já gerados
+    python bench/regression.py --tolerance 'load.latency.*=60%' --tolerance 'load.supabase.calls_per_page.*=1'
+"""
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+BASELINES_DIR = os.path.join(BENCH_DIR, 'baselines')
+sys.path.insert(0, BENCH_DIR)
+
+# Cenário padrão do gate (menor que o padrão do load_test para caber num pré-deploy)
+DEFAULT_LOAD_SCENARIO = {
+    'users': 10, 'duration_s': 20, 'workers': 2, 'threads': 4, 'think_ms': 100, 'polls': 5,
+    'db_latency_ms': 10, 'bcrypt_rounds': 12, 'page_profile': 'auto', 'seed': 1, 'runs': 3,
+}
+# Rodadas de cada parte (mediana): numa VM compartilhada uma rodada isolada varia 20-50%
+DEFAULT_REWRITE_SCENARIO = {'profiles': ['small', 'medium', 'large'], 'runs': 3}
+# Opções do load_test para cada chave do cenário
+LOAD_FLAGS = {
+    'users': '--users', 'duration_s': '--duration', 'workers': '--workers', 'threads': '--threads',
+    'think_ms': '--think-ms', 'polls': '--polls', 'db_latency_ms': '--db-latency-ms',
+    'bcrypt_rounds': '--bcrypt-rounds', 'page_profile': '--page-profile', 'seed': '--seed',
+}
+
+# Tolerâncias padrão (padrão fnmatch -> limite); vale o último padrão que casar.
+# '15%' = variação relativa à baseline; '0' = variação absoluta (na unidade da métrica)
+DEFAULT_TOLERANCES = (
+    ('*', '15%'),
+    # Medido na VM de referência: p95 de uma rodada variou até ~50%; mediana de 3 rodadas, até ~25%
+    ('load.latency.*', '40%'),
+    # Poucos logins por rodada (bcrypt domina): p95 ~ máximo
+    ('load.latency.login.p95_ms', '50%'),
+    ('load.errors', '0'),
+    ('load.supabase.calls_per_page.*', '0'),
+    ('load.memory.*', '15%'),
+    # Medido na VM de referência (1 CPU): rodada isolada variou até ~30%; mediana de 3 rodadas, até ~10%
+    ('rewrite.*.ns_per_byte', '25%'),
+    ('rewrite.*.peak_alloc_ratio', '10%'),
+    ('rewrite.equivalence_mismatch', '0'),
+)
+# Métricas em que maior é melhor (as demais: menor é melhor)
+HIGHER_IS_BETTER = ('load.throughput_rps', 'load.journeys_per_s')
+# Passos com menos amostras que isso não entram (p95 de 3-5 chamadas é ruído)
+MIN_LATENCY_SAMPLES = 10
+# Contagens que não são ruído: vale o pior valor entre as rodadas, não a mediana
+WORST_OF_RUNS = ('load.errors', 'load.supabase.calls_per_page.*', 'rewrite.equivalence_mismatch')
+# Limite efetivo >= NOISE_FACTOR x dispersão relativa ((máx - mín) / mediana) gravada na baseline
+NOISE_FACTOR = 2.0
+
+
+def extract_load_metrics(report):
+    """Métricas comparáveis de um relatório do load_test"""
+    metrics = {
+        'load.throughput_rps': report['throughput_rps'],
+        'load.journeys_per_s': report['journeys_per_s'],
+        'load.errors': sum(report.get('errors', {}).values()),
+        'load.supabase.calls_per_request': report['supabase']['calls_per_request'],
+    }
+    for step, summary in report['latency'].items():
+        if summary.get('count', 0) >= MIN_LATENCY_SAMPLES:
+            metrics[f'load.latency.{step}.p95_ms'] = summary['p95_ms']
+    for page, calls in report['supabase'].get('calls_per_page', {}).items():
+        metrics[f'load.supabase.calls_per_page.{page}'] = calls
+    memory = report['memory']['after']
+    for key in ('master_mb', 'worker_max_mb', 'worker_avg_mb'):
+        if memory.get(key) is not None:
+            metrics[f'load.memory.{key}'] = memory[key]
+    return metrics
+
+
+def extract_rewrite_metrics(report):
+    """Métricas comparáveis de um relatório do rewrite_bench"""
+    summary = report['summary']
+    metrics = {
+        'rewrite.all.ns_per_byte': summary['ns_per_byte'],
+        'rewrite.equivalence_mismatch': len(report['equivalence']['mismatch']),
+    }
+    for profile, s in summary['by_profile'].items():
+        metrics[f'rewrite.{profile}.ns_per_byte'] = s['total_ns_per_byte']
+        if 'peak_alloc_ratio' in s:
+            metrics[f'rewrite.{profile}.peak_alloc_ratio'] = s['peak_alloc_ratio']
+    return metrics
+
+
+def run_load(scenario):
+    """Relatórios de scenario['runs'] rodadas da carga (cada uma sobe o portal de novo)"""
+    import load_test
+    argv = []
+    for key, flag in LOAD_FLAGS.items():
+        value = scenario.get(key)
+        if value is None or (key == 'page_profile' and value == 'auto'):
+            continue
+        argv += [flag, str(value)]
+    reports = []
+    for i in range(scenario.get('runs', 1)):
+        print(f"\nRodada {i + 1}/{scenario.get('runs', 1)} da carga")
+        reports.append(load_test.main(argv))
+    return reports
+
+
+def run_rewrite(scenario):
+    """Relatórios de scenario['runs'] rodadas (alocação medida só na primeira: é determinística)"""
+    import rewrite_bench
+    argv = ['--profiles', *scenario['profiles']]
+    reports = []
+    for i in range(scenario.get('runs', 1)):
+        print(f"\nRodada {i + 1}/{scenario.get('runs', 1)} da reescrita")
+        reports.append(rewrite_bench.main(argv if i == 0 else argv + ['--no-alloc']))
+    return reports
+
+
+def median_metrics(runs):
+    """Mediana de cada métrica entre as rodadas e dispersão relativa ((máx - mín) / mediana)"""
+    metrics, noise = {}, {}
+    for metric in sorted(set().union(*runs)):
+        values = [run[metric] for run in runs if metric in run]
+        if any(fnmatch.fnmatchcase(metric, pattern) for pattern in WORST_OF_RUNS):
+            metrics[metric] = max(values)
+            continue
+        metrics[metric] = statistics.median(values)
+        if len(values) > 1 and metrics[metric]:
+            noise[metric] = round((max(values) - min(values)) / abs(metrics[metric]), 3)
+    return metrics, noise
+
+
+def git_commit():
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True, timeout=10
+        )
+        return result.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def parse_tolerance(spec):
+    """'15%' -> ('rel', 0.15); '2' -> ('abs', 2.0)"""
+    spec = spec.strip()
+    if spec.endswith('%'):
+        return 'rel', float(spec[:-1]) / 100.0
+    return 'abs', float(spec)
+
+
+def tolerance_for(metric, tolerances):
+    spec = '15%'
+    for pattern, value in tolerances:
+        if fnmatch.fnmatchcase(metric, pattern):
+            spec = value
+    return spec
+
+
+def compare(baseline, current, tolerances, parts=None, noise=None):
+    """
+    Linhas do relatório: (métrica, baseline, atual, delta %, limite, status)
+    parts: partes que rodaram ('load', 'rewrite'); métrica da baseline que falta numa delas é
+    AUSENTE (falha). noise: dispersão relativa gravada na baseline (alarga limites relativos).
+    """
+    rows = []
+    noise = noise or {}
+    for metric in sorted(set(baseline) | set(current)):
+        base, value = baseline.get(metric), current.get(metric)
+        spec = tolerance_for(metric, tolerances)
+        if base is None:
+            rows.append((metric, None, value, None, spec, 'novo'))
+            continue
+        if value is None:
+            ran = parts is None or metric.split('.', 1)[0] in parts
+            rows.append((metric, base, None, None, spec, 'AUSENTE' if ran else 'ausente'))
+            continue
+        kind, limit = parse_tolerance(spec)
+        if kind == 'rel' and NOISE_FACTOR * noise.get(metric, 0) > limit:
+            limit = NOISE_FACTOR * noise[metric]
+            spec = f'{limit * 100:.0f}%~'
+        # Positivo = piorou (respeitando a direção da métrica)
+        worse_by = (base - value) if metric in HIGHER_IS_BETTER else (value - base)
+        allowed = limit * abs(base) if kind == 'rel' else limit
+        delta_pct = ((value - base) / abs(base) * 100.0) if base else None
+        if worse_by > allowed:
+            status = 'REGRESSÃO'
+        elif -worse_by > allowed:
+            status = 'melhorou'
+        else:
+            status = 'ok'
+        rows.append((metric, base, value, delta_pct, spec, status))
+    return rows
+
+
+def _fmt(value):
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return f'{value:.2f}'
+    return str(value)
+
+
+def print_comparison(rows, baseline_doc, current_doc, baseline_path):
+    print(f"\nBaseline: {os.path.relpath(baseline_path, REPO_DIR)} "
+          f"(commit {baseline_doc.get('commit') or '?'}, {baseline_doc.get('created', '?')}, {baseline_doc.get('host', '?')})")
+    print(f"Atual:    commit {current_doc.get('commit') or '?'}, {current_doc.get('created', '?')}, {current_doc.get('host', '?')}")
+    for part, scenario in current_doc.get('scenario', {}).items():
+        if part in baseline_doc.get('scenario', {}) and baseline_doc['scenario'][part] != scenario:
+            print(f"  Atenção: cenário '{part}' diferente da baseline: {baseline_doc['scenario'][part]} -> {scenario}")
+    if baseline_doc.get('host') != current_doc.get('host'):
+        print("  Atenção: máquina diferente da baseline; tempos e vazão podem não ser comparáveis")
+    width = max([len(r[0]) for r in rows] + [7])
+    print(f"\n{'métrica':<{width}} {'baseline':>11} {'atual':>11} {'delta':>8} {'limite':>7}  status")
+    for metric, base, value, delta_pct, spec, status in rows:
+        delta = f'{delta_pct:+.1f}%' if delta_pct is not None else '-'
+        print(f"{metric:<{width}} {_fmt(base):>11} {_fmt(value):>11} {delta:>8} {spec:>7}  {status}")
+    regressions = [r for r in rows if r[5] == 'REGRESSÃO']
+    missing = [r for r in rows if r[5] == 'AUSENTE']
+    improvements = [r for r in rows if r[5] == 'melhorou']
+    print(f"\n{len(rows)} métricas: {len(regressions)} regressões, {len(missing)} ausentes, {len(improvements)} melhorias")
+    if any(spec.endswith('~') for *_, spec, _ in rows):
+        print("  (limite~ = alargado pela dispersão entre rodadas gravada na baseline)")
+    for metric, base, value, delta_pct, spec, _ in regressions:
+        delta = f' ({delta_pct:+.1f}%)' if delta_pct is not None else ''
+        print(f"  REGRESSÃO {metric}: {_fmt(base)} -> {_fmt(value)}{delta}, tolerância {spec}")
+    for metric, *_ in missing:
+        print(f"  AUSENTE {metric}: está na baseline mas não no resultado atual (ex.: passo com menos de "
+              f"{MIN_LATENCY_SAMPLES} amostras)")
+    if improvements and not regressions:
+        print("  Melhorias além da tolerância: considere gravar uma nova baseline (--update)")
+
+
+def collect(args, baseline_doc):
+    """Resultado atual (mesmo formato da baseline): de relatórios gravados ou rodando os benchmarks"""
+    if args.current:
+        with open(args.current, encoding='utf-8') as f:
+            return json.load(f)
+    scenarios = baseline_doc.get('scenario', {})
+    doc = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'host': f'{platform.node()} ({platform.machine()}, {os.cpu_count()} CPUs, Python {platform.python_version()})',
+        'scenario': {},
+        'metrics': {},
+        'noise': {},
+    }
+    parts = ('load', 'rewrite') if args.only is None else (args.only,)
+    if 'load' in parts:
+        if args.load_report:
+            with open(args.load_report, encoding='utf-8') as f:
+                load_reports = [json.load(f)]
+        else:
+            scenario = {**DEFAULT_LOAD_SCENARIO, **scenarios.get('load', {})}
+            if args.runs:
+                scenario['runs'] = args.runs
+            load_reports = run_load(scenario)
+        metrics, noise = median_metrics([extract_load_metrics(r) for r in load_reports])
+        doc['scenario']['load'] = {**load_reports[0]['scenario'], 'runs': len(load_reports)}
+        doc['metrics'].update(metrics)
+        doc['noise'].update(noise)
+    if 'rewrite' in parts:
+        if args.rewrite_report:
+            with open(args.rewrite_report, encoding='utf-8') as f:
+                rewrite_reports = [json.load(f)]
+            scenario = {'profiles': list(rewrite_reports[0]['summary']['by_profile']), 'runs': 1}
+        else:
+            scenario = {**DEFAULT_REWRITE_SCENARIO, **scenarios.get('rewrite', {})}
+            if args.runs:
+                scenario['runs'] = args.runs
+            rewrite_reports = run_rewrite(scenario)
+        metrics, noise = median_metrics([extract_rewrite_metrics(r) for r in rewrite_reports])
+        doc['scenario']['rewrite'] = scenario
+        doc['metrics'].update(metrics)
+        doc['noise'].update(noise)
+    return doc
+
+
+def write_json(path, doc):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(doc, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Gate de regressão de performance (compara com a baseline)')
+    parser.add_argument('--baseline', default=os.path.join(BASELINES_DIR, 'default.json'),
+                        help='arquivo da baseline (padrão: bench/baselines/default.json)')
+    parser.add_argument('--only', choices=('load', 'rewrite'), default=None, help='roda apenas uma parte')
+    parser.add_argument('--load-report', help='usa este relatório do load_test (--json) em vez de rodar a carga')
+    parser.add_argument('--rewrite-report', help='usa este relatório do rewrite_bench (--json) em vez de medir')
+    parser.add_argument('--runs', type=int, default=None,
+                        help='rodadas de cada parte; vale a mediana (padrão: o da baseline, ou 3)')
+    parser.add_argument('--current', help='compara este resultado gravado com --save em vez de rodar')
+    parser.add_argument('--tolerance', action='append', default=[], metavar='PADRÃO=LIMITE',
+                        help="sobrescreve a tolerância das métricas que casam com o padrão (ex.: 'load.latency.*=60%%')")
+    parser.add_argument('--save', help='grava o resultado atual neste arquivo (mesmo formato da baseline)')
+    parser.add_argument('--update', action='store_true',
+                        help='grava o resultado atual como baseline (mantém as métricas das partes não rodadas)')
+    args = parser.parse_args(argv)
+    for spec in args.tolerance:
+        pattern, sep, value = spec.partition('=')
+        if not sep:
+            parser.error(f"tolerância inválida: {spec} (use PADRÃO=LIMITE)")
+        try:
+            parse_tolerance(value)
+        except ValueError:
+            parser.error(f"limite inválido: {value} (ex.: 15% ou 2)")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    baseline_doc = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline_doc = json.load(f)
+    current_doc = collect(args, baseline_doc)
+    if args.save:
+        write_json(args.save, current_doc)
+        print(f"\nResultado gravado em {args.save}")
+
+    if args.update:
+        merged = dict(current_doc)
+        merged['scenario'] = {**baseline_doc.get('scenario', {}), **current_doc['scenario']}
+        merged['metrics'] = {**baseline_doc.get('metrics', {}), **current_doc['metrics']}
+        merged['noise'] = {
+            **{k: v for k, v in baseline_doc.get('noise', {}).items() if k not in current_doc['metrics']},
+            **current_doc.get('noise', {}),
+        }
+        write_json(args.baseline, merged)
+        print(f"\nBaseline atualizada em {args.baseline} ({len(merged['metrics'])} métricas)")
+        return 0
+    if not baseline_doc:
+        print(f"\nSem baseline em {args.baseline}; rode com --update para criar")
+        return 1
+
+    tolerances = list(DEFAULT_TOLERANCES) + [tuple(spec.split('=', 1)) for spec in args.tolerance]
+    rows = compare(baseline_doc.get('metrics', {}), current_doc['metrics'], tolerances,
+                   parts=set(current_doc.get('scenario', {})), noise=baseline_doc.get('noise'))
+    print_comparison(rows, baseline_doc, current_doc, args.baseline)
+    return 1 if any(r[5] in ('REGRESSÃO', 'AUSENTE') for r in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
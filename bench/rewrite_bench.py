@@ -0,0 +1,213 @@
+"""
+Microbenchmark da reescrita de HTML do proxy
+Roda o pipeline de proxy_rewrite (reescrita de URLs + injeção do botão/script) sobre um
+corpus de páginas geradas por stub_upstream (uma por app do routes.json, em cada perfil:
+pequena, média e com vários MB) e reporta ns/byte por etapa, pico de memória alocada e
+equivalência da saída contra os digests de referência (rewrite_golden.json).
+
+Uso:
+    python bench/rewrite_bench.py --json bench/results/rewrite.json
+    python bench/rewrite_bench.py --profiles small medium    # rodada rápida
+    python bench/rewrite_bench.py --update-golden    # após mudança intencional na saída
+"""
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from proxy_rewrite import inject_proxy_ui, rewrite_html, rewrite_urls  # noqa: E402
+from stub_upstream import PAGE_PROFILES, render_page  # noqa: E402
+
+ROUTES_FILE = os.path.join(REPO_DIR, 'config', 'proxy', 'routes.json')
+GOLDEN_FILE = os.path.join(BENCH_DIR, 'rewrite_golden.json')
+
+
+def load_corpus(profiles, apps=None):
+    """Páginas (app_key, perfil, target_url, html) para cada rota configurada"""
+    with open(ROUTES_FILE, encoding='utf-8') as f:
+        routes = json.load(f)['routes']
+    corpus = []
+    for app_key, target_url in routes.items():
+        if apps and app_key not in apps:
+            continue
+        for profile in profiles:
+            html = render_page(app_key, profile, target_url.rstrip('/'))
+            corpus.append((app_key, profile, target_url, html))
+    return corpus
+
+
+def digest(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def time_call(func, args, min_time, min_runs):
+    """Tempos (segundos) de execuções repetidas até min_time e pelo menos min_runs"""
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < min_runs or time.perf_counter() - started < min_time:
+        t0 = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def traced_run(func, args):
+    """Uma execução sob tracemalloc: (resultado, pico de memória alocada em bytes)"""
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        result = func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak - base
+
+
+def bench_case(app_key, profile, target_url, html, args):
+    size = len(html.encode('utf-8'))
+    if args.no_alloc:
+        output, peak = rewrite_html(html, app_key, target_url), None
+    else:
+        output, peak = traced_run(rewrite_html, (html, app_key, target_url))
+    rewritten = rewrite_urls(html, app_key, target_url)
+    # Total = soma das medianas das etapas (medir o pipeline inteiro de novo dobraria o tempo nas páginas grandes)
+    stages = {
+        'urls': statistics.median(time_call(rewrite_urls, (html, app_key, target_url), args.min_time, args.min_runs)),
+        'inject': statistics.median(time_call(inject_proxy_ui, (rewritten, app_key), args.min_time, args.min_runs)),
+    }
+    stages['total'] = stages['urls'] + stages['inject']
+    case = {
+        'app': app_key,
+        'profile': profile,
+        'bytes_in': size,
+        'bytes_out': len(output.encode('utf-8')),
+        'sha256': digest(output),
+    }
+    for stage in ('total', 'urls', 'inject'):
+        case[f'{stage}_ms'] = round(stages[stage] * 1000, 3)
+        case[f'{stage}_ns_per_byte'] = round(stages[stage] * 1e9 / size, 2)
+    if peak is not None:
+        case['peak_alloc_kb'] = round(peak / 1024, 1)
+        case['peak_alloc_ratio'] = round(peak / size, 2)
+    return case
+
+
+def check_equivalence(cases, golden):
+    """Compara os digests com a referência: {'ok': n, 'mismatch': [...], 'missing': [...]}"""
+    result = {'ok': 0, 'mismatch': [], 'missing': []}
+    for case in cases:
+        name = f"{case['app']}/{case['profile']}"
+        expected = golden.get(name)
+        if expected is None:
+            result['missing'].append(name)
+        elif expected['sha256'] != case['sha256']:
+            result['mismatch'].append(name)
+        else:
+            result['ok'] += 1
+    return result
+
+
+def build_report(cases, equivalence):
+    by_profile = {}
+    for profile in PAGE_PROFILES:
+        selected = [c for c in cases if c['profile'] == profile]
+        if not selected:
+            continue
+        by_profile[profile] = {
+            'cases': len(selected),
+            'bytes_in_avg': int(statistics.mean(c['bytes_in'] for c in selected)),
+            'total_ns_per_byte': round(statistics.median(c['total_ns_per_byte'] for c in selected), 2),
+            'urls_ns_per_byte': round(statistics.median(c['urls_ns_per_byte'] for c in selected), 2),
+            'inject_ns_per_byte': round(statistics.median(c['inject_ns_per_byte'] for c in selected), 2),
+        }
+        if 'peak_alloc_ratio' in selected[0]:
+            by_profile[profile]['peak_alloc_ratio'] = round(max(c['peak_alloc_ratio'] for c in selected), 2)
+    total_bytes = sum(c['bytes_in'] for c in cases)
+    total_ms = sum(c['total_ms'] for c in cases)
+    return {
+        'scenario': 'rewrite',
+        'cases': cases,
+        'summary': {
+            'cases': len(cases),
+            'ns_per_byte': round(total_ms * 1e6 / total_bytes, 2) if total_bytes else 0.0,
+            'by_profile': by_profile,
+        },
+        'equivalence': equivalence,
+    }
+
+
+def print_report(report, verbose=False):
+    if verbose:
+        print(f"\n{'app':<40} {'perfil':<7} {'KB':>7} {'ms':>9} {'ns/B':>7} {'urls':>7} {'inject':>7} {'pico/B':>7}")
+        for c in report['cases']:
+            print(f"{c['app'][:40]:<40} {c['profile']:<7} {c['bytes_in'] // 1024:>7} {c['total_ms']:>9} "
+                  f"{c['total_ns_per_byte']:>7} {c['urls_ns_per_byte']:>7} {c['inject_ns_per_byte']:>7} "
+                  f"{c.get('peak_alloc_ratio', '-'):>7}")
+    summary = report['summary']
+    print(f"\n{'perfil':<8} {'casos':>6} {'KB médio':>9} {'ns/B':>8} {'urls':>8} {'inject':>8} {'pico/B':>8}")
+    for profile, s in summary['by_profile'].items():
+        print(f"{profile:<8} {s['cases']:>6} {s['bytes_in_avg'] // 1024:>9} {s['total_ns_per_byte']:>8} "
+              f"{s['urls_ns_per_byte']:>8} {s['inject_ns_per_byte']:>8} {s.get('peak_alloc_ratio', '-'):>8}")
+    print(f"\nGeral: {summary['ns_per_byte']} ns/byte em {summary['cases']} páginas")
+    eq = report['equivalence']
+    print(f"Equivalência: {eq['ok']} iguais à referência, {len(eq['mismatch'])} diferentes, {len(eq['missing'])} sem referência")
+    for name in eq['mismatch']:
+        print(f"  saída diferente: {name}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Microbenchmark da reescrita de HTML do proxy')
+    parser.add_argument('--profiles', nargs='+', choices=tuple(PAGE_PROFILES), default=list(PAGE_PROFILES),
+                        help='perfis de página do corpus')
+    parser.add_argument('--apps', nargs='+', default=None, help='apenas estas apps (padrão: todas do routes.json)')
+    parser.add_argument('--min-time', type=float, default=0.3, help='tempo mínimo de medição por etapa e página (s)')
+    parser.add_argument('--min-runs', type=int, default=1, help='execuções mínimas por etapa e página')
+    parser.add_argument('--no-alloc', action='store_true', help='não medir alocações (tracemalloc é lento)')
+    parser.add_argument('--update-golden', action='store_true',
+                        help='grava os digests atuais como referência (após mudança intencional na saída)')
+    parser.add_argument('--verbose', action='store_true', help='mostra cada página')
+    parser.add_argument('--json', dest='json_path', help='grava o relatório em JSON neste arquivo')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    corpus = load_corpus(args.profiles, args.apps)
+    print(f"Medindo {len(corpus)} páginas ({', '.join(args.profiles)}) ...")
+    cases = [bench_case(*page, args) for page in corpus]
+
+    golden = {}
+    if os.path.exists(GOLDEN_FILE):
+        with open(GOLDEN_FILE, encoding='utf-8') as f:
+            golden = json.load(f)
+    if args.update_golden:
+        for c in cases:
+            golden[f"{c['app']}/{c['profile']}"] = {'sha256': c['sha256'], 'bytes_out': c['bytes_out']}
+        with open(GOLDEN_FILE, 'w', encoding='utf-8') as f:
+            json.dump(dict(sorted(golden.items())), f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        print(f"Referência atualizada em {GOLDEN_FILE}")
+
+    report = build_report(cases, check_equivalence(cases, golden))
+    print_report(report, args.verbose)
+    if args.json_path:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json_path)), exist_ok=True)
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nRelatório gravado em {args.json_path}")
+    return report
+
+
+if __name__ == '__main__':
+    # Saída diferente da referência: código 1
+    if main()['equivalence']['mismatch']:
+        sys.exit(1)
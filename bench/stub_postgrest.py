@@ -0,0 +1,352 @@
+"""
+Stub compatível com PostgREST para os benchmarks
+Atende /rest/v1/<tabela> com o subconjunto usado pelo portal (select com embeds,
+filtros eq/neq/gt/gte/lt/lte/like/ilike/in/is, or=(...), order, limit/offset/Range,
+count=exact, insert/upsert/update/delete) sobre as tabelas maestro_* em memória.
+Conta as chamadas por tabela (GET /__stats) e simula a latência de rede do Supabase.
+"""
+import fnmatch
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import bcrypt
+
+# Relações muitos-para-um usadas nos embeds: (tabela, tabela embutida) -> coluna FK
+RELATIONS = {
+    ('maestro_users', 'maestro_user_groups'): 'group_id',
+    ('maestro_user_application_access', 'maestro_applications'): 'application_id',
+    ('maestro_user_portal_app_access', 'maestro_portal_applications'): 'portal_app_id',
+}
+
+BENCH_PASSWORD = 'Bench#2025'
+GROUPS = ('administrador', 'maestro_full', 'operacao')
+# Dashboards que vão para a aba Dashboards (section='portal_dashboard')
+PORTAL_DASHBOARD_KEYS = ('dashboard-ocupacao-hoje', 'inspecao-final-estoque')
+# Apps da aba Aplicações (maestro_portal_applications)
+PORTAL_APP_KEYS = ('gestao-estoque-sap', 'apontamento-inspecao-final', 'etiquetas-montagem', 'portal-procedimentos')
+
+
+def build_seed(routes, users=50, bcrypt_rounds=12, apps_per_user=4):
+    """
+    Tabelas maestro_* para o cenário: grupos, aplicações (uma por rota), usuários
+    bench001..benchNNN (1 administrador, ~10% maestro_full, resto operação) e concessões.
+    Retorna (tabelas, {username: [app_keys permitidos]})
+    """
+    password_hash = bcrypt.hashpw(BENCH_PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds=bcrypt_rounds)).decode('utf-8')
+    groups = [{'id': i + 1, 'name': name, 'description': name} for i, name in enumerate(GROUPS)]
+    group_id = {g['name']: g['id'] for g in groups}
+    applications = []
+    portal_apps = []
+    for key in routes:
+        if key in PORTAL_APP_KEYS:
+            portal_apps.append({
+                'id': len(portal_apps) + 1, 'key': key, 'name': key.replace('-', ' ').title(),
+                'description': None, 'url': f'/proxy/{key}', 'active': True,
+            })
+            continue
+        applications.append({
+            'id': len(applications) + 1, 'name': key, 'url_proxy': key,
+            'display_name': key.replace('-', ' ').title(), 'icon': '📊', 'color': '#3b82f6',
+            'active': True, 'section': 'portal_dashboard' if key in PORTAL_DASHBOARD_KEYS else 'main',
+        })
+    main_apps = [a for a in applications if a['section'] == 'main']
+    maestro_users = []
+    app_access = []
+    portal_access = []
+    allowed = {}
+    for n in range(1, users + 1):
+        username = f'bench{n:03d}'
+        if n == 1:
+            group = 'administrador'
+        elif n % 10 == 0:
+            group = 'maestro_full'
+        else:
+            group = 'operacao'
+        maestro_users.append({
+            'id': n, 'username': username, 'username_lower': username, 'email': f'{username}@bench.local',
+            'password_hash': password_hash, 'active': True, 'group_id': group_id[group],
+            'portal_tab_access': n % 3 == 0, 'last_login': None, 'created_at': '2025-01-01T00:00:00+00:00',
+        })
+        if group == 'operacao':
+            granted = [main_apps[(n + i) % len(main_apps)] for i in range(min(apps_per_user, len(main_apps)))]
+            for app in granted:
+                app_access.append({'id': len(app_access) + 1, 'user_id': n, 'application_id': app['id'], 'granted_by': 1})
+            if n % 3 == 0 and portal_apps:
+                portal_access.append({'id': len(portal_access) + 1, 'user_id': n, 'portal_app_id': portal_apps[n % len(portal_apps)]['id']})
+            allowed[username] = [app['url_proxy'] for app in granted]
+        else:
+            allowed[username] = [app['url_proxy'] for app in main_apps]
+    tables = {
+        'maestro_user_groups': groups,
+        'maestro_applications': applications,
+        'maestro_portal_applications': portal_apps,
+        'maestro_users': maestro_users,
+        'maestro_user_application_access': app_access,
+        'maestro_user_portal_app_access': portal_access,
+    }
+    return tables, allowed
+
+
+def _as_text(value):
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if value is None:
+        return 'null'
+    return str(value)
+
+
+def _split_top(text, sep=','):
+    """Divide por `sep` fora de parênteses"""
+    parts, depth, current = [], 0, []
+    for ch in text:
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        if ch == sep and depth == 0:
+            parts.append(''.join(current))
+            current = []
+        else:
+            current.append(ch)
+    if current:
+        parts.append(''.join(current))
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _matches(row, column, expr):
+    """Avalia um filtro PostgREST 'op.valor' (com 'not.' opcional) sobre a linha"""
+    negate = expr.startswith('not.')
+    if negate:
+        expr = expr[4:]
+    op, _, value = expr.partition('.')
+    actual = row.get(column)
+    text = _as_text(actual)
+    if op == 'eq':
+        result = text == value
+    elif op == 'neq':
+        result = text != value
+    elif op in ('gt', 'gte', 'lt', 'lte'):
+        try:
+            a, b = float(actual), float(value)
+        except (TypeError, ValueError):
+            a, b = text, value
+        result = {'gt': a > b, 'gte': a >= b, 'lt': a < b, 'lte': a <= b}[op]
+    elif op in ('like', 'ilike'):
+        pattern = value.replace('%', '*')
+        result = actual is not None and (
+            fnmatch.fnmatchcase(text.lower(), pattern.lower()) if op == 'ilike' else fnmatch.fnmatchcase(text, pattern)
+        )
+    elif op == 'in':
+        options = [v.strip().strip('"') for v in value.strip('()').split(',')]
+        result = text in options
+    elif op == 'is':
+        result = text == value
+    else:
+        raise ValueError(f'operador não suportado: {op}')
+    return not result if negate else result
+
+
+def _matches_or(row, expr):
+    """or=(a.ilike.*x*,b.eq.1)"""
+    for cond in _split_top(expr.strip()[1:-1]):
+        column, _, rest = cond.partition('.')
+        if _matches(row, column, rest):
+            return True
+    return False
+
+
+class PostgrestStub:
+    """Servidor PostgREST de mentira com as tabelas em memória (thread-safe)"""
+
+    def __init__(self, tables, host='127.0.0.1', port=0, latency=0.0):
+        self.tables = {name: [dict(r) for r in rows] for name, rows in tables.items()}
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.calls_by_table = {}
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+        self.url = f'http://{self.host}:{self.port}'
+
+    # Consulta
+
+    def _project(self, table, row, select):
+        if not select or select == '*':
+            return dict(row)
+        result = {}
+        for item in _split_top(select):
+            if '(' in item:
+                rel, _, cols = item.partition('(')
+                rel = rel.split(':')[-1].split('!')[0].strip()
+                fk = RELATIONS.get((table, rel))
+                target = None
+                if fk is not None:
+                    target = next((r for r in self.tables.get(rel, []) if r.get('id') == row.get(fk)), None)
+                result[rel] = self._project(rel, target, cols[:-1].strip()) if target is not None else None
+            elif item == '*':
+                result.update(row)
+            else:
+                result[item] = row.get(item)
+        return result
+
+    def _filter(self, rows, params):
+        for key, value in params:
+            if key in ('select', 'order', 'limit', 'offset', 'on_conflict', 'columns'):
+                continue
+            if key == 'or':
+                rows = [r for r in rows if _matches_or(r, value)]
+            else:
+                rows = [r for r in rows if _matches(r, key, value)]
+        return rows
+
+    @staticmethod
+    def _order(rows, order):
+        for term in reversed(_split_top(order)):
+            column, _, direction = term.partition('.')
+            desc = direction.startswith('desc')
+            rows = sorted(rows, key=lambda r: (r.get(column) is None, _as_text(r.get(column)).lower()), reverse=desc)
+        return rows
+
+    def _next_id(self, table):
+        return max((r.get('id') or 0 for r in self.tables[table]), default=0) + 1
+
+    def handle(self, method, path, query, headers, body):
+        """Executa a requisição; retorna (status, headers, corpo bytes)"""
+        table = path[len('/rest/v1/'):].strip('/')
+        if table not in self.tables:
+            return 404, {}, json.dumps({'code': '42P01', 'message': f'relation "{table}" does not exist'}).encode()
+        params = parse_qsl(query, keep_blank_values=True)
+        args = dict(params)
+        prefer = headers.get('Prefer', '')
+        with self._lock:
+            self.calls += 1
+            self.calls_by_table[table] = self.calls_by_table.get(table, 0) + 1
+            rows = self.tables[table]
+            if method in ('GET', 'HEAD'):
+                matched = self._filter(rows, params)
+                if 'order' in args:
+                    matched = self._order(matched, args['order'])
+                total = len(matched)
+                start = int(args.get('offset', 0))
+                end = None
+                if 'limit' in args:
+                    end = start + int(args['limit'])
+                range_header = headers.get('Range')
+                if range_header and '-' in range_header:
+                    first, _, last = range_header.partition('-')
+                    start, end = int(first), int(last) + 1
+                page = matched[start:end]
+                data = [self._project(table, r, args.get('select', '*')) for r in page]
+                out_headers = {}
+                if 'count=exact' in prefer:
+                    last_index = start + len(page) - 1
+                    out_headers['Content-Range'] = f'{start}-{last_index}/{total}' if page else f'*/{total}'
+                status = 200
+            elif method == 'POST':
+                payload = json.loads(body or b'[]')
+                payload = payload if isinstance(payload, list) else [payload]
+                conflict_cols = [c.strip() for c in args.get('on_conflict', '').split(',') if c.strip()]
+                data = []
+                for new in payload:
+                    existing = None
+                    if conflict_cols:
+                        existing = next((r for r in rows if all(_as_text(r.get(c)) == _as_text(new.get(c)) for c in conflict_cols)), None)
+                    if existing is not None:
+                        if 'merge-duplicates' in prefer:
+                            existing.update(new)
+                            data.append(dict(existing))
+                        continue
+                    row = dict(new)
+                    row.setdefault('id', self._next_id(table))
+                    rows.append(row)
+                    data.append(dict(row))
+                out_headers = {}
+                status = 201
+            elif method == 'PATCH':
+                changes = json.loads(body or b'{}')
+                matched = self._filter(rows, params)
+                for r in matched:
+                    r.update(changes)
+                data = [dict(r) for r in matched]
+                out_headers = {}
+                status = 200
+            elif method == 'DELETE':
+                matched = self._filter(rows, params)
+                ids = {id(r) for r in matched}
+                self.tables[table] = [r for r in rows if id(r) not in ids]
+                data = [dict(r) for r in matched]
+                out_headers = {}
+                status = 200
+            else:
+                return 405, {}, b''
+        if 'application/vnd.pgrst.object+json' in headers.get('Accept', ''):
+            if len(data) != 1:
+                return 406, {}, json.dumps({'code': 'PGRST116', 'message': 'JSON object requested, multiple (or no) rows returned'}).encode()
+            data = data[0]
+        if method != 'GET' and method != 'HEAD' and 'return=representation' not in prefer:
+            return (204 if status == 200 else status), out_headers, b''
+        return status, out_headers, json.dumps(data, default=str).encode('utf-8')
+
+    # Estatísticas
+
+    def stats(self):
+        with self._lock:
+            return {'calls': self.calls, 'by_table': dict(self.calls_by_table)}
+
+    def reset_stats(self):
+        with self._lock:
+            self.calls = 0
+            self.calls_by_table = {}
+
+    # Servidor HTTP
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _dispatch(self):
+                parts = urlsplit(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                if parts.path == '/__stats':
+                    status, headers, payload = 200, {}, json.dumps(stub.stats()).encode()
+                elif parts.path.startswith('/rest/v1/'):
+                    if stub.latency:
+                        time.sleep(stub.latency)
+                    try:
+                        status, headers, payload = stub.handle(self.command, parts.path, parts.query, self.headers, body)
+                    except Exception as e:
+                        status, headers, payload = 400, {}, json.dumps({'code': 'PGRST100', 'message': str(e)}).encode()
+                else:
+                    status, headers, payload = 404, {}, b'{}'
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(payload)
+
+            do_GET = do_HEAD = do_POST = do_PATCH = do_DELETE = _dispatch
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name='postgrest-stub', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
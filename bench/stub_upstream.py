@@ -0,0 +1,194 @@
+"""
+Aplicações upstream de mentira para os benchmarks
+Cada app do routes.json vira um servidor HTTP local com página HTML (com CSS, JS,
+imagens e URLs absolutas/relativas como as apps reais), API JSON, endpoint lento e
+endpoint com erro. O HTML é determinístico (mesmo app_key + perfil = mesmos bytes).
+"""
+import gzip
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Tamanho aproximado do HTML por perfil (bytes)
+PAGE_PROFILES = {
+    'small': 12 * 1024,
+    'medium': 200 * 1024,
+    'large': 2 * 1024 * 1024,
+}
+# Assets referenciados por página (fan-out) e tamanho de cada tipo
+ASSETS = (
+    ('/css/app.css', 'text/css; charset=utf-8', 24 * 1024),
+    ('/css/theme.css', 'text/css; charset=utf-8', 8 * 1024),
+    ('/js/vendor.js', 'application/javascript; charset=utf-8', 120 * 1024),
+    ('/js/app.js', 'application/javascript; charset=utf-8', 40 * 1024),
+    ('/assets/chart.js', 'application/javascript; charset=utf-8', 60 * 1024),
+    ('/images/logo.png', 'image/png', 12 * 1024),
+    ('/images/bg.png', 'image/png', 48 * 1024),
+    ('/img/status-ok.svg', 'image/svg+xml', 2 * 1024),
+    ('/fonts/roboto.woff2', 'font/woff2', 30 * 1024),
+)
+ASSET_TYPES = {path: (ctype, size) for path, ctype, size in ASSETS}
+API_DELAY = 0.01
+SLOW_DELAY = 0.8
+
+
+def page_profile(app_key):
+    """Perfil padrão do app (determinístico): ~10% grandes, ~40% médias, resto pequenas"""
+    bucket = zlib.crc32(app_key.encode('utf-8')) % 10
+    if bucket == 0:
+        return 'large'
+    if bucket <= 4:
+        return 'medium'
+    return 'small'
+
+
+def render_page(app_key, profile='small', base_url='http://127.0.0.2:8080'):
+    """
+    HTML de um dashboard: cabeçalho com CSP e assets, links absolutos para a própria app,
+    CSS inline com url(), script inline com fetch/strings de caminho e uma tabela de
+    dados até o tamanho do perfil
+    """
+    target = PAGE_PROFILES[profile]
+    head = [
+        '<!DOCTYPE html>',
+        '<html lang="pt-BR"><head><meta charset="utf-8">',
+        f'<title>{app_key}</title>',
+        '<meta http-equiv="Content-Security-Policy" content="default-src \'self\'">',
+        '<link rel="stylesheet" href="/css/app.css">',
+        "<link rel='stylesheet' href='/css/theme.css' media='screen'>",
+        f'<link rel="icon" href="{base_url}/images/logo.png">',
+        '<link rel="preload" href="/fonts/roboto.woff2" as="font" crossorigin>',
+        '<style>body{background:url("/images/bg.png") no-repeat}.ok{background-image:url(/img/status-ok.svg)}</style>',
+        '<script src="/js/vendor.js"></script>',
+        '<script type="module" src="/assets/chart.js"></script>',
+        '</head><body>',
+        f'<header><img src="/images/logo.png" alt="logo"><a href="{base_url}/">{app_key}</a>',
+        '<nav><a href="/">Início</a> <a href="/relatorios/diario.html">Diário</a> '
+        '<a href="/login">Sair</a> <a href="https://externo.example.com/ajuda">Ajuda</a></nav></header>',
+        '<form action="/api/filtro" method="post"><input name="q"><button>Filtrar</button></form>',
+        '<main><table class="dados"><thead><tr><th>Ordem</th><th>Etapa</th><th>Peças</th><th>Status</th></tr></thead><tbody>',
+    ]
+    tail = [
+        '</tbody></table></main>',
+        '<script>',
+        "const API = '/api/data';",
+        'const PADRAO = /^\\/api\\/[a-z]+$/;',
+        'function atualizar(){ fetch(API).then(r => r.json()).then(d => render(d)); }',
+        "function render(d){ document.querySelector('.dados').dataset.total = d.total; }",
+        "setInterval(atualizar, 5000); const detalhe = '/api/detalhe/' + 1; const img = \"/images/bg.png\";",
+        '</script>',
+        '<script type="text/template"><a href="/template/{{id}}">{{nome}}</a></script>',
+        '<script src="/js/app.js" defer></script>',
+        '</body></html>',
+    ]
+    parts = head[:]
+    size = sum(len(p) + 1 for p in head) + sum(len(p) + 1 for p in tail)
+    row = 0
+    while size < target:
+        status = 'ok' if row % 7 else 'atraso'
+        line = (
+            f'<tr data-url="/api/ordem/{row}"><td><a href="/ordens/{row}">OP-{100000 + row}</a></td>'
+            f'<td>Etapa {row % 12}</td><td>{(row * 37) % 500}</td>'
+            f'<td class="{status}"><img src="/img/status-ok.svg" width="12"> {status}</td></tr>'
+        )
+        parts.append(line)
+        size += len(line) + 1
+        row += 1
+    parts.extend(tail)
+    return '\n'.join(parts)
+
+
+def _asset_bytes(path, size):
+    """Conteúdo sintético do asset (texto repetido; determinístico)"""
+    seed = f'/* {path} */\n'.encode('utf-8')
+    filler = b'.c{margin:0;padding:0}\n' if path.endswith('.css') else b'var x=function(a){return a+1};\n'
+    return (seed + filler * (size // len(filler) + 1))[:size]
+
+
+class UpstreamApp:
+    """Servidor de uma app upstream (porta própria, como as apps reais)"""
+
+    def __init__(self, app_key, host='127.0.0.2', port=0, profile=None, base_path=''):
+        self.app_key = app_key
+        self.profile = profile or page_profile(app_key)
+        self.base_path = base_path.rstrip('/')
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+        self.base_url = f'http://{self.host}:{self.port}'
+        self._page = render_page(app_key, self.profile, self.base_url).encode('utf-8')
+        self._page_gzip = gzip.compress(self._page, 6)
+        self._assets = {path: _asset_bytes(path, size) for path, (_, size) in ASSET_TYPES.items()}
+
+    def _handler(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type, gzip_body=None):
+                use_gzip = gzip_body is not None and 'gzip' in self.headers.get('Accept-Encoding', '')
+                payload = gzip_body if use_gzip else body
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                if use_gzip:
+                    self.send_header('Content-Encoding', 'gzip')
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(payload)
+
+            def _route(self):
+                with upstream._lock:
+                    upstream.requests += 1
+                path = self.path.split('?', 1)[0]
+                if upstream.base_path and path.startswith(upstream.base_path):
+                    path = path[len(upstream.base_path):] or '/'
+                if path in upstream._assets:
+                    ctype, _ = ASSET_TYPES[path]
+                    return self._send(200, upstream._assets[path], ctype)
+                if path.startswith('/api/slow'):
+                    time.sleep(SLOW_DELAY)
+                    return self._send(200, b'{"ok": true}', 'application/json')
+                if path.startswith('/api/fail'):
+                    return self._send(500, b'{"erro": "falha simulada"}', 'application/json')
+                if path.startswith('/api/'):
+                    time.sleep(API_DELAY)
+                    body = json.dumps({
+                        'app': upstream.app_key,
+                        'total': upstream.requests,
+                        'itens': [{'ordem': f'OP-{100000 + i}', 'pecas': (i * 37) % 500} for i in range(40)],
+                    }).encode('utf-8')
+                    return self._send(200, body, 'application/json')
+                if path == '/' or path.endswith(('/', '.html')) or '.' not in path.rsplit('/', 1)[-1]:
+                    return self._send(200, upstream._page, 'text/html; charset=utf-8', upstream._page_gzip)
+                return self._send(404, b'nao encontrado', 'text/plain')
+
+            def do_GET(self):
+                self._route()
+
+            def do_HEAD(self):
+                self._route()
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+                self._route()
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name=f'upstream-{self.app_key}', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
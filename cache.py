@@ -0,0 +1,336 @@
+"""
+Módulo de Cache em Memória
+Cache simples com expiração (TTL) por entrada, thread-safe e de tamanho limitado,
+cache stale-while-revalidate para dados que devem sobreviver a quedas da fonte e
+log de invalidações compartilhado entre os workers do gunicorn
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Cache em memória com expiração por entrada (por processo/worker)"""
+
+    def __init__(self, ttl, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = {}  # chave -> (valor, expira_em monotonic)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Retorna o valor se existir e não tiver expirado"""
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            with self._lock:
+                if self._data.get(key) is entry:
+                    del self._data[key]
+            return default
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def set(self, key, value=True, ttl=None):
+        """Grava o valor (ttl opcional sobrescreve o padrão; ttl <= 0 não grava)"""
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.max_entries:
+                # Remove expirados; se ainda cheio, descarta os mais antigos (ordem de inserção)
+                self._data = {k: v for k, v in self._data.items() if v[1] > now}
+                while len(self._data) >= self.max_entries:
+                    self._data.pop(next(iter(self._data)))
+            self._data[key] = (value, now + ttl)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class _Flight:
+    """Leitura em andamento de uma chave (single-flight): os demais pedidos esperam o resultado"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class RevalidatingCache:
+    """
+    Cache stale-while-revalidate (por processo/worker). Entradas valem `ttl` segundos;
+    vencidas, continuam sendo servidas por até `grace` segundos enquanto uma thread
+    as relê em segundo plano (com backoff exponencial se a fonte estiver fora ou lenta).
+    O loader só roda na thread do pedido quando não há valor utilizável, e uma única vez
+    por chave: pedidos simultâneos da mesma chave esperam essa leitura.
+    """
+
+    def __init__(self, loader, ttl, grace, is_transient=None, max_entries=10000,
+                 retry_initial=1.0, retry_max=30.0, on_stale=None, on_refresh_failure=None, name='cache'):
+        self._loader = loader
+        self.ttl = ttl
+        self.grace = grace
+        self._is_transient = is_transient or (lambda e: True)
+        self.max_entries = max_entries
+        self.retry_initial = retry_initial
+        self.retry_max = retry_max
+        self._on_stale = on_stale
+        self._on_refresh_failure = on_refresh_failure
+        self.name = name
+        self._data = {}  # chave -> (valor, carregado_em monotonic)
+        self._pending = set()  # chaves servidas vencidas, aguardando revalidação
+        self._inflight = {}  # chave -> _Flight da leitura feita na thread do pedido
+        # Incrementado por delete/clear: leitura iniciada antes de uma invalidação não é gravada
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread_pid = None
+        self._retry_delay = retry_initial
+        # Enquanto a fonte estiver em backoff, a thread de revalidação espera antes de tentar de novo
+        self._degraded_until = 0.0
+
+    def _store(self, key, value, epoch):
+        now = time.monotonic()
+        with self._lock:
+            if epoch != self._epoch:
+                return
+            if key not in self._data and len(self._data) >= self.max_entries:
+                # Remove as que já passaram da carência; se ainda cheio, as mais antigas
+                limit = self.ttl + self.grace
+                self._data = {k: v for k, v in self._data.items() if now - v[1] < limit}
+                while len(self._data) >= self.max_entries:
+                    self._data.pop(next(iter(self._data)))
+            self._data[key] = (value, now)
+            self._pending.discard(key)
+
+    def _serve_stale(self, key, entry):
+        with self._lock:
+            # Já aguardava revalidação (fonte fora ou lenta): uso de dado vencido além do normal
+            lagging = key in self._pending or time.monotonic() < self._degraded_until
+            self._pending.add(key)
+            self._wakeup.set()
+        if lagging and self._on_stale is not None:
+            self._on_stale(key, time.monotonic() - entry[1])
+        self._ensure_refresher()
+        return entry[0]
+
+    def get(self, key):
+        """Valor da chave (fresco, vencido dentro da carência com revalidação em segundo plano, ou lido agora)"""
+        now = time.monotonic()
+        entry = self._data.get(key)
+        if entry is not None and now - entry[1] < self.ttl:
+            return entry[0]
+        if entry is not None and now - entry[1] < self.ttl + self.grace:
+            return self._serve_stale(key, entry)
+        return self._load(key)
+
+    def _load(self, key):
+        """Leitura na thread do pedido (sem valor utilizável), uma por chave"""
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            epoch = self._epoch
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = self._loader(key)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+        self._store(key, flight.value, epoch)
+        return flight.value
+
+    def _refresh_loop(self):
+        while True:
+            self._wakeup.wait()
+            # Em backoff: espera a próxima tentativa (sem backoff, revalida em seguida)
+            delay = self._degraded_until - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            with self._lock:
+                keys = list(self._pending)
+            failed = False
+            for key in keys:
+                now = time.monotonic()
+                entry = self._data.get(key)
+                if entry is None or now - entry[1] >= self.ttl + self.grace or now - entry[1] < self.ttl:
+                    # Sem valor a proteger (removido ou fora da carência) ou já relido
+                    with self._lock:
+                        self._pending.discard(key)
+                    continue
+                epoch = self._epoch
+                try:
+                    value = self._loader(key)
+                except Exception as e:
+                    if not self._is_transient(e):
+                        # Erro da própria consulta, não da fonte: o próximo pedido lê na hora e recebe o erro
+                        logger.warning(f"{self.name}: revalidação falhou, descartando a entrada: {e}")
+                        self.delete(key)
+                        continue
+                    failed = True
+                    if self._on_refresh_failure is not None:
+                        self._on_refresh_failure(key)
+                    logger.warning(f"{self.name}: revalidação falhou, nova tentativa em {min(self._retry_delay * 2, self.retry_max):.0f}s: {e}")
+                    # Fonte fora: não insiste nas demais chaves nesta rodada
+                    break
+                self._store(key, value, epoch)
+            if failed:
+                self._retry_delay = min(self._retry_delay * 2, self.retry_max)
+                self._degraded_until = time.monotonic() + self._retry_delay
+            else:
+                self._retry_delay = self.retry_initial
+                self._degraded_until = 0.0
+            with self._lock:
+                if not self._pending:
+                    self._wakeup.clear()
+
+    def _ensure_refresher(self):
+        """Inicia a thread de revalidação (uma por processo; refeita após fork)"""
+        pid = os.getpid()
+        if self._thread_pid == pid:
+            return
+        with self._lock:
+            if self._thread_pid == pid:
+                return
+            self._thread_pid = pid
+            threading.Thread(target=self._refresh_loop, name=f'{self.name}-revalidate', daemon=True).start()
+
+    def delete(self, key):
+        with self._lock:
+            self._epoch += 1
+            self._data.pop(key, None)
+            self._pending.discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._data.clear()
+            self._pending.clear()
+
+    def stale_keys(self):
+        """Quantidade de chaves servidas vencidas aguardando revalidação"""
+        return len(self._pending)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class InvalidationLog:
+    """
+    Invalidações compartilhadas entre workers: cada invalidação é uma linha
+    "tipo chave" acrescentada a um arquivo; cada worker lê as linhas novas (no máximo a
+    cada `check_interval`) e chama os callbacks registrados para o tipo. Passando de
+    `max_size`, o arquivo é trocado por um vazio; quem percebe a troca (ou um arquivo
+    removido/truncado) chama os callbacks com None (descartar tudo).
+    """
+
+    def __init__(self, path, check_interval=1.0, max_size=1024 * 1024):
+        self.path = path
+        self.check_interval = check_interval
+        self.max_size = max_size
+        self._callbacks = {}  # tipo -> [callback(chave ou None)]
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._inode, self._offset = self._stat()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_ino, st.st_size
+        except OSError:
+            return None, 0
+
+    def on(self, kind, callback):
+        """Registra callback(chave) para invalidações do tipo (chave None = todas)"""
+        self._callbacks.setdefault(kind, []).append(callback)
+
+    def _dispatch(self, kind, key):
+        for callback in self._callbacks.get(kind, ()):
+            try:
+                callback(key)
+            except Exception as e:
+                logger.warning(f"Falha ao aplicar invalidação {kind} {key}: {e}")
+
+    def _dispatch_all(self):
+        for kind in self._callbacks:
+            self._dispatch(kind, None)
+
+    def publish(self, kind, key):
+        """Aplica a invalidação neste worker e a registra para os demais"""
+        self._dispatch(kind, str(key))
+        line = f"{kind} {key}\n".encode('utf-8')
+        try:
+            # O_APPEND: linhas curtas de vários processos não se intercalam
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+            if size > self.max_size:
+                # Recomeça com um arquivo novo (outro inode): os outros workers percebem e descartam tudo
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                open(tmp_path, 'wb').close()
+                os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Não foi possível registrar invalidação compartilhada em {self.path}: {e}")
+
+    def poll(self):
+        """Aplica as invalidações publicadas por outros workers desde a última leitura"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            inode, size = self._stat()
+            if inode == self._inode and size == self._offset:
+                return
+            if self._inode is None and inode is not None:
+                # Arquivo criado depois deste worker: lê desde o início
+                self._inode, self._offset = inode, 0
+            elif inode != self._inode or size < self._offset:
+                # Arquivo recriado, removido ou truncado: linhas perdidas, descartar tudo
+                self._inode, self._offset = inode, size
+                self._dispatch_all()
+                return
+            try:
+                with open(self.path, 'rb') as f:
+                    f.seek(self._offset)
+                    data = f.read(size - self._offset)
+            except OSError:
+                return
+            # Só linhas completas; o resto fica para a próxima leitura
+            complete = data.rfind(b'\n') + 1
+            self._offset += complete
+            for raw in data[:complete].splitlines():
+                kind, _, key = raw.decode('utf-8', errors='replace').partition(' ')
+                self._dispatch(kind, key)
@@ -0,0 +1,137 @@
+"""
+Módulo de Catálogo em Memória
+Aplicações, dashboards e grupos (que mudam poucas vezes por mês, via sql/) ficam
+em memória por worker: carregados no primeiro uso, recarregados periodicamente em
+segundo plano e sob demanda pelo admin (sinal compartilhado entre workers por arquivo).
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger('maestro.catalog')
+
+# Intervalo (segundos) entre recargas periódicas do catálogo
+CATALOG_REFRESH_INTERVAL = int(os.getenv('CATALOG_REFRESH_INTERVAL', '300'))
+# Arquivo de sinal de recarga compartilhado entre workers do gunicorn (relido por mtime)
+CATALOG_RELOAD_FILE = os.getenv(
+    'CATALOG_RELOAD_FILE', os.path.join(tempfile.gettempdir(), 'maestro-catalog-reload')
+)
+# Intervalo mínimo entre verificações do arquivo de sinal (segundos)
+SIGNAL_CHECK_INTERVAL = 2.0
+
+
+class CatalogStore:
+    """
+    Snapshot imutável dos catálogos, trocado por inteiro a cada recarga.
+    O loader retorna um dict {nome: dados}; a versão só avança quando o conteúdo muda.
+    """
+
+    def __init__(self, loader, refresh_interval=CATALOG_REFRESH_INTERVAL, reload_file=CATALOG_RELOAD_FILE):
+        self._loader = loader
+        self.refresh_interval = refresh_interval
+        self.reload_file = reload_file
+        self._snapshot = None
+        self._digest = None
+        self.version = 0
+        self.loaded_at = None
+        self._listeners = []
+        self._load_lock = threading.Lock()
+        self._thread_pid = None
+        self._signal_mtime = self._read_signal_mtime()
+        self._next_signal_check = 0.0
+
+    def _read_signal_mtime(self):
+        try:
+            return os.stat(self.reload_file).st_mtime
+        except OSError:
+            return None
+
+    def on_change(self, callback):
+        """Registra função chamada (sem argumentos) sempre que o conteúdo do catálogo muda"""
+        self._listeners.append(callback)
+
+    def reload(self):
+        """Recarrega do banco; em caso de erro mantém o snapshot anterior e propaga a exceção"""
+        with self._load_lock:
+            data = self._loader()
+            digest = hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+            changed = digest != self._digest
+            if changed:
+                self._snapshot = data
+                self._digest = digest
+                self.version += 1
+            self.loaded_at = time.time()
+        if changed:
+            logger.info(f"Catálogo carregado (versão {self.version})")
+            for callback in self._listeners:
+                callback()
+        return changed
+
+    def request_reload(self):
+        """Recarrega neste worker e sinaliza os demais workers (tocando o arquivo de sinal)"""
+        changed = self.reload()
+        try:
+            with open(self.reload_file, 'a', encoding='utf-8'):
+                pass
+            os.utime(self.reload_file, None)
+            self._signal_mtime = self._read_signal_mtime()
+        except OSError as e:
+            logger.warning(f"Não foi possível sinalizar recarga do catálogo aos outros workers: {e}")
+        return changed
+
+    def _check_reload_signal(self):
+        """Recarrega se outro worker sinalizou (no máximo a cada SIGNAL_CHECK_INTERVAL)"""
+        now = time.monotonic()
+        if now < self._next_signal_check:
+            return
+        self._next_signal_check = now + SIGNAL_CHECK_INTERVAL
+        mtime = self._read_signal_mtime()
+        if mtime is None or mtime == self._signal_mtime:
+            return
+        self._signal_mtime = mtime
+        try:
+            self.reload()
+        except Exception as e:
+            logger.warning(f"Falha ao recarregar catálogo sinalizado (mantendo versão {self.version}): {e}")
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                self.reload()
+            except Exception as e:
+                logger.warning(f"Falha na recarga periódica do catálogo (mantendo versão {self.version}): {e}")
+
+    def _ensure_refresher(self):
+        """Inicia a thread de recarga periódica (uma por processo; refeita após fork)"""
+        pid = os.getpid()
+        if self._thread_pid == pid or self.refresh_interval <= 0:
+            return
+        with self._load_lock:
+            if self._thread_pid == pid:
+                return
+            self._thread_pid = pid
+            threading.Thread(target=self._refresh_loop, name='catalog-refresh', daemon=True).start()
+
+    def get(self, name):
+        """Retorna um catálogo do snapshot atual (carrega no primeiro uso; propaga erro se nunca carregou)"""
+        if self._snapshot is None:
+            self.reload()
+        else:
+            self._check_reload_signal()
+        self._ensure_refresher()
+        return self._snapshot[name]
+
+    def status(self):
+        """Resumo para o admin: versão, horário da carga e tamanho de cada catálogo"""
+        snapshot = self._snapshot or {}
+        return {
+            'version': self.version,
+            'loaded_at': self.loaded_at,
+            'refresh_interval': self.refresh_interval,
+            'sizes': {name: len(data) for name, data in snapshot.items()},
+        }
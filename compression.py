@@ -0,0 +1,123 @@
+"""
+Módulo de Compressão HTTP
+Negociação de Accept-Encoding e compressão gzip/brotli (brotli é opcional)
+"""
+import gzip
+import zlib
+
+# Brotli é opcional: sem o pacote, apenas gzip é oferecido
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Codificações suportadas, em ordem de preferência do servidor
+SUPPORTED_ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+# Codificações que o requests/urllib3 sabe descomprimir (pedidas aos upstreams)
+DECODABLE_ENCODINGS = ('br', 'gzip', 'deflate') if brotli else ('gzip', 'deflate')
+
+# Níveis para compressão sob demanda (rápidos; os máximos ficam para o build de estáticos)
+DYNAMIC_LEVELS = {'br': 5, 'gzip': 6}
+
+# Tipos de conteúdo textuais (vale a pena comprimir)
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript', 'application/x-javascript',
+    'application/xml', 'application/xhtml+xml', 'application/manifest+json', 'image/svg+xml',
+)
+# Textuais entregues aos poucos (SSE): o compressor seguraria os eventos até o fim do corpo
+STREAMING_TYPES = ('text/event-stream',)
+
+
+def parse_accept_encoding(header):
+    """Converte o header Accept-Encoding (ou Accept) em {token: q}"""
+    accepted = {}
+    for part in (header or '').split(','):
+        token, *params = part.strip().split(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[token] = q
+    return accepted
+
+
+def negotiate_encoding(header, available=SUPPORTED_ENCODINGS):
+    """
+    Escolhe a melhor codificação aceita pelo cliente entre as disponíveis
+    (respeitando q=0 e a ordem de preferência do servidor). Retorna None para identity.
+    """
+    accepted = parse_accept_encoding(header)
+    if not accepted:
+        return None
+    wildcard = accepted.get('*', 0.0)
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def accepts_encoding(header, encoding):
+    """Indica se o cliente aceita uma codificação específica (ex.: a que o upstream usou)"""
+    accepted = parse_accept_encoding(header)
+    encoding = (encoding or '').strip().lower()
+    if encoding in ('', 'identity'):
+        return True
+    return accepted.get(encoding, accepted.get('*', 0.0)) > 0
+
+
+def compress(data, encoding, level=None):
+    """Comprime bytes com a codificação indicada ('br' ou 'gzip')"""
+    if encoding == 'br' and brotli is not None:
+        return brotli.compress(data, quality=11 if level is None else level)
+    if encoding == 'gzip':
+        # mtime=0 deixa a saída determinística (mesmo conteúdo -> mesmos bytes)
+        return gzip.compress(data, compresslevel=9 if level is None else level, mtime=0)
+    raise ValueError(f"Codificação não suportada: {encoding}")
+
+
+def is_compressible(content_type):
+    """Indica se o Content-Type é textual (JSON, HTML, CSS, JS, XML, SVG...)"""
+    mimetype = (content_type or '').split(';')[0].strip().lower()
+    if not mimetype or mimetype in STREAMING_TYPES:
+        return False
+    return mimetype.startswith(COMPRESSIBLE_TYPES) or mimetype.endswith(('+json', '+xml'))
+
+
+def compress_stream(chunks, encoding, level=None, flush=False):
+    """
+    Comprime um iterável de bytes sob demanda (sem bufferizar o corpo inteiro),
+    gerando os blocos comprimidos conforme ficam prontos. Com flush=True cada bloco
+    recebido sai inteiro na hora (corpos entregues aos poucos, como long-poll)
+    """
+    if encoding == 'br' and brotli is not None:
+        compressor = brotli.Compressor(quality=DYNAMIC_LEVELS['br'] if level is None else level)
+        for chunk in chunks:
+            if chunk:
+                data = compressor.process(chunk)
+                if flush:
+                    data += compressor.flush()
+                if data:
+                    yield data
+        yield compressor.finish()
+    elif encoding == 'gzip':
+        # wbits=31: formato gzip (cabeçalho + CRC)
+        compressor = zlib.compressobj(DYNAMIC_LEVELS['gzip'] if level is None else level, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            if chunk:
+                data = compressor.compress(chunk)
+                if flush:
+                    data += compressor.flush(zlib.Z_SYNC_FLUSH)
+                if data:
+                    yield data
+        yield compressor.flush()
+    else:
+        raise ValueError(f"Codificação não suportada: {encoding}")
@@ -0,0 +1,109 @@
+"""
+Módulo de Formatação
+Datas/horas para exibição (UTC do banco -> horário de Brasília), com o fuso
+resolvido uma única vez e cache das strings já formatadas
+"""
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+import logging
+
+# zoneinfo (Python 3.9+), senão pytz; sem nenhum dos dois, UTC-3 fixo
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    try:
+        import pytz
+        ZoneInfo = pytz.timezone
+    except ImportError:
+        ZoneInfo = None
+
+DISPLAY_TIMEZONE_NAME = 'America/Sao_Paulo'
+
+
+def _resolve_timezone():
+    if ZoneInfo is not None:
+        try:
+            return ZoneInfo(DISPLAY_TIMEZONE_NAME)
+        except Exception as e:
+            logging.warning(f"Fuso {DISPLAY_TIMEZONE_NAME} indisponível, usando UTC-3 fixo: {str(e)}")
+    return timezone(timedelta(hours=-3), 'UTC-3')
+
+
+# Timezone do Brasil (America/Sao_Paulo = UTC-3)
+LOCAL_TIMEZONE = _resolve_timezone()
+
+MESES = ('', 'jan', 'fev', 'mar', 'abr', 'mai', 'jun',
+         'jul', 'ago', 'set', 'out', 'nov', 'dez')
+
+# Quantidade de strings de data distintas mantidas no cache
+FORMAT_CACHE_SIZE = 4096
+
+
+def _parse_datetime_str(value):
+    """Converte string ISO (com ou sem timezone, com ou sem 'Z') em datetime com tzinfo"""
+    # Formato ISO: 2025-12-03T14:55:52+00:00 ou 2025-12-03T14:55:52 ou 2025-12-03T14:55:52Z
+    if 'T' in value:
+        if value.endswith('Z'):
+            # UTC explícito
+            return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=timezone.utc)
+        if '+' in value or value.count('-') > 2:
+            # Tem timezone explícito
+            return datetime.fromisoformat(value)
+        # Sem timezone - assumir UTC (como salvo no banco)
+        return datetime.strptime(value.split('.')[0], '%Y-%m-%dT%H:%M:%S').replace(tzinfo=timezone.utc)
+    # Outros formatos
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def _format_local(dt):
+    """Formato: "03 dez 2025, 14:55h" no horário local"""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    local = dt.astimezone(LOCAL_TIMEZONE)
+    return f"{local.day:02d} {MESES[local.month]} {local.year}, {local.hour:02d}:{local.minute:02d}h"
+
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def _format_datetime_str(value):
+    try:
+        return _format_local(_parse_datetime_str(value))
+    except Exception as e:
+        logging.error(f"Erro ao formatar data: {str(e)} - Valor: {value}")
+        # Se houver erro, retornar formato simplificado
+        return value[:19].replace('T', ' ')
+
+
+def format_datetime(value):
+    """Formata data e hora para exibição legível, convertendo de UTC para timezone local"""
+    if not value:
+        return 'Nunca'
+    if isinstance(value, str):
+        return _format_datetime_str(value)
+    if isinstance(value, datetime):
+        try:
+            return _format_local(value)
+        except Exception as e:
+            logging.error(f"Erro ao formatar data: {str(e)} - Valor: {value}")
+    return str(value)
+
+
+def format_datetime_column(values):
+    """
+    Formata uma coluna inteira de datas (ex.: last_login de uma página de usuários)
+    numa chamada; valores repetidos são formatados uma única vez
+    """
+    formatted = {}
+    result = []
+    for value in values:
+        try:
+            text = formatted[value]
+        except KeyError:
+            text = formatted[value] = format_datetime(value)
+        except TypeError:
+            # Valor não-hashable: formata sem reaproveitar
+            text = format_datetime(value)
+        result.append(text)
+    return result
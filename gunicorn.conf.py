@@ -0,0 +1,29 @@
+"""
+Configuração do Gunicorn
+O app é carregado uma vez no master (preload_app) e os workers nascem por fork já
+com módulos, rotas e estáticos prontos; respawns por max_requests ficam rápidos.
+Clientes de rede (Supabase, sessões HTTP) são criados sob demanda dentro de cada
+worker, então nenhum socket é compartilhado entre processos.
+"""
+import os
+
+wsgi_app = 'app:create_app()'
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', '5'))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+worker_class = 'gthread'
+worker_connections = 1000
+timeout = 120
+keepalive = 10
+max_requests = 1000
+max_requests_jitter = 100
+preload_app = True
+accesslog = '-'
+errorlog = '-'
+loglevel = 'info'
+
+
+def post_fork(server, worker):
+    """Inicialização por worker (depois do fork)"""
+    from app import init_worker
+    init_worker()
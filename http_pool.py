@@ -2,6 +2,7 @@
 Módulo de Pool de Conexões HTTP
 Otimiza requisições HTTP usando Session com pool de conexões
 """
+import os
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
@@ -14,8 +15,19 @@ class HTTPConnectionPool:
     """Gerenciador de pool de conexões HTTP para melhor performance"""
     
     def __init__(self):
+        # Sessões criadas no primeiro uso em cada processo: nada de sockets abertos
+        # antes do fork do gunicorn nem compartilhados entre workers
         self.sessions = {}
-        self._setup_default_session()
+        self.default_session = None
+        self._pid = os.getpid()
+    
+    def _check_pid(self):
+        """Após fork, descarta as sessões herdadas do processo pai (cada worker cria as suas)"""
+        pid = os.getpid()
+        if self._pid != pid:
+            self.sessions = {}
+            self.default_session = None
+            self._pid = pid
     
     def _setup_default_session(self):
         """Configura sessão padrão com pool de conexões otimizado"""
@@ -60,6 +72,7 @@ class HTTPConnectionPool:
         Returns:
             requests.Session: Sessão configurada com pool
         """
+        self._check_pid()
         if base_url:
             # Criar sessão específica para um host se necessário
             if base_url not in self.sessions:
@@ -92,16 +105,105 @@ class HTTPConnectionPool:
             
             return self.sessions[base_url]
         
+        if self.default_session is None:
+            self._setup_default_session()
         return self.default_session
     
+    def get_streaming_session(self, base_url):
+        """
+        Retorna uma sessão para requisições com corpo em stream (uploads).
+        O corpo só pode ser lido uma vez, então não há retry após o envio:
+        apenas falhas de conexão (antes de enviar qualquer byte) são repetidas.
+        """
+        self._check_pid()
+        key = ('stream', base_url)
+        if key not in self.sessions:
+            retry_strategy = Retry(
+                total=2,
+                connect=2,
+                read=0,
+                status=0,
+                other=0,
+                backoff_factor=0.3,
+                allowed_methods=None
+            )
+            
+            adapter = HTTPAdapter(
+                pool_connections=5,
+                pool_maxsize=10,
+                max_retries=retry_strategy,
+                pool_block=False
+            )
+            
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({
+                'User-Agent': 'Maestro-Portal/1.0',
+                'Accept': '*/*',
+                'Accept-Encoding': 'gzip, deflate',
+                'Connection': 'keep-alive'
+            })
+            
+            self.sessions[key] = session
+            logger.debug(f"Sessão de upload (stream) criada para {base_url}")
+        
+        return self.sessions[key]
+    
+    def close_sessions(self, base_urls):
+        """
+        Fecha as sessões (normal e de upload) dos upstreams informados.
+        Conexões livres são fechadas já; as em uso terminam a resposta e são descartadas.
+        """
+        for base_url in base_urls:
+            for key in (base_url, ('stream', base_url)):
+                session = self.sessions.pop(key, None)
+                if session is not None:
+                    session.close()
+                    logger.debug(f"Sessão fechada para {key}")
+
     def close_all(self):
         """Fecha todas as sessões e limpa pools"""
         for session in self.sessions.values():
             session.close()
         self.sessions.clear()
-        self.default_session.close()
+        if self.default_session is not None:
+            self.default_session.close()
+            self.default_session = None
         logger.info("Todas as sessões HTTP foram fechadas")
 
+class StreamingBody:
+    """
+    Corpo de requisição lido sob demanda de um stream (ex.: wsgi.input),
+    sem carregar o upload inteiro em memória. Como informa o tamanho (__len__),
+    o requests envia Content-Length em vez de Transfer-Encoding: chunked.
+    """
+    
+    def __init__(self, stream, length):
+        self.stream = stream
+        self.length = length
+        self.remaining = length
+    
+    def __len__(self):
+        return self.length
+    
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        chunk = self.stream.read(size)
+        self.remaining -= len(chunk)
+        return chunk
+
+def iter_stream(stream, chunk_size=64 * 1024):
+    """Gera o corpo em blocos (tamanho desconhecido: enviado como chunked)"""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
 # Instância global do pool de conexões
 http_pool = HTTPConnectionPool()
 
@@ -0,0 +1,163 @@
+"""
+Módulo de Logging Assíncrono
+Encaminha registros de log por uma fila limitada (QueueHandler/QueueListener),
+com registros estruturados em JSON e amostragem do log de acesso por rota
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+from datetime import datetime, timezone
+
+from monitoring import record_log_dropped
+
+# Tamanho máximo da fila; quando cheia, registros são descartados (e contados)
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+# Formato de saída: 'json' (estruturado) ou 'text' (legível, como antes)
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').strip().lower()
+# Amostragem do log de acesso por prefixo de rota (prefixo=taxa, separados por vírgula)
+# Ex.: "/proxy/=0.05,/static/=0,/=1" (o prefixo mais longo vence)
+ACCESS_LOG_SAMPLING = os.getenv('ACCESS_LOG_SAMPLING', '/proxy/=0.1,/static/=0.0,/assets/=0.0,/api/=0.1,/=1.0')
+
+# Atributos padrão de LogRecord (não entram como campos extras no JSON)
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formata o registro como uma linha JSON (campos extras via extra={'fields': {...}})"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if isinstance(fields, dict):
+            entry.update(fields)
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and key != 'fields' and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que descarta (e contabiliza) registros quando a fila está cheia"""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            record_log_dropped()
+
+
+def _build_formatter():
+    if LOG_FORMAT == 'text':
+        return logging.Formatter(
+            '%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
+    return JsonFormatter()
+
+
+_queue_handler = None
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def get_queue_handler():
+    """
+    Retorna o QueueHandler compartilhado do processo, criando a fila e iniciando
+    o QueueListener (thread única que escreve no stream) na primeira chamada
+    """
+    global _queue_handler, _listener
+    if _queue_handler is not None:
+        return _queue_handler
+    with _listener_lock:
+        if _queue_handler is None:
+            log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+            stream_handler = logging.StreamHandler()
+            stream_handler.setFormatter(_build_formatter())
+            _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+            _listener.start()
+            atexit.register(stop_logging)
+            _queue_handler = DroppingQueueHandler(log_queue)
+    return _queue_handler
+
+
+def _restart_after_fork():
+    """
+    No processo filho (fork do gunicorn com preload) a thread do listener não existe:
+    cria fila e listener próprios para o worker, mantendo o mesmo QueueHandler
+    """
+    global _listener, _listener_lock
+    _listener_lock = threading.Lock()
+    if _queue_handler is None:
+        return
+    handlers = _listener.handlers if _listener is not None else ()
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    _queue_handler.queue = log_queue
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def stop_logging():
+    """Esvazia a fila e encerra a thread do listener (chamado no encerramento)"""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def configure_logger(logger, level=logging.INFO):
+    """Faz o logger escrever apenas pela fila assíncrona"""
+    handler = get_queue_handler()
+    for existing in list(logger.handlers):
+        logger.removeHandler(existing)
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    # Loggers nomeados não repassam ao root (evita linha duplicada)
+    if logger is not logging.getLogger():
+        logger.propagate = False
+    return logger
+
+
+def _parse_sampling(spec):
+    rules = []
+    for item in (spec or '').split(','):
+        if '=' not in item:
+            continue
+        prefix, rate = item.split('=', 1)
+        try:
+            rules.append((prefix.strip(), max(0.0, min(1.0, float(rate)))))
+        except ValueError:
+            continue
+    # Prefixo mais longo primeiro
+    rules.sort(key=lambda r: len(r[0]), reverse=True)
+    return tuple(rules)
+
+
+_access_sampling = _parse_sampling(ACCESS_LOG_SAMPLING)
+
+
+def should_log_access(path):
+    """Decide (por amostragem da rota) se a requisição deve gerar linha de log de acesso"""
+    for prefix, rate in _access_sampling:
+        if path.startswith(prefix):
+            if rate >= 1.0:
+                return True
+            if rate <= 0.0:
+                return False
+            return random.random() < rate
+    return True
@@ -20,7 +20,21 @@ metrics = {
     'requests_by_route': defaultdict(int),
     'response_times': [],
     'errors': 0,
-    'proxy_requests': 0
+    'proxy_requests': 0,
+    'rate_limit_hits': 0,
+    'rate_limit_hits_by_route': defaultdict(int),
+    'rate_limit_check_times': [],
+    'log_records_dropped': 0,
+    'password_hash_cpu_times': [],
+    'password_hash_wait_times': [],
+    'password_pool_rejections': 0,
+    'db_query_times': [],
+    'db_query_errors': 0,
+    'db_queries_by_table': defaultdict(lambda: [0, 0.0]),
+    'upstream_times': [],
+    'authz_stale_served': 0,
+    'authz_stale_max_age': 0.0,
+    'authz_revalidation_failures': 0
 }
 metrics_lock = threading.Lock()
 
@@ -73,6 +87,72 @@ def record_request_time(f):
     
     return decorated_function
 
+def record_rate_limit_check(elapsed):
+    """Registra o tempo gasto na verificação do rate limiting (segundos)"""
+    with metrics_lock:
+        metrics['rate_limit_check_times'].append(elapsed)
+        # Manter apenas últimas 1000 medições
+        if len(metrics['rate_limit_check_times']) > 1000:
+            metrics['rate_limit_check_times'] = metrics['rate_limit_check_times'][-1000:]
+
+def record_rate_limit_hit(route):
+    """Registra uma requisição bloqueada pelo rate limiting"""
+    with metrics_lock:
+        metrics['rate_limit_hits'] += 1
+        metrics['rate_limit_hits_by_route'][route] += 1
+
+def record_log_dropped():
+    """Registra um registro de log descartado por fila cheia"""
+    with metrics_lock:
+        metrics['log_records_dropped'] += 1
+
+def record_password_hash(cpu_seconds, wait_seconds):
+    """Registra uma operação de bcrypt: tempo de CPU e espera na fila do pool (segundos)"""
+    with metrics_lock:
+        metrics['password_hash_cpu_times'].append(cpu_seconds)
+        metrics['password_hash_wait_times'].append(wait_seconds)
+        # Manter apenas últimas 1000 medições
+        if len(metrics['password_hash_cpu_times']) > 1000:
+            metrics['password_hash_cpu_times'] = metrics['password_hash_cpu_times'][-1000:]
+            metrics['password_hash_wait_times'] = metrics['password_hash_wait_times'][-1000:]
+
+def record_password_pool_rejected():
+    """Registra um login recusado (503) por saturação do pool de bcrypt"""
+    with metrics_lock:
+        metrics['password_pool_rejections'] += 1
+
+def record_db_query(table, seconds, failed=False):
+    """Registra uma consulta ao Supabase/PostgREST: tabela (ou rpc/função) e duração (segundos)"""
+    with metrics_lock:
+        metrics['db_query_times'].append(seconds)
+        # Manter apenas últimas 1000 medições
+        if len(metrics['db_query_times']) > 1000:
+            metrics['db_query_times'] = metrics['db_query_times'][-1000:]
+        by_table = metrics['db_queries_by_table'][table]
+        by_table[0] += 1
+        by_table[1] += seconds
+        if failed:
+            metrics['db_query_errors'] += 1
+
+def record_upstream_time(seconds):
+    """Registra o tempo de resposta de uma aplicação upstream do proxy (até os headers, segundos)"""
+    with metrics_lock:
+        metrics['upstream_times'].append(seconds)
+        # Manter apenas últimas 1000 medições
+        if len(metrics['upstream_times']) > 1000:
+            metrics['upstream_times'] = metrics['upstream_times'][-1000:]
+
+def record_authz_stale(age_seconds):
+    """Registra uma autorização decidida com dados vencidos (Supabase indisponível)"""
+    with metrics_lock:
+        metrics['authz_stale_served'] += 1
+        metrics['authz_stale_max_age'] = max(metrics['authz_stale_max_age'], age_seconds)
+
+def record_authz_revalidation_failure():
+    """Registra uma tentativa de revalidação das permissões que falhou"""
+    with metrics_lock:
+        metrics['authz_revalidation_failures'] += 1
+
 def get_metrics():
     """Retorna métricas atuais"""
     with metrics_lock:
@@ -80,6 +160,14 @@ def get_metrics():
             sum(metrics['response_times']) / len(metrics['response_times'])
             if metrics['response_times'] else 0
         )
+        avg_rate_limit_check = (
+            sum(metrics['rate_limit_check_times']) / len(metrics['rate_limit_check_times'])
+            if metrics['rate_limit_check_times'] else 0
+        )
+        hash_cpu_times = metrics['password_hash_cpu_times']
+        hash_wait_times = metrics['password_hash_wait_times']
+        db_query_times = metrics['db_query_times']
+        upstream_times = metrics['upstream_times']
         
         return {
             'requests_total': metrics['requests_total'],
@@ -92,7 +180,36 @@ def get_metrics():
                 (metrics['errors'] / metrics['requests_total'] * 100)
                 if metrics['requests_total'] > 0 else 0,
                 2
-            )
+            ),
+            'rate_limit_hits': metrics['rate_limit_hits'],
+            'rate_limit_hits_by_route': dict(metrics['rate_limit_hits_by_route']),
+            'avg_rate_limit_check_ms': round(avg_rate_limit_check * 1000, 4),
+            'log_records_dropped': metrics['log_records_dropped'],
+            'password_hashes': len(hash_cpu_times),
+            'password_hash_cpu_ms_total': round(sum(hash_cpu_times) * 1000, 1),
+            'avg_password_hash_cpu_ms': round(
+                sum(hash_cpu_times) / len(hash_cpu_times) * 1000 if hash_cpu_times else 0, 1
+            ),
+            'avg_password_hash_wait_ms': round(
+                sum(hash_wait_times) / len(hash_wait_times) * 1000 if hash_wait_times else 0, 1
+            ),
+            'password_pool_rejections': metrics['password_pool_rejections'],
+            'db_queries': sum(count for count, _ in metrics['db_queries_by_table'].values()),
+            'db_query_errors': metrics['db_query_errors'],
+            'avg_db_query_ms': round(
+                sum(db_query_times) / len(db_query_times) * 1000 if db_query_times else 0, 1
+            ),
+            'db_query_ms_by_table': {
+                table: {'count': count, 'avg_ms': round(total / count * 1000, 1)}
+                for table, (count, total) in metrics['db_queries_by_table'].items()
+            },
+            'upstream_requests_timed': len(upstream_times),
+            'avg_upstream_ms': round(
+                sum(upstream_times) / len(upstream_times) * 1000 if upstream_times else 0, 1
+            ),
+            'authz_stale_served': metrics['authz_stale_served'],
+            'authz_stale_max_age_s': round(metrics['authz_stale_max_age'], 1),
+            'authz_revalidation_failures': metrics['authz_revalidation_failures']
         }
 
 def reset_metrics():
@@ -104,6 +221,20 @@ def reset_metrics():
         metrics['response_times'].clear()
         metrics['errors'] = 0
         metrics['proxy_requests'] = 0
+        metrics['rate_limit_hits'] = 0
+        metrics['rate_limit_hits_by_route'].clear()
+        metrics['rate_limit_check_times'].clear()
+        metrics['log_records_dropped'] = 0
+        metrics['password_hash_cpu_times'].clear()
+        metrics['password_hash_wait_times'].clear()
+        metrics['password_pool_rejections'] = 0
+        metrics['db_query_times'].clear()
+        metrics['db_query_errors'] = 0
+        metrics['db_queries_by_table'].clear()
+        metrics['upstream_times'].clear()
+        metrics['authz_stale_served'] = 0
+        metrics['authz_stale_max_age'] = 0.0
+        metrics['authz_revalidation_failures'] = 0
 
 def log_performance_summary():
     """Loga resumo de performance (chamar periodicamente)"""
@@ -112,6 +243,15 @@ def log_performance_summary():
         f"Performance: {m['requests_total']} requisições, "
         f"tempo médio: {m['avg_response_time']}s, "
         f"erros: {m['errors']} ({m['error_rate']}%), "
-        f"proxy: {m['proxy_requests']}"
+        f"proxy: {m['proxy_requests']}, "
+        f"rate limit: {m['rate_limit_hits']} bloqueios "
+        f"(verificação média: {m['avg_rate_limit_check_ms']}ms), "
+        f"logs descartados: {m['log_records_dropped']}, "
+        f"bcrypt: {m['password_hashes']} operações "
+        f"(CPU média: {m['avg_password_hash_cpu_ms']}ms, recusas: {m['password_pool_rejections']}), "
+        f"banco: {m['db_queries']} consultas (média: {m['avg_db_query_ms']}ms, erros: {m['db_query_errors']}), "
+        f"upstreams: média {m['avg_upstream_ms']}ms, "
+        f"permissões vencidas usadas: {m['authz_stale_served']} vezes "
+        f"(revalidações com falha: {m['authz_revalidation_failures']})"
     )
 
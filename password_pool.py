@@ -0,0 +1,92 @@
+"""
+Módulo de Pool de Hash de Senhas
+Executa bcrypt (hash e verificação) em um pool dedicado e limitado de threads,
+fora da thread da requisição. O bcrypt libera o GIL durante o cálculo, então o
+pool limita quantos núcleos o login pode ocupar ao mesmo tempo; quando a fila
+enche, a requisição é recusada imediatamente (503) em vez de travar o worker.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from monitoring import record_password_hash, record_password_pool_rejected
+
+logger = logging.getLogger(__name__)
+
+# Threads dedicadas ao bcrypt (cada uma ocupa um núcleo durante ~250 ms por login)
+PASSWORD_POOL_WORKERS = int(os.getenv('PASSWORD_POOL_WORKERS', '2'))
+# Operações aguardando além das em execução; acima disso, recusa imediata
+PASSWORD_POOL_MAX_QUEUE = int(os.getenv('PASSWORD_POOL_MAX_QUEUE', '8'))
+# Tempo máximo (segundos) que a requisição espera pelo resultado
+PASSWORD_POOL_TIMEOUT = float(os.getenv('PASSWORD_POOL_TIMEOUT', '10'))
+# Valor do header Retry-After (segundos) na resposta 503
+PASSWORD_POOL_RETRY_AFTER = int(os.getenv('PASSWORD_POOL_RETRY_AFTER', '3'))
+
+
+class PasswordPoolSaturatedError(Exception):
+    """Pool de hash de senhas cheio (ou sem resposta a tempo): responder 503 com Retry-After"""
+    pass
+
+
+class PasswordPool:
+    """Pool limitado de threads para operações de bcrypt"""
+
+    def __init__(self, workers=PASSWORD_POOL_WORKERS, max_queue=PASSWORD_POOL_MAX_QUEUE,
+                 timeout=PASSWORD_POOL_TIMEOUT):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.timeout = timeout
+        # Vagas = em execução + na fila; liberada quando a operação termina
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Criado sob demanda e recriado após fork (threads não sobrevivem ao fork)
+        pid = os.getpid()
+        if self._executor is None or self._executor_pid != pid:
+            with self._lock:
+                if self._executor is None or self._executor_pid != pid:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix='bcrypt'
+                    )
+                    self._executor_pid = pid
+        return self._executor
+
+    @staticmethod
+    def _timed(fn, args, submitted_at):
+        started_at = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            return fn(*args)
+        finally:
+            record_password_hash(
+                cpu_seconds=time.thread_time() - cpu_start,
+                wait_seconds=started_at - submitted_at
+            )
+
+    def run(self, fn, *args):
+        """Executa fn(*args) no pool e aguarda o resultado (levanta PasswordPoolSaturatedError)"""
+        if not self._slots.acquire(blocking=False):
+            record_password_pool_rejected()
+            logger.warning("Pool de hash de senhas saturado: login recusado com 503")
+            raise PasswordPoolSaturatedError("Pool de hash de senhas saturado")
+        try:
+            future = self._get_executor().submit(self._timed, fn, args, time.perf_counter())
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            record_password_pool_rejected()
+            logger.warning(f"Hash de senha não concluído em {self.timeout}s: login recusado com 503")
+            raise PasswordPoolSaturatedError("Tempo esgotado aguardando o pool de hash de senhas")
+
+
+# Instância global do pool de hash de senhas
+password_pool = PasswordPool()
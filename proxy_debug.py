@@ -0,0 +1,143 @@
+"""
+Módulo de Debug do Proxy
+Rastreamento detalhado por aplicação, ligado em tempo de execução (endpoint admin)
+com taxa de amostragem. Mensagens só são montadas quando o rastreamento está ativo.
+"""
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger('maestro.proxy_debug')
+
+# Configuração compartilhada entre workers do gunicorn (arquivo JSON relido por mtime)
+PROXY_DEBUG_FILE = os.getenv(
+    'PROXY_DEBUG_FILE', os.path.join(tempfile.gettempdir(), 'maestro-proxy-debug.json')
+)
+# Configuração inicial opcional: "app_key:taxa,app_key2:taxa"
+PROXY_DEBUG_APPS = os.getenv('PROXY_DEBUG_APPS', '')
+# Intervalo mínimo entre verificações do arquivo (segundos)
+RELOAD_INTERVAL = 2.0
+
+
+class ProxyDebugTracer:
+    """Controla quais aplicações do proxy têm log de debug e com qual amostragem"""
+
+    def __init__(self, config_file=PROXY_DEBUG_FILE, initial=PROXY_DEBUG_APPS):
+        self.config_file = config_file
+        self._apps = {}  # app_key -> (taxa, expira_em epoch ou None)
+        self._lock = threading.Lock()
+        self._file_mtime = None
+        self._next_check = 0.0
+        seed = {}
+        for item in (initial or '').split(','):
+            if not item.strip():
+                continue
+            app_key, _, rate = item.partition(':')
+            try:
+                seed[app_key.strip()] = (float(rate or 1.0), None)
+            except ValueError:
+                continue
+        if seed:
+            # Gravar a configuração do ambiente no arquivo compartilhado: sem isso, a
+            # primeira releitura de um arquivo existente (até antigo) a descartaria
+            self._reload_if_changed()
+            with self._lock:
+                self._apps = {**self._apps, **seed}
+                self._save()
+
+    def _reload_if_changed(self):
+        """Relê o arquivo compartilhado se ele mudou (no máximo a cada RELOAD_INTERVAL)"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + RELOAD_INTERVAL
+        try:
+            mtime = os.stat(self.config_file).st_mtime
+        except OSError:
+            return
+        if mtime == self._file_mtime:
+            return
+        try:
+            with open(self.config_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            apps = {
+                key: (float(cfg.get('rate', 1.0)), cfg.get('expires_at'))
+                for key, cfg in data.get('apps', {}).items()
+            }
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Configuração de debug do proxy inválida em {self.config_file}: {e}")
+            return
+        with self._lock:
+            self._apps = apps
+            self._file_mtime = mtime
+
+    def _save(self):
+        data = {'apps': {k: {'rate': r, 'expires_at': exp} for k, (r, exp) in self._apps.items()}}
+        tmp_path = f"{self.config_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.config_file)
+            self._file_mtime = os.stat(self.config_file).st_mtime
+        except OSError as e:
+            logger.warning(f"Não foi possível salvar configuração de debug do proxy: {e}")
+
+    def enable(self, app_key, rate=1.0, ttl_seconds=None):
+        """Liga o debug para uma aplicação (rate entre 0 e 1; ttl opcional em segundos)"""
+        rate = max(0.0, min(1.0, float(rate)))
+        expires_at = time.time() + ttl_seconds if ttl_seconds else None
+        self._reload_if_changed()
+        with self._lock:
+            self._apps = {**self._apps, app_key: (rate, expires_at)}
+            self._save()
+
+    def disable(self, app_key=None):
+        """Desliga o debug de uma aplicação (ou de todas, se app_key for None)"""
+        self._reload_if_changed()
+        with self._lock:
+            if app_key is None:
+                self._apps = {}
+            else:
+                self._apps = {k: v for k, v in self._apps.items() if k != app_key}
+            self._save()
+
+    def status(self):
+        """Retorna as aplicações com debug ativo"""
+        self._reload_if_changed()
+        now = time.time()
+        return {
+            key: {'rate': rate, 'expires_in': round(exp - now) if exp else None}
+            for key, (rate, exp) in self._apps.items()
+            if not exp or exp > now
+        }
+
+    def sample(self, app_key):
+        """
+        Decide (uma vez por requisição) se esta requisição será rastreada.
+        Para aplicações sem debug ativo custa apenas uma consulta a dicionário.
+        """
+        self._reload_if_changed()
+        cfg = self._apps.get(app_key)
+        if cfg is None:
+            return False
+        rate, expires_at = cfg
+        if expires_at and expires_at < time.time():
+            return False
+        return rate >= 1.0 or random.random() < rate
+
+    def log(self, app_key, msg, *args, level=logging.INFO):
+        """
+        Registra mensagem de debug. Argumentos chamáveis são avaliados apenas aqui,
+        permitindo adiar o custo de montar listas/headers para o log.
+        """
+        if not logger.isEnabledFor(level):
+            return
+        args = tuple(arg() if callable(arg) else arg for arg in args)
+        logger.log(level, 'Proxy %s: ' + msg, app_key, *args, extra={'fields': {'app_key': app_key}})
+
+
+proxy_tracer = ProxyDebugTracer()
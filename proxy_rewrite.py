@@ -0,0 +1,854 @@
+"""
+Módulo de Reescrita de HTML do Proxy
+Pipeline aplicado às páginas HTML das apps proxyadas: reescrita das URLs (absolutas,
+atributos, tags, CSS e strings de scripts) para /proxy/<app>, remoção do CSP e injeção do
+botão Home e do script que intercepta fetch/XHR no navegador. Isolado do proxy_app para
+poder ser exercitado e medido sem servidor (ver bench/rewrite_bench.py).
+"""
+import re
+
+# CSS para o botão Home (estilo futurista)
+HOME_BUTTON_CSS = """
+<style id="maestro-home-button-style">
+.maestro-home-button {
+    position: fixed;
+    top: 20px;
+    left: 50%;
+    transform: translateX(-50%);
+    z-index: 999999;
+    background: rgba(0, 0, 0, 0.85);
+    backdrop-filter: blur(20px) saturate(180%);
+    -webkit-backdrop-filter: blur(20px) saturate(180%);
+    border: 1px solid rgba(0, 212, 255, 0.5);
+    border-radius: 12px;
+    padding: 12px 20px;
+    text-decoration: none;
+    color: #00d4ff;
+    font-family: 'Orbitron', 'Rajdhani', -apple-system, BlinkMacSystemFont, sans-serif;
+    font-weight: 600;
+    font-size: 14px;
+    letter-spacing: 0.1em;
+    text-transform: uppercase;
+    display: flex;
+    align-items: center;
+    gap: 8px;
+    transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
+    box-shadow: 0 4px 16px rgba(0, 212, 255, 0.3), 
+                0 0 20px rgba(0, 212, 255, 0.2),
+                inset 0 0 20px rgba(0, 212, 255, 0.1);
+    cursor: pointer;
+    user-select: none;
+    -webkit-user-select: none;
+    opacity: 0.9;
+}
+
+.maestro-home-button:hover {
+    opacity: 1;
+    transform: translateX(-50%) translateY(-2px) scale(1.05);
+    border-color: #00ffff;
+    box-shadow: 0 8px 32px rgba(0, 212, 255, 0.5), 
+                0 0 40px rgba(0, 212, 255, 0.4),
+                inset 0 0 30px rgba(0, 212, 255, 0.2);
+    color: #00ffff;
+}
+
+.maestro-home-button:active {
+    transform: translateX(-50%) translateY(0) scale(0.98);
+}
+
+.maestro-home-button-icon {
+    font-size: 18px;
+    line-height: 1;
+    filter: drop-shadow(0 0 8px currentColor);
+    transition: transform 0.3s ease;
+}
+
+.maestro-home-button:hover .maestro-home-button-icon {
+    transform: scale(1.2) rotate(-10deg);
+}
+
+.maestro-home-button-text {
+    position: relative;
+}
+
+.maestro-home-button::before {
+    content: '';
+    position: absolute;
+    top: -2px;
+    left: -2px;
+    right: -2px;
+    bottom: -2px;
+    background: linear-gradient(45deg, #00d4ff, #00ffff, #00d4ff);
+    border-radius: 14px;
+    opacity: 0;
+    z-index: -1;
+    filter: blur(8px);
+    transition: opacity 0.3s ease;
+}
+
+.maestro-home-button:hover::before {
+    opacity: 0.6;
+}
+
+/* Responsividade para mobile */
+@media (max-width: 768px) {
+    .maestro-home-button {
+        top: 10px;
+        left: 50%;
+        transform: translateX(-50%);
+        padding: 10px 16px;
+        font-size: 12px;
+        border-radius: 10px;
+    }
+    
+    .maestro-home-button:hover {
+        transform: translateX(-50%) translateY(-2px) scale(1.05);
+    }
+    
+    .maestro-home-button:active {
+        transform: translateX(-50%) translateY(0) scale(0.98);
+    }
+    
+    .maestro-home-button-icon {
+        font-size: 16px;
+    }
+}
+
+@media (max-width: 480px) {
+    .maestro-home-button {
+        top: 8px;
+        left: 50%;
+        transform: translateX(-50%);
+        padding: 8px 12px;
+        font-size: 11px;
+        gap: 6px;
+    }
+    
+    .maestro-home-button:hover {
+        transform: translateX(-50%) translateY(-2px) scale(1.05);
+    }
+    
+    .maestro-home-button:active {
+        transform: translateX(-50%) translateY(0) scale(0.98);
+    }
+    
+    .maestro-home-button-text {
+        display: none;
+    }
+    
+    .maestro-home-button-icon {
+        font-size: 18px;
+    }
+}
+</style>
+"""
+
+# HTML do botão Home
+HOME_BUTTON_HTML = """
+<div id="maestro-home-button-container">
+    <a href="/" class="maestro-home-button" title="Voltar para o Portal Maestro">
+        <span class="maestro-home-button-icon">🏠</span>
+        <span class="maestro-home-button-text">Home</span>
+    </a>
+</div>
+"""
+
+
+def build_proxy_script(proxy_base):
+    """Script injetado que redireciona fetch/XHR/jQuery e elementos dinâmicos para o proxy"""
+    # Sanitizar antes de injetar no script
+    # (o script é seguro, mas vamos garantir)
+    proxy_base_safe = proxy_base.replace("'", "\\'").replace('"', '\\"')
+    return f"""
+<script>
+(function() {{
+    const PROXY_BASE = '{proxy_base_safe}';
+    // Quando estamos numa página do proxy (ex: /proxy/portal-procedimentos/), /static/ deve ir para o backend da app, não do Maestro
+    const isProxyPage = window.location.pathname.startsWith(PROXY_BASE);
+    
+    // Função para verificar se uma URL deve ser redirecionada para o proxy
+    function shouldProxy(url) {{
+        if (typeof url !== 'string') return false;
+        
+        // Verificar se é URL absoluta que aponta para o próprio domínio
+        try {{
+            const urlObj = new URL(url, window.location.origin);
+            const currentOrigin = window.location.origin;
+            // Se a URL absoluta aponta para o mesmo domínio, tratar como relativa
+            if (urlObj.origin === currentOrigin) {{
+                url = urlObj.pathname + (urlObj.search || '') + (urlObj.hash || '');
+            }} else {{
+                // URL absoluta para outro domínio - não proxy
+                return false;
+            }}
+        }} catch (e) {{
+            // Se não conseguir fazer parse, tratar como relativa
+        }}
+        
+        // Não proxy URLs que já estão no proxy
+        if (url.startsWith(PROXY_BASE)) return false;
+        // Não proxy URLs do próprio Maestro (login, logout; /static/ só quando NÃO estamos numa app proxyada)
+        if (url.startsWith('/login') || url.startsWith('/logout')) return false;
+        if (url.startsWith('/static/') && !isProxyPage) return false;
+        // Proxy todas as outras URLs relativas (incluindo /, /api/, /static/ quando isProxyPage, etc.)
+        return url.startsWith('/') || url === '';
+    }}
+    
+    // Interceptar também tags <link> e <img> que podem ser adicionadas dinamicamente
+    const originalCreateElement = document.createElement;
+    document.createElement = function(tagName, options) {{
+        const element = originalCreateElement.call(this, tagName, options);
+        if (tagName.toLowerCase() === 'link' || tagName.toLowerCase() === 'img' || tagName.toLowerCase() === 'script') {{
+            const originalSetAttribute = element.setAttribute.bind(element);
+            element.setAttribute = function(name, value) {{
+                if ((name === 'href' || name === 'src') && shouldProxy(value)) {{
+                    value = PROXY_BASE + value;
+                }}
+                return originalSetAttribute(name, value);
+            }};
+        }}
+        return element;
+    }};
+    
+    // Interceptar fetch() - interceptação mais agressiva para APIs
+    const originalFetch = window.fetch;
+    window.fetch = function(url, options) {{
+        const originalUrl = url;
+        let finalUrl = url;
+        const currentOrigin = window.location.origin;
+        
+        // Função auxiliar para processar URL
+        function processUrl(urlString) {{
+            if (!urlString || typeof urlString !== 'string') return urlString;
+            
+            try {{
+                const urlObj = new URL(urlString, currentOrigin);
+                // Se a URL aponta para o mesmo domínio, processar
+                if (urlObj.origin === currentOrigin) {{
+                    let path = urlObj.pathname + (urlObj.search || '') + (urlObj.hash || '');
+                    // Não interceptar URLs do Maestro (login, logout; /static/ só quando NÃO estamos numa app proxyada)
+                    if (path.startsWith('/login') || path.startsWith('/logout')) {{
+                        return urlString; // Retornar original
+                    }}
+                    if (path.startsWith('/static/') && !isProxyPage) {{
+                        return urlString; // Arquivos estáticos do Maestro
+                    }}
+                    // Não interceptar se já está no proxy
+                    if (path.startsWith(PROXY_BASE)) {{
+                        return urlString; // Retornar original
+                    }}
+                    // Interceptar todas as outras URLs do mesmo domínio (incluindo /, /api/, etc.)
+                    if (path === '' || path === '/') {{
+                        return PROXY_BASE + '/';
+                    }} else {{
+                        return PROXY_BASE + path;
+                    }}
+                }}
+            }} catch (e) {{
+                // Se não conseguir fazer parse, tratar como relativa
+                const skipStatic = urlString.startsWith('/static/') && !isProxyPage;
+                if (urlString.startsWith('/') && !urlString.startsWith('/login') && !urlString.startsWith('/logout') && !skipStatic && !urlString.startsWith(PROXY_BASE)) {{
+                    if (urlString === '/') {{
+                        return PROXY_BASE + '/';
+                    }} else {{
+                        return PROXY_BASE + urlString;
+                    }}
+                }}
+            }}
+            return urlString; // Retornar original se não precisar interceptar
+        }}
+        
+        // Processar URL baseado no tipo
+        if (typeof url === 'string') {{
+            finalUrl = processUrl(url);
+            if (finalUrl !== originalUrl) {{
+                console.log('[Maestro Proxy] Interceptando fetch (string):', originalUrl, '->', finalUrl);
+            }}
+        }} else if (url instanceof Request) {{
+            const processedUrl = processUrl(url.url);
+            if (processedUrl !== url.url) {{
+                console.log('[Maestro Proxy] Interceptando fetch (Request):', url.url, '->', processedUrl);
+                // IMPORTANTE: Quando criamos um novo Request, precisamos passar o objeto Request original
+                // como segundo parâmetro para preservar todas as propriedades (método, headers, body, etc.)
+                // O construtor Request aceita um objeto Request como segundo parâmetro e copia todas as propriedades
+                finalUrl = new Request(processedUrl, url);
+            }} else {{
+                finalUrl = url;
+            }}
+        }}
+        
+        // Se ainda assim for vazio ou raiz, forçar proxy base
+        if (typeof finalUrl === 'string' && (finalUrl === '' || finalUrl === '/' || finalUrl === currentOrigin || finalUrl === currentOrigin + '/')) {{
+            const forced = PROXY_BASE + '/';
+            console.warn('[Maestro Proxy] Forçando proxy para requisição vazia/raiz:', originalUrl, '->', forced);
+            finalUrl = forced;
+        }}
+        
+        // Verificação final: se a URL final ainda aponta para a raiz do Maestro, forçar proxy
+        if (typeof finalUrl === 'string') {{
+            try {{
+                const finalUrlObj = new URL(finalUrl, currentOrigin);
+                if (finalUrlObj.origin === currentOrigin && (finalUrlObj.pathname === '/' || finalUrlObj.pathname === '')) {{
+                    if (!finalUrl.startsWith(PROXY_BASE)) {{
+                        const forced = PROXY_BASE + '/';
+                        console.error('[Maestro Proxy] ERRO: URL ainda aponta para raiz após processamento!', originalUrl, '->', forced);
+                        finalUrl = forced;
+                    }}
+                }}
+            }} catch (e) {{
+                // Ignorar erros de parsing
+            }}
+        }}
+        
+        // Log final para debug (apenas para apontamento-inspecao-final)
+        const isInspecaoFinal = window.location.pathname.includes('apontamento-inspecao-final');
+        if (isInspecaoFinal) {{
+            const method = options?.method || (finalUrl instanceof Request ? finalUrl.method : 'GET');
+            const urlStr = typeof finalUrl === 'string' ? finalUrl : (finalUrl instanceof Request ? finalUrl.url : String(finalUrl));
+            console.log('[Maestro Proxy] Fetch final:', {{
+                original: typeof originalUrl === 'string' ? originalUrl : (originalUrl instanceof Request ? originalUrl.url : String(originalUrl)),
+                final: urlStr,
+                method: method,
+                hasBody: !!(options?.body || (finalUrl instanceof Request ? finalUrl.body : null))
+            }});
+        }}
+        
+        return originalFetch.call(this, finalUrl, options);
+    }};
+    
+    // Interceptar também antes do DOM estar pronto (executar imediatamente)
+    console.log('[Maestro Proxy] Script carregado, PROXY_BASE =', PROXY_BASE);
+    
+    // Garantir que a interceptação está ativa
+    // Verificar periodicamente se fetch foi sobrescrito (a cada 100ms)
+    setInterval(function() {{
+        if (window.fetch !== originalFetch && !window.fetch.toString().includes('PROXY_BASE')) {{
+            console.warn('[Maestro Proxy] fetch foi sobrescrito, reaplicando interceptação');
+            // Reaplicar interceptação (o código já está acima)
+        }}
+    }}, 100);
+    
+    // Interceptar XMLHttpRequest - interceptação mais agressiva
+    const originalOpen = XMLHttpRequest.prototype.open;
+    XMLHttpRequest.prototype.open = function(method, url, async, user, password) {{
+        const originalUrl = url;
+        const currentOrigin = window.location.origin;
+        
+        // Processar URL similar ao fetch
+        if (typeof url === 'string') {{
+            try {{
+                const urlObj = new URL(url, currentOrigin);
+                if (urlObj.origin === currentOrigin) {{
+                    let path = urlObj.pathname + (urlObj.search || '') + (urlObj.hash || '');
+                    const skipStatic = path.startsWith('/static/') && !isProxyPage;
+                    if (!path.startsWith('/login') && !path.startsWith('/logout') && !skipStatic && !path.startsWith(PROXY_BASE)) {{
+                        if (path === '' || path === '/') {{
+                            url = PROXY_BASE + '/';
+                        }} else {{
+                            url = PROXY_BASE + path;
+                        }}
+                        console.log('[Maestro Proxy] Interceptando XHR:', originalUrl, '->', url);
+                    }}
+                }}
+            }} catch (e) {{
+                const skipStatic = url.startsWith('/static/') && !isProxyPage;
+                if (url.startsWith('/') && !url.startsWith('/login') && !url.startsWith('/logout') && !skipStatic && !url.startsWith(PROXY_BASE)) {{
+                    if (url === '/') {{
+                        url = PROXY_BASE + '/';
+                    }} else {{
+                        url = PROXY_BASE + url;
+                    }}
+                    console.log('[Maestro Proxy] Interceptando XHR (relativa):', originalUrl, '->', url);
+                }}
+            }}
+        }}
+
+        // Se ainda assim for vazio ou raiz, forçar proxy base
+        if (url === '' || url === '/' || url === currentOrigin || url === currentOrigin + '/') {{
+            const forced = PROXY_BASE + '/';
+            console.warn('[Maestro Proxy] Forçando proxy XHR para requisição vazia/raiz:', originalUrl, '->', forced);
+            url = forced;
+        }}
+        
+        return originalOpen.call(this, method, url, async, user, password);
+    }};
+    
+    // Interceptar $.ajax do jQuery se estiver disponível
+    if (window.jQuery && window.jQuery.ajaxSetup) {{
+        const originalAjax = window.jQuery.ajax;
+        window.jQuery.ajax = function(options) {{
+            if (options && options.url && shouldProxy(options.url)) {{
+                options.url = PROXY_BASE + options.url;
+            }}
+            return originalAjax.call(this, options);
+        }};
+    }}
+    
+    // IMPORTANTE: O fetch() interceptado acima já captura imports dinâmicos (import())
+    // porque o navegador usa fetch internamente para carregar módulos ES6.
+    // As melhorias no servidor (Content-Type correto, headers de cache) devem
+    // resolver o problema intermitente de "Failed to fetch dynamically imported module"
+    
+    console.log('[Maestro Proxy] Interceptação completa configurada (fetch, XHR, jQuery)');
+    console.log('[Maestro Proxy] Imports dinâmicos serão interceptados automaticamente via fetch');
+}})();
+</script>
+"""
+
+
+def rewrite_urls(content, app_key, target_url):
+    """
+    Ajusta as URLs do HTML da app para passarem pelo proxy (passos 0 a 5) e remove o CSP
+    """
+    # Substituir URLs absolutas da aplicação original por URLs do proxy
+    target_base = target_url.rstrip('/')
+    proxy_base = f'/proxy/{app_key}'
+
+    # Ajustar URLs de recursos (CSS, JS, imagens, etc.)
+    # 0. Para buffer-forno, PRIMEIRO capturar recursos estáticos na raiz (como /styles.css, /background2.png)
+    # Isso deve ser feito ANTES de outras substituições para garantir que seja capturado
+    if app_key == 'buffer-forno':
+        static_extensions = ['.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.webp', '.woff', '.woff2', '.ttf', '.eot']
+        # Padrão para capturar qualquer arquivo que comece com / e termine com extensão estática
+        # Exemplos: /styles.css, /background2.png, /script.js
+        ext_pattern = '|'.join([re.escape(ext) for ext in static_extensions])
+
+        # Capturar em atributos: href="/styles.css", src="/background2.png"
+        pattern = rf'(href|src|action|data-src|data-href|data-url|data-action|background|background-image)\s*=\s*(["\']?)(/[^"\'>\s]*\.(?:{ext_pattern}))(["\']?)'
+        def replace_static_attr(match):
+            attr = match.group(1)
+            quote = match.group(2)
+            url = match.group(3)
+            end_quote = match.group(4)
+            if (not url.startswith(proxy_base) and 
+                not url.startswith('/buffer') and 
+                not url.startswith('/login') and 
+                not url.startswith('/logout') and 
+                not url.startswith('/static/')):
+                return f'{attr}={quote}{proxy_base}/buffer{url}{end_quote}'
+            return match.group(0)
+
+        content = re.sub(
+            pattern,
+            replace_static_attr,
+            content,
+            flags=re.IGNORECASE
+        )
+
+        # Capturar também em tags: <link href="/styles.css">, <img src="/background2.png">
+        pattern_tag = rf'(<link[^>]*href\s*=\s*["\']?)(/[^"\'>\s]*\.(?:{ext_pattern}))(["\']?[^>]*>)'
+        def replace_static_tag(match):
+            start = match.group(1)
+            url = match.group(2)
+            end = match.group(3)
+            if not url.startswith(proxy_base) and not url.startswith('/buffer'):
+                return f'{start}{proxy_base}/buffer{url}{end}'
+            return match.group(0)
+
+        content = re.sub(
+            pattern_tag,
+            replace_static_tag,
+            content,
+            flags=re.IGNORECASE
+        )
+
+        pattern_img = rf'(<img[^>]*src\s*=\s*["\']?)(/[^"\'>\s]*\.(?:{ext_pattern}))(["\']?[^>]*>)'
+        content = re.sub(
+            pattern_img,
+            replace_static_tag,
+            content,
+            flags=re.IGNORECASE
+        )
+
+    # 1. URLs absolutas que apontam para a aplicação original
+    content = re.sub(
+        rf'{re.escape(target_base)}(/[^"\'>\s]*)',
+        rf'{proxy_base}\1',
+        content,
+        flags=re.IGNORECASE
+    )
+
+    # 1.0. Para dashboard-ocupacao-forno e dashboard-ocupacao-hoje, capturar recursos estáticos na raiz
+    if app_key == 'dashboard-ocupacao-forno' or app_key == 'dashboard-ocupacao-hoje':
+        static_extensions = ['.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.webp', '.woff', '.woff2', '.ttf', '.eot']
+        ext_pattern = '|'.join([re.escape(ext) for ext in static_extensions])
+
+        # Capturar recursos estáticos que começam com / (ex: /information.png, /styles.css)
+        pattern = rf'(href|src|action|data-src|data-href|data-url|data-action|background|background-image)\s*=\s*(["\']?)(/[^"\'>\s]*\.(?:{ext_pattern}))(["\']?)'
+        def replace_dashboard_static(match):
+            attr = match.group(1)
+            quote = match.group(2)
+            url = match.group(3)
+            end_quote = match.group(4)
+            # Se não começar com /proxy/ e não for /dashboard_ocupacao, adicionar proxy_base
+            if (not url.startswith(proxy_base) and 
+                not url.startswith('/dashboard_ocupacao') and 
+                not url.startswith('/login') and 
+                not url.startswith('/logout') and 
+                not url.startswith('/static/')):
+                return f'{attr}={quote}{proxy_base}{url}{end_quote}'
+            return match.group(0)
+
+        content = re.sub(
+            pattern,
+            replace_dashboard_static,
+            content,
+            flags=re.IGNORECASE
+        )
+
+    # 1.1. Para buffer-forno, também substituir URLs que começam com /buffer
+    if app_key == 'buffer-forno':
+        # Substituir /buffer/... por /proxy/buffer-forno/buffer/...
+        content = re.sub(
+            r'(href|src|action|data-src|data-href|data-url|data-action|background|background-image)\s*=\s*(["\']?)(/buffer/[^"\'>\s]*)(["\']?)',
+            lambda m: f'{m.group(1)}={m.group(2)}{proxy_base}{m.group(3)[6:]}{m.group(4)}' if not m.group(3).startswith(proxy_base) else m.group(0),
+            content,
+            flags=re.IGNORECASE
+        )
+        # Substituir /buffer (sem barra final) também
+        content = re.sub(
+            r'(href|src|action|data-src|data-href|data-url|data-action|background|background-image)\s*=\s*(["\']?)(/buffer)(["\']?)',
+            lambda m: f'{m.group(1)}={m.group(2)}{proxy_base}/buffer{m.group(4)}' if not m.group(3).startswith(proxy_base) else m.group(0),
+            content,
+            flags=re.IGNORECASE
+        )
+
+    # 1.5. Capturar URLs que começam com /assets/, /static/, /css/, /js/, /images/, etc.
+    # Essas são comuns em aplicações web e precisam ser proxyadas
+    common_paths = ['/assets/', '/static/', '/css/', '/js/', '/images/', '/img/', '/fonts/', '/vendor/']
+    for common_path in common_paths:
+        # Substituir em atributos href e src
+        pattern = rf'((?:href|src|action)\s*=\s*["\']?)({re.escape(common_path)}[^"\'>\s]*)'
+        content = re.sub(
+            pattern,
+            lambda m: f'{m.group(1)}{proxy_base}{m.group(2)}' if not m.group(2).startswith(proxy_base) else m.group(0),
+            content,
+            flags=re.IGNORECASE
+        )
+
+    # 1.6. Para buffer-forno, capturar recursos estáticos que começam com / (como /styles.css, /background2.png)
+    # Estes recursos estão na raiz da aplicação /buffer, então precisam ser proxyados como /proxy/buffer-forno/buffer/...
+    if app_key == 'buffer-forno':
+        static_extensions = ['.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.webp', '.woff', '.woff2', '.ttf', '.eot']
+
+        # Função para substituir recursos estáticos na raiz
+        def replace_buffer_static(match):
+            attr = match.group(1)
+            quote = match.group(2) if match.lastindex >= 2 else '"'
+            url = match.group(3) if match.lastindex >= 3 else match.group(2)
+            end_quote = match.group(4) if match.lastindex >= 4 else quote
+
+            # Não substituir se já estiver no proxy ou for URL absoluta
+            if url.startswith(proxy_base) or url.startswith('http://') or url.startswith('https://') or url.startswith('//'):
+                return match.group(0)
+            # Não substituir URLs do Maestro
+            if url.startswith('/login') or url.startswith('/logout') or url.startswith('/static/'):
+                return match.group(0)
+            # Não substituir se já começar com /buffer (já está correto)
+            if url.startswith('/buffer'):
+                return match.group(0)
+            # Substituir recursos estáticos que começam com / e têm extensão
+            if url.startswith('/') and any(url.lower().endswith(ext) for ext in static_extensions):
+                return f'{attr}={quote}{proxy_base}/buffer{url}{end_quote}'
+            return match.group(0)
+
+        # Aplicar substituição para recursos estáticos em atributos HTML
+        # Padrão mais específico para capturar /arquivo.ext
+        content = re.sub(
+            r'(href|src|action|data-src|data-href|data-url|data-action|background|background-image)\s*=\s*(["\']?)(/[^"\'>\s]*\.(?:css|js|png|jpg|jpeg|gif|svg|ico|webp|woff|woff2|ttf|eot))(["\']?)',
+            replace_buffer_static,
+            content,
+            flags=re.IGNORECASE
+        )
+
+        # Também capturar URLs que começam diretamente com / e têm extensão (sem atributo explícito)
+        # Isso pode acontecer em alguns contextos
+        content = re.sub(
+            r'(["\'])(/[^"\']*\.(?:css|js|png|jpg|jpeg|gif|svg|ico|webp|woff|woff2|ttf|eot))(["\'])',
+            lambda m: f'{m.group(1)}{proxy_base}/buffer{m.group(2)}{m.group(3)}' if not m.group(2).startswith(proxy_base) and not m.group(2).startswith('/buffer') and not m.group(2).startswith('/login') and not m.group(2).startswith('/logout') and not m.group(2).startswith('/static/') else m.group(0),
+            content,
+            flags=re.IGNORECASE
+        )
+
+    # 2. URLs relativas em atributos HTML (href, src, action, url, data-src, etc.)
+    # Melhorar regex para capturar mais padrões, incluindo URLs sem aspas
+    def replace_html_url(match):
+        attr = match.group(1)
+        quote = match.group(2) if match.lastindex >= 2 else '"'
+        url = match.group(3) if match.lastindex >= 3 else match.group(2)
+        end_quote = match.group(4) if match.lastindex >= 4 else quote
+        # Não substituir se já estiver no proxy ou for URL absoluta
+        if url.startswith(proxy_base) or url.startswith('http://') or url.startswith('https://') or url.startswith('//'):
+            return match.group(0)
+        # Não substituir URLs do Maestro
+        if url.startswith('/login') or url.startswith('/logout') or url.startswith('/static/'):
+            return match.group(0)
+        # Para buffer-forno, não substituir se já começar com /buffer
+        if app_key == 'buffer-forno' and url.startswith('/buffer'):
+            return match.group(0)
+        # Substituir URLs relativas
+        if url.startswith('/'):
+            # Para buffer-forno, adicionar /buffer antes da URL
+            if app_key == 'buffer-forno':
+                return f'{attr}={quote}{proxy_base}/buffer{url}{end_quote}'
+            # Para dashboard-ocupacao-forno e outras apps, reescrever para passar pelo proxy
+            # URLs que começam com /dashboard_ocupacao precisam passar pelo proxy
+            else:
+                return f'{attr}={quote}{proxy_base}{url}{end_quote}'
+        return match.group(0)
+
+    # Padrão mais abrangente para atributos HTML
+    content = re.sub(
+        r'(href|src|action|data-src|data-href|data-url|data-action|background|background-image)\s*=\s*(["\']?)(/[^"\'>\s]*)(["\']?)',
+        replace_html_url,
+        content,
+        flags=re.IGNORECASE
+    )
+
+    # Também capturar URLs em atributos sem aspas (menos comum mas possível)
+    content = re.sub(
+        r'(href|src|action)\s*=\s*([^"\'>\s/]+)(/[^"\'>\s]*)',
+        lambda m: f'{m.group(1)}="{proxy_base}{m.group(3)}"' if m.group(3).startswith('/') and not m.group(3).startswith(proxy_base) else m.group(0),
+        content,
+        flags=re.IGNORECASE
+    )
+
+    # 2.5. Substituição específica para tags <link> (CSS) - importante para recursos estáticos
+    # Capturar <link rel="stylesheet" href="/assets/...">
+    def replace_link_tag(match):
+        href = match.group(2)
+        if href.startswith(proxy_base) or href.startswith('/static/'):
+            return match.group(0)
+        # Para buffer-forno, recursos que começam com / e não são /buffer precisam de /buffer antes
+        if app_key == 'buffer-forno' and href.startswith('/') and not href.startswith('/buffer'):
+            # Verificar se é um recurso estático (tem extensão)
+            static_exts = ['.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.webp']
+            if any(href.lower().endswith(ext) for ext in static_exts):
+                return f'{match.group(1)}{proxy_base}/buffer{href}{match.group(3)}'
+            # Se não for recurso estático conhecido, também adicionar /buffer
+            return f'{match.group(1)}{proxy_base}/buffer{href}{match.group(3)}'
+        # Para dashboard-ocupacao-forno, recursos estáticos na raiz não precisam de /dashboard_ocupacao
+        elif href.startswith('/'):
+            return f'{match.group(1)}{proxy_base}{href}{match.group(3)}'
+        return match.group(0)
+
+    content = re.sub(
+        r'(<link[^>]*href\s*=\s*["\']?)(/[^"\'>\s]+)(["\']?[^>]*>)',
+        replace_link_tag,
+        content,
+        flags=re.IGNORECASE
+    )
+
+    # 2.6. Substituição específica para tags <script> (JavaScript)
+    # Capturar <script src="/js/...">
+    def replace_script_tag(match):
+        src = match.group(2)
+        if src.startswith(proxy_base) or src.startswith('/static/'):
+            return match.group(0)
+        if app_key == 'buffer-forno' and src.startswith('/') and not src.startswith('/buffer'):
+            return f'{match.group(1)}{proxy_base}/buffer{src}{match.group(3)}'
+        # Para dashboard-ocupacao-forno, recursos estáticos na raiz não precisam de /dashboard_ocupacao
+        elif src.startswith('/'):
+            return f'{match.group(1)}{proxy_base}{src}{match.group(3)}'
+        return match.group(0)
+
+    content = re.sub(
+        r'(<script[^>]*src\s*=\s*["\']?)(/[^"\'>\s]+)(["\']?[^>]*>)',
+        replace_script_tag,
+        content,
+        flags=re.IGNORECASE
+    )
+
+    # 2.7. Substituição específica para tags <img> (imagens)
+    # Capturar <img src="/images/...">
+    def replace_img_tag(match):
+        src = match.group(2)
+        if src.startswith(proxy_base) or src.startswith('/static/'):
+            return match.group(0)
+        # Para buffer-forno, recursos que começam com / e não são /buffer precisam de /buffer antes
+        if app_key == 'buffer-forno' and src.startswith('/') and not src.startswith('/buffer'):
+            # Verificar se é um recurso estático (tem extensão de imagem)
+            img_exts = ['.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.webp']
+            if any(src.lower().endswith(ext) for ext in img_exts):
+                return f'{match.group(1)}{proxy_base}/buffer{src}{match.group(3)}'
+            # Se não for recurso estático conhecido, também adicionar /buffer
+            return f'{match.group(1)}{proxy_base}/buffer{src}{match.group(3)}'
+        elif src.startswith('/'):
+            return f'{match.group(1)}{proxy_base}{src}{match.group(3)}'
+        return match.group(0)
+
+    content = re.sub(
+        r'(<img[^>]*src\s*=\s*["\']?)(/[^"\'>\s]+)(["\']?[^>]*>)',
+        replace_img_tag,
+        content,
+        flags=re.IGNORECASE
+    )
+
+    # 3. URLs em CSS inline (url(...))
+    def replace_css_url(match):
+        url_path = match.group(1)
+        if url_path.startswith(proxy_base) or url_path.startswith('/static/'):
+            return match.group(0)
+        if app_key == 'buffer-forno' and url_path.startswith('/') and not url_path.startswith('/buffer'):
+            return f'url("{proxy_base}/buffer{url_path}")'
+        elif url_path.startswith('/'):
+            return f'url("{proxy_base}{url_path}")'
+        return match.group(0)
+
+    content = re.sub(
+        r'url\s*\(\s*["\']?(/[^"\')\s]*)["\']?\s*\)',
+        replace_css_url,
+        content,
+        flags=re.IGNORECASE
+    )
+
+    # 4. URLs em JavaScript inline (mais específico para evitar falsos positivos)
+    # Captura apenas strings que parecem URLs (contêm / e não são comentários)
+    # IMPORTANTE: Não modificar regex patterns dentro de scripts para evitar erros
+    def replace_js_urls(match):
+        quote = match.group(1)
+        url = match.group(2)
+        end_quote = match.group(3)
+
+        # Não modificar se parecer ser parte de uma regex (contém padrões de regex)
+        # Verificar padrões comuns de regex que não são URLs
+        regex_patterns = [
+            r'^\*',  # Começa com *
+            r'\+\s*$',  # Termina com +
+            r'\?\s*$',  # Termina com ?
+            r'^\[',  # Começa com [
+            r'^\{',  # Começa com {
+            r'\|\|',  # Contém ||
+            r'\^\s*$',  # Termina com ^
+            r'\$\s*$',  # Termina com $
+        ]
+        if any(re.search(pattern, url) for pattern in regex_patterns):
+            return match.group(0)
+
+        # Se contém caracteres de regex mas parece ser uma URL (tem extensão de arquivo)
+        if any(char in url for char in ['*', '+', '?', '(', ')', '[', ']', '{', '}', '|', '^', '$']):
+            # Se não parece ser uma URL (não tem extensão de arquivo comum), provavelmente é regex
+            if not any(url.lower().endswith(ext) for ext in ['.js', '.css', '.html', '.json', '.xml', '.png', '.jpg', '.gif', '.svg', '.ico']):
+                # Mas ainda pode ser uma URL se começa com / e tem / no meio
+                if not (url.startswith('/') and '/' in url[1:]):
+                    return match.group(0)
+
+        # Só substituir se parecer uma URL (começa com / e não é // ou já está no proxy)
+        # Ser mais conservador para evitar modificar regex patterns
+        if (url.startswith('/') and 
+            not url.startswith('//') and 
+            not url.startswith(proxy_base) and
+            not url.startswith('/login') and
+            not url.startswith('/logout')):
+            # Verificar se é realmente uma URL (tem extensão de arquivo ou parece ser um path)
+            is_url = (
+                any(url.lower().endswith(ext) for ext in ['.js', '.css', '.html', '.json', '.xml', '.png', '.jpg', '.gif', '.svg', '.ico']) or
+                ('/' in url and url.count('/') >= 1) or
+                url.endswith('/')
+            )
+            if is_url:
+                # Para buffer-forno, adicionar /buffer antes da URL
+                if app_key == 'buffer-forno' and not url.startswith('/buffer'):
+                    return f'{quote}{proxy_base}/buffer{url}{end_quote}'
+                else:
+                    return f'{quote}{proxy_base}{url}{end_quote}'
+        return match.group(0)
+
+    # Aplicar apenas em contextos JavaScript (dentro de <script> tags)
+    # Mas pular scripts que são type="text/template" ou similares
+    script_pattern = r'(<script[^>]*>)(.*?)(</script>)'
+    def process_script(match):
+        script_start = match.group(1)
+        script_content = match.group(2)
+        script_end = match.group(3)
+
+        # Pular se for template ou tipo especial
+        if 'type=' in script_start.lower() and any(t in script_start.lower() for t in ['template', 'text/template', 'text/x-handlebars']):
+            return match.group(0)
+
+        # Para buffer-forno, ser mais agressivo na substituição de URLs
+        # Mas ainda evitar modificar regex patterns
+        if app_key == 'buffer-forno':
+            # Substituir URLs que claramente são recursos (têm extensão de arquivo)
+            def replace_buffer_js_url(m):
+                quote = m.group(1)
+                url = m.group(2)
+                end_quote = m.group(3)
+
+                # Verificar se é realmente uma URL de recurso (tem extensão)
+                static_exts = ['.js', '.css', '.html', '.json', '.xml', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico']
+                if (url.startswith('/') and 
+                    not url.startswith('//') and 
+                    not url.startswith(proxy_base) and
+                    not url.startswith('/buffer') and
+                    any(url.lower().endswith(ext) for ext in static_exts)):
+                    return f'{quote}{proxy_base}/buffer{url}{end_quote}'
+                return m.group(0)
+
+            script_content = re.sub(
+                r'(["\'])(/[^"\']*\.(?:js|css|html|json|xml|png|jpg|jpeg|gif|svg|ico))(["\'])',
+                replace_buffer_js_url,
+                script_content,
+                flags=re.IGNORECASE
+            )
+        else:
+            # Para outras aplicações, usar lógica mais conservadora
+            script_content = re.sub(
+                r'(["\'])(/[^"\']*)(["\'])',
+                replace_js_urls,
+                script_content,
+                flags=re.IGNORECASE
+            )
+        return f'{script_start}{script_content}{script_end}'
+
+    content = re.sub(
+        script_pattern,
+        process_script,
+        content,
+        flags=re.IGNORECASE | re.DOTALL
+    )
+
+    # 5. Remover CSP do HTML proxyado se existir (para não conflitar)
+    content = re.sub(
+        r'<meta[^>]*http-equiv=["\']Content-Security-Policy["\'][^>]*>',
+        '',
+        content,
+        flags=re.IGNORECASE
+    )
+    return content
+
+
+def inject_proxy_ui(content, app_key):
+    """Injeta o CSS/script do proxy no <head> e o botão Home no início do <body>"""
+    head_injection = HOME_BUTTON_CSS + build_proxy_script(f'/proxy/{app_key}')
+
+    # Injetar CSS e script antes do fechamento do </head>
+    if '</head>' in content:
+        content = content.replace('</head>', head_injection + '</head>')
+    elif '<body' in content:
+        # Se não tiver </head>, injetar no início do body (CSS e script funcionam no body também)
+        content = re.sub(r'(<body[^>]*>)', r'\1' + head_injection, content, flags=re.IGNORECASE)
+    else:
+        # Se não tiver nem </head> nem <body>, adicionar no início
+        content = head_injection + content
+
+    # Injetar HTML do botão no <body>
+    if '<body' in content:
+        # Verificar se o botão já não foi inserido
+        if 'maestro-home-button-container' not in content:
+            # Inserir no início do body
+            content = re.sub(
+                r'(<body[^>]*>)',
+                r'\1' + HOME_BUTTON_HTML,
+                content,
+                flags=re.IGNORECASE
+            )
+    else:
+        # Se não tiver body, adicionar o botão no final do conteúdo
+        content = content + HOME_BUTTON_HTML
+    return content
+
+
+def rewrite_html(content, app_key, target_url):
+    """Pipeline completo aplicado às respostas HTML do proxy_app"""
+    return inject_proxy_ui(rewrite_urls(content, app_key, target_url), app_key)
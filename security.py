@@ -13,19 +13,12 @@ from urllib.parse import urlparse
 from bleach import clean
 from functools import wraps
 import time
+from monitoring import record_rate_limit_check, record_rate_limit_hit
+from log_queue import configure_logger
 
-# Configurar logging de segurança
+# Configurar logging de segurança (escrita assíncrona via fila, ver log_queue)
 security_logger = logging.getLogger('security')
-security_logger.setLevel(logging.WARNING)
-
-# Handler para arquivo de log de segurança (opcional)
-if not security_logger.handlers:
-    handler = logging.StreamHandler()
-    handler.setFormatter(logging.Formatter(
-        '%(asctime)s [SECURITY] %(levelname)s: %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    ))
-    security_logger.addHandler(handler)
+configure_logger(security_logger, logging.WARNING)
 
 # Função para obter IP real do cliente (atrás de proxy Nginx)
 def get_real_ip():
@@ -42,6 +35,10 @@ def get_real_ip():
     # Fallback para remote_addr
     return request.remote_addr or '127.0.0.1'
 
+def _on_rate_limit_breach(request_limit):
+    """Callback do Flask-Limiter: contabiliza bloqueios por rota no monitoramento"""
+    record_rate_limit_hit(request.endpoint or request.path)
+
 # Instâncias globais (serão inicializadas em init_security)
 csrf = CSRFProtect()
 limiter = Limiter(
@@ -49,9 +46,53 @@ limiter = Limiter(
     default_limits=["1000 per hour"],  # Limite padrão mais alto
     storage_uri="memory://",
     default_limits_per_method=True,  # Limites por método HTTP
-    default_limits_exempt_when=lambda: False  # Não isentar por padrão
+    default_limits_exempt_when=lambda: False,  # Não isentar por padrão
+    on_breach=_on_rate_limit_breach
 )
 
+# Isenção de rate limiting por (endpoint, método), calculada uma vez no startup
+# (os limites em si continuam resolvidos pelo Flask-Limiter)
+_exempt_endpoints = {}
+
+def _is_exempt_path(path, method):
+    """Regras de isenção do rate limiting por path/método"""
+    # Isentar rotas de proxy (muitas requisições ao carregar página)
+    if path.startswith('/proxy/'):
+        return True
+    # Isentar rota de API (apenas redirecionamento interno)
+    if path.startswith('/api/'):
+        return True
+    # Isentar recursos estáticos (incluindo os com fingerprint)
+    if path.startswith('/static/') or path.startswith('/assets/'):
+        return True
+    # Isentar favicon
+    if path == '/favicon.ico':
+        return True
+    # Isentar GET na rota de login (apenas visualização da página)
+    # POST (tentativas de login) ainda serão limitadas pelo decorator
+    if path == '/login' and method == 'GET':
+        return True
+    # Isentar GET na rota raiz (apenas visualização)
+    if path == '/' and method == 'GET':
+        return True
+    return False
+
+def build_limit_decision_table(app):
+    """
+    Pré-calcula a isenção de rate limiting para cada endpoint/método registrado.
+    Deve ser chamada depois que todas as rotas foram registradas; a partir daí o
+    request_filter faz apenas uma consulta ao dicionário por requisição.
+    """
+    table = {}
+    for rule in app.url_map.iter_rules():
+        for method in rule.methods or ():
+            table[(rule.endpoint, method)] = _is_exempt_path(rule.rule, method)
+    _exempt_endpoints.clear()
+    _exempt_endpoints.update(table)
+    exempt = sum(1 for value in table.values() if value)
+    logging.info(f"Tabela de rate limiting: {len(table)} combinações endpoint/método pré-calculadas ({exempt} isentas)")
+    return dict(table)
+
 def init_security(app):
     """Inicializa todas as proteções de segurança"""
     # CSRF Protection
@@ -61,33 +102,30 @@ def init_security(app):
     # próprios mecanismos de segurança
     
     # Rate Limiting
+    # Medir a latência da verificação: o primeiro hook roda antes do limiter e o
+    # segundo logo depois (before_request executa na ordem de registro)
+    @app.before_request
+    def _start_rate_limit_timer():
+        g.rate_limit_check_start = time.perf_counter()
+    
     limiter.init_app(app)
     
+    @app.before_request
+    def _record_rate_limit_timer():
+        start = g.pop('rate_limit_check_start', None)
+        if start is not None:
+            record_rate_limit_check(time.perf_counter() - start)
+    
     # Isentar rotas de proxy e recursos estáticos do rate limiting padrão
     # (elas têm muitas requisições legítimas ao carregar uma página)
+    # A isenção vem da tabela pré-calculada (build_limit_decision_table); requisições
+    # sem endpoint (404, redirecionamentos de barra) usam as regras por path
     @limiter.request_filter
     def exempt_proxy_and_static():
-        from flask import request
-        # Isentar rotas de proxy (muitas requisições ao carregar página)
-        if request.path.startswith('/proxy/'):
-            return True
-        # Isentar rota de API (apenas redirecionamento interno)
-        if request.path.startswith('/api/'):
-            return True
-        # Isentar recursos estáticos
-        if request.path.startswith('/static/'):
-            return True
-        # Isentar favicon
-        if request.path == '/favicon.ico':
-            return True
-        # Isentar GET na rota de login (apenas visualização da página)
-        # POST (tentativas de login) ainda serão limitadas pelo decorator
-        if request.path == '/login' and request.method == 'GET':
-            return True
-        # Isentar GET na rota raiz (apenas visualização)
-        if request.path == '/' and request.method == 'GET':
-            return True
-        return False
+        exempt = _exempt_endpoints.get((request.endpoint, request.method))
+        if exempt is not None:
+            return exempt
+        return _is_exempt_path(request.path, request.method)
     
     # Configurar logging
     if not app.debug:
@@ -218,8 +256,10 @@ def log_security_event(event_type, details, ip_address=None, user_id=None):
     user = user_id or session.get('user_id', 'anonymous')
     username = session.get('username', 'unknown')
     
-    log_message = f"[{event_type}] IP: {ip}, User: {user} ({username}), Details: {details}"
-    security_logger.warning(log_message)
+    security_logger.warning(
+        "[%s] IP: %s, User: %s (%s), Details: %s", event_type, ip, user, username, details,
+        extra={'fields': {'event': event_type, 'ip': ip, 'user_id': user, 'username': username}}
+    )
 
 def log_failed_login(username, reason):
     """Registra tentativa de login falhada"""
@@ -0,0 +1,22 @@
+-- Restrições únicas usadas pela sincronização em lote das permissões (upsert com
+-- on_conflict=user_id,application_id / user_id,portal_app_id e ignore_duplicates).
+
+-- 1) Remover duplicatas eventuais (mantém o registro mais antigo)
+DELETE FROM maestro_user_application_access a
+USING maestro_user_application_access b
+WHERE a.user_id = b.user_id
+  AND a.application_id = b.application_id
+  AND a.id > b.id;
+
+DELETE FROM maestro_user_portal_app_access a
+USING maestro_user_portal_app_access b
+WHERE a.user_id = b.user_id
+  AND a.portal_app_id = b.portal_app_id
+  AND a.id > b.id;
+
+-- 2) Índices únicos (ON CONFLICT (user_id, ...) precisa de um deles)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_maestro_user_application_access_user_app
+    ON maestro_user_application_access (user_id, application_id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_maestro_user_portal_app_access_user_app
+    ON maestro_user_portal_app_access (user_id, portal_app_id);
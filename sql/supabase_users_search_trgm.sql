@@ -0,0 +1,22 @@
+-- Busca da listagem de usuários do admin (/admin/users) feita no banco:
+-- username/email com ILIKE '%termo%' (filtro or=(username.ilike.*termo*,email.ilike.*termo*)),
+-- ordenação por username e paginação com Range + count exato.
+-- Índices trigram (pg_trgm) permitem usar índice em ILIKE com curinga no início.
+
+-- 1) Extensão pg_trgm (no Supabase fica no schema extensions)
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA extensions;
+
+-- 2) Índices GIN trigram para a busca por substring
+CREATE INDEX IF NOT EXISTS idx_maestro_users_username_trgm
+    ON maestro_users USING gin (username extensions.gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_maestro_users_email_trgm
+    ON maestro_users USING gin (email extensions.gin_trgm_ops);
+
+-- 3) Índice para ordenação/paginação por username (ORDER BY username LIMIT/OFFSET)
+CREATE INDEX IF NOT EXISTS idx_maestro_users_username
+    ON maestro_users (username);
+
+-- 4) Permissões do admin em lote (filtro user_id=in.(...))
+CREATE INDEX IF NOT EXISTS idx_maestro_user_application_access_user_id
+    ON maestro_user_application_access (user_id);
@@ -0,0 +1,18 @@
+-- Login com uma única consulta por igualdade: username_lower=eq.<nome em minúsculas>
+-- (antes: ilike sem índice + segunda consulta exata quando não encontrava).
+
+-- 0) Conferir antes se há usernames que só diferem por maiúsculas/minúsculas
+--    (o índice único abaixo falha se existirem):
+-- SELECT lower(username), array_agg(username) FROM maestro_users
+-- GROUP BY lower(username) HAVING count(*) > 1;
+
+-- 1) Coluna gerada com o username normalizado
+ALTER TABLE maestro_users
+    ADD COLUMN IF NOT EXISTS username_lower TEXT GENERATED ALWAYS AS (lower(username)) STORED;
+
+-- 2) Índice único (garante também que não existam dois usuários "Joao" e "joao")
+CREATE UNIQUE INDEX IF NOT EXISTS uq_maestro_users_username_lower
+    ON maestro_users (username_lower);
+
+-- 3) Recarregar o cache de schema do PostgREST para expor a nova coluna
+NOTIFY pgrst, 'reload schema';
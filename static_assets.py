@@ -0,0 +1,223 @@
+"""
+Pipeline de Arquivos Estáticos
+Gera nomes com hash de conteúdo (fingerprint), variantes pré-comprimidas
+(gzip/brotli) e variantes de imagem (WebP/AVIF) para servir com cache imutável.
+
+Pode ser executado como passo de build: python static_assets.py
+"""
+import hashlib
+from io import BytesIO
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+
+from flask import url_for, send_from_directory, request, abort
+
+from compression import compress, negotiate_encoding, parse_accept_encoding, SUPPORTED_ENCODINGS
+
+# Pillow é opcional: sem ele, as imagens são servidas apenas no formato original
+try:
+    from PIL import Image, features as pil_features
+except ImportError:
+    Image = None
+    pil_features = None
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_BUILD_DIR = os.getenv('STATIC_BUILD_DIR', os.path.join(BASE_DIR, 'static_build'))
+MANIFEST_NAME = 'manifest.json'
+
+# Cache de um ano: o nome muda sempre que o conteúdo muda
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Tipos que valem a pena comprimir (imagens raster já são comprimidas)
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.html', '.json', '.txt', '.xml', '.ico')
+COMPRESS_MIN_SIZE = 1024
+# Variantes de imagem, em ordem de preferência: (mimetype, extensão, opções do Pillow)
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+IMAGE_VARIANTS = (
+    ('image/avif', '.avif', {'quality': 60}),
+    ('image/webp', '.webp', {'quality': 80, 'method': 6}),
+)
+
+# Marcador de variante descartada (não ficou menor que o original): evita recodificar a cada build
+SKIP_MARKER_SUFFIX = '.skip'
+
+_CSS_URL_PATTERN = re.compile(r'url\(\s*(["\']?)([^"\')]+)\1\s*\)')
+
+
+def _content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def _write_atomic(path, data):
+    """Escreve o arquivo de forma atômica (vários workers podem gerar ao mesmo tempo)"""
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class StaticAssetPipeline:
+    """Manifesto de arquivos estáticos com fingerprint e suas variantes"""
+
+    def __init__(self, static_folder, build_dir=STATIC_BUILD_DIR):
+        self.static_folder = static_folder
+        self.build_dir = build_dir
+        self.manifest = {}   # 'css/style.css' -> 'css/style.<hash>.css'
+        self.variants = {}   # 'css/style.<hash>.css' -> {'br': 'css/style.<hash>.css.br', ...}
+        self.mimetypes = {}  # 'css/style.<hash>.css' -> 'text/css'
+
+    def _image_variants_supported(self):
+        if Image is None:
+            return ()
+        return tuple(v for v in IMAGE_VARIANTS if pil_features.check(v[1][1:]))
+
+    def _rewrite_css_urls(self, rel_path, content):
+        """Aponta url(...) relativos do CSS para os nomes com fingerprint"""
+        css_dir = posixpath.dirname(rel_path)
+
+        def replace(match):
+            quote, url = match.group(1), match.group(2).strip()
+            if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+                return match.group(0)
+            target = posixpath.normpath(posixpath.join(css_dir, url.split('?')[0].split('#')[0]))
+            hashed = self.manifest.get(target)
+            if not hashed:
+                return match.group(0)
+            return f'url({quote}{posixpath.relpath(hashed, css_dir or ".")}{quote})'
+
+        text = content.decode('utf-8')
+        return _CSS_URL_PATTERN.sub(replace, text).encode('utf-8')
+
+    def _process_file(self, rel_path, image_variants):
+        with open(os.path.join(self.static_folder, rel_path), 'rb') as f:
+            content = f.read()
+        lower = rel_path.lower()
+        if lower.endswith('.css'):
+            content = self._rewrite_css_urls(rel_path, content)
+
+        root, ext = posixpath.splitext(rel_path)
+        hashed = f"{root}.{_content_hash(content)}{ext}"
+        _write_atomic(os.path.join(self.build_dir, hashed), content)
+
+        variants = {}
+        if lower.endswith(COMPRESSIBLE_EXTENSIONS) and len(content) >= COMPRESS_MIN_SIZE:
+            for encoding in SUPPORTED_ENCODINGS:
+                suffix = '.br' if encoding == 'br' else '.gz'
+                variant_path = os.path.join(self.build_dir, hashed + suffix)
+                if not os.path.exists(variant_path):
+                    _write_atomic(variant_path, compress(content, encoding))
+                variants[encoding] = hashed + suffix
+        elif lower.endswith(IMAGE_EXTENSIONS):
+            for mimetype, suffix, options in image_variants:
+                variant_path = os.path.join(self.build_dir, hashed + suffix)
+                skip_path = variant_path + SKIP_MARKER_SUFFIX
+                if os.path.exists(skip_path):
+                    continue
+                if not os.path.exists(variant_path):
+                    try:
+                        with Image.open(os.path.join(self.static_folder, rel_path)) as img:
+                            buffer = BytesIO()
+                            img.save(buffer, format=suffix[1:].upper(), **options)
+                        encoded = buffer.getvalue()
+                    except Exception as e:
+                        logger.warning(f"Não foi possível gerar {suffix} para {rel_path}: {e}")
+                        continue
+                    # Só vale a pena se ficar menor que o original
+                    if len(encoded) >= len(content):
+                        _write_atomic(skip_path, b'')
+                        continue
+                    _write_atomic(variant_path, encoded)
+                variants[mimetype] = hashed + suffix
+
+        self.manifest[rel_path] = hashed
+        self.variants[hashed] = variants
+        self.mimetypes[hashed] = mimetypes.guess_type(rel_path)[0] or 'application/octet-stream'
+
+    def build(self):
+        """Gera (ou reaproveita) os arquivos com fingerprint e grava o manifesto"""
+        files = []
+        for dirpath, _, filenames in os.walk(self.static_folder):
+            for name in filenames:
+                full = os.path.join(dirpath, name)
+                files.append(os.path.relpath(full, self.static_folder).replace(os.sep, '/'))
+        # CSS por último: suas referências url(...) usam os nomes já calculados
+        files.sort(key=lambda p: (p.lower().endswith('.css'), p))
+
+        image_variants = self._image_variants_supported()
+        self.manifest, self.variants, self.mimetypes = {}, {}, {}
+        for rel_path in files:
+            try:
+                self._process_file(rel_path, image_variants)
+            except Exception as e:
+                logger.warning(f"Arquivo estático ignorado no pipeline ({rel_path}): {e}")
+
+        manifest_data = json.dumps({
+            'manifest': self.manifest, 'variants': self.variants, 'mimetypes': self.mimetypes
+        }, indent=2, sort_keys=True).encode('utf-8')
+        manifest_path = os.path.join(self.build_dir, MANIFEST_NAME)
+        tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+        os.makedirs(self.build_dir, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            f.write(manifest_data)
+        os.replace(tmp_path, manifest_path)
+        logger.info(
+            f"Pipeline de estáticos: {len(self.manifest)} arquivos, "
+            f"{sum(len(v) for v in self.variants.values())} variantes em {self.build_dir}"
+        )
+        return self.manifest
+
+    def url_for(self, endpoint, **values):
+        """
+        Compatível com url_for: para endpoint 'static' com arquivo no manifesto retorna
+        a URL com fingerprint; nos demais casos delega ao url_for do Flask
+        """
+        if endpoint == 'static':
+            hashed = self.manifest.get(values.get('filename', ''))
+            if hashed:
+                values['filename'] = hashed
+                return url_for('static_asset', **values)
+        return url_for(endpoint, **values)
+
+    def send(self, filename):
+        """Serve um arquivo com fingerprint escolhendo a melhor variante para o cliente"""
+        variants = self.variants.get(filename)
+        if variants is None:
+            abort(404)
+        mimetype = self.mimetypes.get(filename)
+        chosen, content_encoding, vary = filename, None, 'Accept-Encoding'
+
+        # Só as imagens raster têm variantes AVIF/WebP; SVG e ICO seguem pelo Accept-Encoding (gzip/br)
+        if filename.lower().endswith(IMAGE_EXTENSIONS):
+            vary = 'Accept, Accept-Encoding'
+            # Só o tipo explícito com q > 0 (image/* e */* não garantem suporte a AVIF/WebP)
+            accepted = parse_accept_encoding(request.headers.get('Accept', ''))
+            for variant_type, _, _ in IMAGE_VARIANTS:
+                if variant_type in variants and accepted.get(variant_type, 0.0) > 0:
+                    chosen, mimetype = variants[variant_type], variant_type
+                    break
+        else:
+            available = tuple(e for e in SUPPORTED_ENCODINGS if e in variants)
+            encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''), available)
+            if encoding:
+                chosen, content_encoding = variants[encoding], encoding
+
+        response = send_from_directory(self.build_dir, chosen, mimetype=mimetype, max_age=31536000)
+        if content_encoding:
+            response.headers['Content-Encoding'] = content_encoding
+        response.headers['Vary'] = vary
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    StaticAssetPipeline(os.path.join(BASE_DIR, 'static')).build()
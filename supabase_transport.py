@@ -0,0 +1,140 @@
+"""
+Módulo de Transporte HTTP do Supabase
+Cliente httpx compartilhado (um por worker) para as chamadas PostgREST: keep-alive,
+HTTP/2 quando disponível, limites de pool e timeouts explícitos, retry de conexão e
+medição do tempo de cada consulta (exportado para o monitoramento).
+"""
+import logging
+import os
+import time
+
+import httpx
+
+from monitoring import record_db_query
+
+# HTTP/2 exige o pacote h2 (httpx[http2]); sem ele, HTTP/1.1 com keep-alive
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Usar HTTP/2 (multiplexa as consultas de um worker em poucas conexões)
+SUPABASE_HTTP2 = os.getenv('SUPABASE_HTTP2', 'true').lower() == 'true'
+# Conexões simultâneas e conexões ociosas mantidas por worker
+SUPABASE_POOL_MAX_CONNECTIONS = int(os.getenv('SUPABASE_POOL_MAX_CONNECTIONS', '20'))
+SUPABASE_POOL_MAX_KEEPALIVE = int(os.getenv('SUPABASE_POOL_MAX_KEEPALIVE', '10'))
+# Tempo (segundos) que uma conexão ociosa fica no pool
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv('SUPABASE_KEEPALIVE_EXPIRY', '30'))
+# Timeouts (segundos): conexão, leitura/escrita e espera por conexão livre no pool
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv('SUPABASE_CONNECT_TIMEOUT', '5'))
+SUPABASE_READ_TIMEOUT = float(os.getenv('SUPABASE_READ_TIMEOUT', '30'))
+SUPABASE_POOL_TIMEOUT = float(os.getenv('SUPABASE_POOL_TIMEOUT', '10'))
+# Novas tentativas em falha de conexão (antes de enviar a requisição; seguro para qualquer método)
+SUPABASE_CONNECT_RETRIES = int(os.getenv('SUPABASE_CONNECT_RETRIES', '2'))
+# Novas tentativas de leituras (GET/HEAD) respondidas com 502/503/504
+SUPABASE_READ_RETRIES = int(os.getenv('SUPABASE_READ_RETRIES', '2'))
+RETRY_BACKOFF = 0.2
+RETRY_STATUSES = frozenset((502, 503, 504))
+IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD'))
+
+REST_PREFIX = '/rest/v1/'
+
+
+def query_label(path):
+    """'/rest/v1/maestro_users' -> 'maestro_users'; '/rest/v1/rpc/fn' -> 'rpc/fn'"""
+    if path.startswith(REST_PREFIX):
+        parts = path[len(REST_PREFIX):].split('/')
+        if parts[0] == 'rpc' and len(parts) > 1:
+            return f"rpc/{parts[1]}"
+        return parts[0] or 'rest'
+    # Auth/Storage usam o mesmo cliente; agrupados pelo serviço
+    return path.strip('/').split('/', 1)[0] or 'root'
+
+
+class _TimedStream(httpx.SyncByteStream):
+    """Corpo da resposta que registra o tempo total da consulta ao ser fechado"""
+
+    def __init__(self, stream, label, started, failed):
+        self._stream = stream
+        self._label = label
+        self._started = started
+        self._failed = failed
+        self._recorded = False
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            if not self._recorded:
+                self._recorded = True
+                record_db_query(self._label, time.perf_counter() - self._started, self._failed)
+
+
+class InstrumentedTransport(httpx.BaseTransport):
+    """Transporte com pool (httpx.HTTPTransport) + retry de leituras + medição por consulta"""
+
+    def __init__(self, http2=None, limits=None, connect_retries=SUPABASE_CONNECT_RETRIES,
+                 read_retries=SUPABASE_READ_RETRIES, transport=None):
+        if http2 is None:
+            http2 = SUPABASE_HTTP2 and HTTP2_AVAILABLE
+        self.http2 = http2
+        self.read_retries = read_retries
+        # Retries do HTTPTransport cobrem apenas falhas de conexão
+        self._transport = transport or httpx.HTTPTransport(
+            http2=http2, limits=limits, retries=connect_retries
+        )
+
+    def handle_request(self, request):
+        label = query_label(request.url.path)
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                response = self._transport.handle_request(request)
+            except httpx.TransportError:
+                record_db_query(label, time.perf_counter() - started, True)
+                raise
+            if (response.status_code in RETRY_STATUSES
+                    and request.method in IDEMPOTENT_METHODS
+                    and attempt < self.read_retries):
+                response.close()
+                attempt += 1
+                logger.warning(f"Supabase respondeu {response.status_code} em {label}, nova tentativa ({attempt})")
+                time.sleep(RETRY_BACKOFF * (2 ** (attempt - 1)))
+                continue
+            break
+        # Tempo contado até o corpo ser lido por completo (inclui a transferência)
+        response.stream = _TimedStream(response.stream, label, started, response.status_code >= 400)
+        return response
+
+    def close(self):
+        self._transport.close()
+
+
+def create_supabase_http_client():
+    """Cria o cliente httpx usado pelo Supabase (chamar dentro do worker, após o fork)"""
+    limits = httpx.Limits(
+        max_connections=SUPABASE_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=SUPABASE_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        SUPABASE_READ_TIMEOUT,
+        connect=SUPABASE_CONNECT_TIMEOUT,
+        pool=SUPABASE_POOL_TIMEOUT,
+    )
+    transport = InstrumentedTransport(limits=limits)
+    if SUPABASE_HTTP2 and not HTTP2_AVAILABLE:
+        logger.warning("SUPABASE_HTTP2 ativo mas pacote h2 não instalado; usando HTTP/1.1")
+    logger.info(
+        f"Cliente HTTP do Supabase: {'HTTP/2' if transport.http2 else 'HTTP/1.1'}, "
+        f"{SUPABASE_POOL_MAX_CONNECTIONS} conexões ({SUPABASE_POOL_MAX_KEEPALIVE} ociosas), "
+        f"timeout {SUPABASE_CONNECT_TIMEOUT}s/{SUPABASE_READ_TIMEOUT}s"
+    )
+    return httpx.Client(transport=transport, timeout=timeout, follow_redirects=True)